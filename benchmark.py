@@ -0,0 +1,1247 @@
+"""
+Benchmarks for the click engine
+Runs on any OS: uses a no-op input backend and a virtual clock (or the real
+clock where timing accuracy is measured), so no clicks are injected.
+
+    python benchmark.py                          # run everything
+    python benchmark.py --quick                  # skip the slowest sizes
+    python benchmark.py --only max_rate startup
+    python benchmark.py --json new.json --compare old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import mouse_clicker
+from mouse_clicker import (
+    ACTION_FLAGS, RUNNING, ClickExecutor, FakeWindows, JitterGenerator, PostMessageBackend, RunTelemetry,
+    SendInputBackend, VirtualClock, WindowCache, click_interval_ns, compile_plan, prepare_batches,
+)
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+class NullBackend:
+    """Input backend that does nothing"""
+    def prepare(self, x, y, action, count=1, move=True):
+        return None
+
+    def send(self, batch):
+        pass
+
+def make_clicks(n):
+    """Build a click list of n steps"""
+    types = ('left', 'right', 'double')
+    return [
+        {'x': i % 1920, 'y': i % 1080, 'type': types[i % 3],
+         'minutes': 0, 'seconds': 0, 'milliseconds': 10}
+        for i in range(n)
+    ]
+
+def legacy_execute(clicks, backend, clock):
+    """
+    Per-step work of the pre-plan executor: dict lookups + string dispatch,
+    then the step's position and click handed to the backend
+    """
+    deadline = clock.now_ns()
+    for click in clicks:
+        while clock.now_ns() < deadline:
+            pass
+        x, y = click['x'], click['y']
+        click_type = click['type']
+        minutes = click.get('minutes', 0)
+        seconds = click.get('seconds', 0)
+        milliseconds = click.get('milliseconds', 100)
+        interval = minutes * 60 + seconds + milliseconds / 1000.0
+        if click_type == 'left':
+            action = 0
+        elif click_type == 'right':
+            action = 1
+        elif click_type == 'double':
+            action = 2
+        backend.send(backend.prepare(x, y, action))
+        clock.advance(int(interval * 1_000_000_000))
+        deadline += click_interval_ns(click)
+
+def bench_plan_overhead(n=10_000, rounds=5):
+    """Per-step overhead of the dict loop vs the compiled plan, in ns"""
+    clicks = make_clicks(n)
+    backend = NullBackend()
+
+    legacy = []
+    for _ in range(rounds):
+        clock = VirtualClock(read_cost_ns=0)
+        t0 = time.perf_counter_ns()
+        legacy_execute(clicks, backend, clock)
+        legacy.append((time.perf_counter_ns() - t0) / n)
+
+    planned = []
+    compile_ns = []
+    for _ in range(rounds):
+        clock = VirtualClock(read_cost_ns=0)
+        executor = ClickExecutor(backend, clock)
+        executor.clicks = clicks
+        executor.spin_ns = 0
+        t0 = time.perf_counter_ns()
+        executor.start()
+        t1 = time.perf_counter_ns()
+        executor.thread.join()
+        planned.append((time.perf_counter_ns() - t1) / n)
+        compile_ns.append(t1 - t0)
+
+    return {
+        'steps': n,
+        'legacy_ns_per_step': min(legacy),
+        'plan_ns_per_step': min(planned),
+        'compile_ms': min(compile_ns) / 1e6,
+    }
+
+def bench_injection(n=10_000, rounds=5):
+    """
+    Foreign calls and Python-side cost per step: one SetCursorPos +
+    mouse_event per button event vs one prebuilt SendInput batch per step
+    """
+    clicks = make_clicks(n)
+    plan = compile_plan(clicks)
+    calls = [0]
+
+    def fake_call(*args):
+        calls[0] += 1
+
+    legacy = []
+    for _ in range(rounds):
+        calls[0] = 0
+        t0 = time.perf_counter_ns()
+        for x, y, action in zip(plan.xs, plan.ys, plan.actions):
+            fake_call(x, y)
+            for _flags in ACTION_FLAGS[action]:
+                fake_call(_flags, 0, 0, 0, 0)
+        legacy.append((time.perf_counter_ns() - t0) / n)
+    legacy_calls = calls[0] / n
+
+    backend = SendInputBackend(screen=(0, 0, 1920, 1080), send_input=fake_call)
+    t0 = time.perf_counter_ns()
+    batches = prepare_batches(plan, backend)
+    prepare_ms = (time.perf_counter_ns() - t0) / 1e6
+
+    batched = []
+    for _ in range(rounds):
+        calls[0] = 0
+        send = backend.send
+        t0 = time.perf_counter_ns()
+        for batch in batches:
+            send(batch)
+        batched.append((time.perf_counter_ns() - t0) / n)
+    batched_calls = calls[0] / n
+
+    return {
+        'steps': n,
+        'legacy_calls_per_step': legacy_calls,
+        'legacy_ns_per_step': min(legacy),
+        'batched_calls_per_step': batched_calls,
+        'batched_ns_per_step': min(batched),
+        'prepare_ms': prepare_ms,
+    }
+
+def bench_independent(target_counts=(1, 10, 50, 100, 500), interval_ms=100, duration=1.0, spin_us=100):
+    """
+    Independent mode on the real clock: timing error and CPU cost as the
+    number of targets grows (every target clicks every interval_ms).
+    The spin budget dominates CPU use once clicks are less than spin_us
+    apart, so keep it small here.
+    """
+    results = []
+    for targets in target_counts:
+        executor = ClickExecutor(NullBackend())
+        executor.clicks = [
+            {'x': i, 'y': i, 'type': 'left', 'minutes': 0, 'seconds': 0, 'milliseconds': interval_ms}
+            for i in range(targets)
+        ]
+        executor.mode = 'independent'
+        executor.stagger = True
+        executor.spin_ns = spin_us * 1000
+        executor.repeat_until_stopped = True
+        lateness = []
+        executor.on_step = lambda index, late: lateness.append(late)
+        cpu0 = time.process_time()
+        executor.start()
+        time.sleep(duration)
+        executor.stop()
+        executor.thread.join()
+        cpu = time.process_time() - cpu0
+        lateness.sort()
+        clicks = len(lateness)
+        results.append({
+            'targets': targets,
+            'clicks': clicks,
+            'expected_clicks': int(targets * duration * 1000 / interval_ms),
+            'lateness_p50_us': percentile(lateness, 0.5) / 1000,
+            'lateness_p99_us': percentile(lateness, 0.99) / 1000,
+            'cpu_percent': cpu / duration * 100,
+            'cpu_us_per_click': cpu * 1e6 / clicks if clicks else 0,
+        })
+    return results
+
+# Child-process snippet: print peak RSS in KB after the imports ran.
+# Prefers VmHWM on Linux: ru_maxrss survives fork+exec, so it would report
+# the parent's peak instead.
+_RSS_SNIPPET = """
+try:
+    with open('/proc/self/status') as status:
+        print(next(line.split()[1] for line in status if line.startswith('VmHWM:')))
+except (OSError, StopIteration):
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(rss // 1024 if sys.platform == 'darwin' else rss)
+    except ImportError:
+        print(-1)
+"""
+
+def bench_startup(rounds=5):
+    """Cold-start wall time and peak RSS: headless engine vs GUI stack imports"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    targets = {
+        'headless': 'import mouse_clicker',
+        'gui': 'import clicker_gui',
+    }
+    results = {}
+    for name, imports in targets.items():
+        code = f'import sys\n{imports}\n{_RSS_SNIPPET}'
+        times = []
+        rss_kb = None
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            proc = subprocess.run([sys.executable, '-c', code], cwd=here,
+                                  capture_output=True, text=True)
+            times.append(time.perf_counter() - t0)
+            if proc.returncode != 0:
+                break
+            rss_kb = int(proc.stdout.strip().splitlines()[-1])
+        if proc.returncode != 0:
+            results[name] = None
+            continue
+        results[name] = {
+            'startup_ms': min(times) * 1000,
+            'peak_rss_kb': rss_kb if rss_kb >= 0 else None,
+        }
+    return results
+
+def bench_max_rate(n=100_000, rounds=3):
+    """Highest steps/sec execute_sequence sustains when every interval is 0"""
+    clicks = make_clicks(n)
+    for click in clicks:
+        click['milliseconds'] = 0
+    best = 0.0
+    for _ in range(rounds):
+        executor = ClickExecutor(NullBackend(), VirtualClock(read_cost_ns=0))
+        executor.clicks = clicks
+        executor.plan = compile_plan(clicks)
+        executor.batches = prepare_batches(executor.plan, executor.backend)
+        executor.state = RUNNING
+        t0 = time.perf_counter()
+        executor.execute_sequence()
+        best = max(best, n / (time.perf_counter() - t0))
+    return {'steps': n, 'steps_per_sec': best}
+
+def bench_live_edit(steps=100, edits=2000, boundaries=('cycle', 'step')):
+    """
+    Stress update_clicks() while a running sequence plays at maximum rate.
+    Every edit tags its steps with a new version (y) and their position (x);
+    the backend checks that versions never go backwards, that positions stay
+    contiguous, and (for 'cycle') that no cycle mixes two versions.
+    """
+    results = []
+    for boundary in boundaries:
+        edited_ns = {}
+        seen_ns = {}
+        state = {'version': 0, 'x': steps - 1, 'sent': 0, 'violations': 0}
+
+        class CheckingBackend:
+            def prepare(self, x, y, action, count=1, move=True):
+                return (x, y)
+
+            def send(self, batch):
+                x, version = batch
+                if version != state['version']:
+                    if version < state['version'] or (boundary == 'cycle' and x != 0):
+                        state['violations'] += 1
+                    seen_ns[version] = time.perf_counter_ns()
+                    state['version'] = version
+                if x != (state['x'] + 1) % steps:
+                    state['violations'] += 1
+                state['x'] = x
+                state['sent'] += 1
+
+        def snapshot(version):
+            return [{'x': i, 'y': version, 'type': 'left', 'milliseconds': 0} for i in range(steps)]
+
+        executor = ClickExecutor(CheckingBackend())
+        executor.spin_ns = 0
+        executor.repeat_until_stopped = True
+        executor.swap_boundary = boundary
+        executor.clicks = snapshot(0)
+        executor.start()
+        t0 = time.perf_counter()
+        for version in range(1, edits + 1):
+            clicks = snapshot(version)
+            edited_ns[version] = time.perf_counter_ns()
+            executor.update_clicks(clicks)
+        elapsed = time.perf_counter() - t0
+        time.sleep(0.05)
+        executor.stop()
+        executor.thread.join()
+        latencies = sorted(seen_ns[v] - edited_ns[v] for v in seen_ns if v in edited_ns)
+        results.append({
+            'boundary': boundary,
+            'edits_per_sec': edits / elapsed,
+            'steps_per_sec': state['sent'] / (elapsed + 0.05),
+            'applied': len(latencies),
+            'swap_latency_p50_us': percentile(latencies, 0.5) / 1000 if latencies else 0,
+            'swap_latency_max_us': latencies[-1] / 1000 if latencies else 0,
+            'final_version_played': state['version'] == edits,
+            'violations': state['violations'],
+        })
+    return results
+
+def bench_jitter(sizes=(100, 10_000, 100_000), cycles=5, n=100_000):
+    """
+    Cost of step jitter: drawing one cycle's tables with NumPy vs
+    random.Random, and the max sequence rate with and without jitter
+    (no-op backend, virtual clock).
+    """
+    results = []
+    for size in sizes:
+        clicks = make_clicks(size)
+        for click in clicks:
+            click['jitter_ms'] = 5
+            click['jitter_px'] = 3
+        plan = compile_plan(clicks)
+        backend = NullBackend()
+        batches = prepare_batches(plan, backend)
+        result = {'steps': size}
+        for name, use_numpy in (('numpy', True), ('python', False)):
+            try:
+                generator = JitterGenerator(1, backend.prepare, use_numpy)
+            except ImportError:
+                result[f'{name}_cycle_ms'] = None
+                continue
+            generator.next_cycle(plan, batches)  # Warm the position cache
+            t0 = time.perf_counter()
+            for _ in range(cycles):
+                generator.next_cycle(plan, batches)
+            result[f'{name}_cycle_ms'] = (time.perf_counter() - t0) / cycles * 1000
+        results.append(result)
+
+    rates = {}
+    for jittered in (False, True):
+        clicks = make_clicks(100)
+        for click in clicks:
+            click['milliseconds'] = 0
+            if jittered:
+                click['jitter_ms'] = 1
+                click['jitter_px'] = 2
+        executor = ClickExecutor(NullBackend(), VirtualClock())
+        executor.spin_ns = 0
+        executor.jitter_seed = 1
+        executor.clicks = clicks
+        executor.repeat_count = n // len(clicks)
+        executor.start()
+        t0 = time.perf_counter()
+        executor.thread.join()
+        rates['jitter' if jittered else 'plain'] = n / (time.perf_counter() - t0)
+    return {'cycles': results, 'steps_per_sec': rates}
+
+def bench_stop_latency(intervals_ms=(0, 10, 1000, 60_000), rounds=20, limit_ms=5.0):
+    """
+    stop() to quiescence on the real clock, whatever the interval: time
+    until the executor thread has exited, and whether any click was sent
+    after stop() returned. (A step already past its wait when stop() is
+    called still completes.)
+    """
+    import random
+
+    class TimedBackend(NullBackend):
+        last_send_ns = 0
+
+        def send(self, batch):
+            self.last_send_ns = time.perf_counter_ns()
+
+    rng = random.Random(1)
+    results = []
+    for mode in ('sequence', 'independent'):
+        for interval_ms in intervals_ms:
+            backend = TimedBackend()
+            latencies = []
+            late_clicks = 0
+            for _ in range(rounds):
+                executor = ClickExecutor(backend)
+                executor.mode = mode
+                executor.repeat_until_stopped = True
+                executor.clicks = [{'x': 0, 'y': 0, 'type': 'left', 'milliseconds': interval_ms}] * 2
+                executor.start()
+                time.sleep(rng.uniform(0.001, 0.01))
+                t0 = time.perf_counter_ns()
+                stopped = executor.stop()
+                t1 = time.perf_counter_ns()
+                if not stopped:
+                    executor.thread.join()
+                    t1 = time.perf_counter_ns()
+                latencies.append(t1 - t0)
+                time.sleep(0.002)
+                if backend.last_send_ns > t1:
+                    late_clicks += 1
+            latencies.sort()
+            results.append({
+                'mode': mode,
+                'interval_ms': interval_ms,
+                'stop_p50_ms': percentile(latencies, 0.5) / 1e6,
+                'stop_max_ms': latencies[-1] / 1e6,
+                'clicks_after_stop': late_clicks,
+                'within_limit': latencies[-1] / 1e6 < limit_ms and not late_clicks,
+            })
+    return results
+
+def bench_control_latency(rounds=50, interval_ms=10, limit_ms=1.0, stop_limit_ms=5.0, slow_send_ms=50):
+    """
+    Command-to-action time through the control server over loopback TCP,
+    real clock: send until the first click for 'start', send until the
+    reply for the rest ('pause' / 'stop' have taken effect once they reply).
+    'status' is the bare round trip. pause/edit/stop run against a sequence
+    clicking every interval_ms. 'stop' replies once the executor thread
+    has exited, so it is held to stop_limit_ms (as in stop_latency).
+    'busy' is a second client's round trip while a stop
+    waits for an injection taking slow_send_ms; it must not wait with it.
+    """
+    from clicker_control import ControlClient, ControlServer
+
+    class TimedBackend(NullBackend):
+        first_send_ns = None
+
+        def send(self, batch):
+            if self.first_send_ns is None:
+                self.first_send_ns = time.perf_counter_ns()
+
+    backend = TimedBackend()
+    executor = ClickExecutor(backend)
+    executor.repeat_until_stopped = True
+    executor.swap_boundary = 'step'
+    clicks = [{'x': i, 'y': 0, 'type': 'left', 'milliseconds': interval_ms} for i in range(10)]
+    server = ControlServer(executor, '127.0.0.1:0')
+    server.start()
+    latencies = {cmd: [] for cmd in ('status', 'start', 'pause', 'resume', 'edit', 'stop', 'busy')}
+    try:
+        with ControlClient(f'127.0.0.1:{server.port}') as client:
+            def timed(cmd, **fields):
+                t0 = time.perf_counter_ns()
+                client.request(cmd, **fields)
+                latencies[cmd].append(time.perf_counter_ns() - t0)
+
+            for i in range(rounds):
+                timed('status')
+                executor.clicks = clicks
+                backend.first_send_ns = None
+                t0 = time.perf_counter_ns()
+                client.start()
+                while backend.first_send_ns is None:
+                    time.sleep(0.0001)
+                latencies['start'].append(backend.first_send_ns - t0)
+                time.sleep(0.002)
+                timed('pause')
+                timed('resume')
+                timed('edit', index=i % len(clicks), click={'x': i})
+                time.sleep(0.002)
+                timed('stop')
+
+            class SlowBackend(NullBackend):
+                def send(self, batch):
+                    time.sleep(slow_send_ms / 1000)
+
+            executor.backend = SlowBackend()
+            with ControlClient(f'127.0.0.1:{server.port}') as other:
+                for _ in range(max(1, rounds // 10)):
+                    executor.clicks = clicks
+                    client.start()
+                    time.sleep(slow_send_ms / 5000)
+                    stop_id = client.send('stop')
+                    time.sleep(0.001)
+                    t0 = time.perf_counter_ns()
+                    other.request('status')
+                    latencies['busy'].append(time.perf_counter_ns() - t0)
+                    while client.read().get('id') != stop_id:
+                        pass
+    finally:
+        server.close()
+
+    results = []
+    for cmd, values in latencies.items():
+        values.sort()
+        results.append({
+            'cmd': cmd,
+            'p50_ms': percentile(values, 0.5) / 1e6,
+            'p99_ms': percentile(values, 0.99) / 1e6,
+            'within_limit': percentile(values, 0.5) / 1e6 < (stop_limit_ms if cmd == 'stop' else limit_ms),
+        })
+    return results
+
+def bench_window_dispatch(profile_counts=(1, 4, 16), interval_ms=5, duration=1.0):
+    """
+    Several profiles clicking into separate (fake) windows at once, one
+    executor each, sharing a WindowCache: aggregate message rate at full
+    speed, lateness at a fixed interval, and window lookups per profile.
+    """
+    results = []
+    for count in profile_counts:
+        for paced in (False, True):
+            windows = FakeWindows({hwnd: (f'Window {hwnd}', 'App', (0, 0)) for hwnd in range(1, count + 1)})
+            cache = WindowCache(windows)
+            executors = []
+            for hwnd in range(1, count + 1):
+                executor = ClickExecutor(PostMessageBackend(f'Window {hwnd}', cache=cache))
+                executor.telemetry = RunTelemetry()
+                executor.repeat_until_stopped = True
+                executor.spin_ns = 100_000
+                executor.clicks = [{'x': i, 'y': hwnd, 'type': 'left', 'milliseconds': interval_ms if paced else 0}
+                                   for i in range(10)]
+                executors.append(executor)
+            for executor in executors:
+                executor.start()
+            time.sleep(duration)
+            for executor in executors:
+                executor.stop()
+            stats = [executor.telemetry.snapshot() for executor in executors]
+            result = {
+                'profiles': count,
+                'interval_ms': interval_ms if paced else 0,
+                'steps_per_sec': sum(stat['steps'] for stat in stats) / duration,
+                'messages': len(windows.posted),
+                'lookups_per_profile': windows.find_calls / count,
+            }
+            if paced:
+                result['lateness_p99_us'] = max(stat['lateness_p99_ns'] for stat in stats) / 1000
+            results.append(result)
+    return results
+
+def bench_burst_rate(targets=(1_000, 10_000, 100_000, 1_000_000, 4_000_000, 16_000_000, 64_000_000), duration=0.5, tolerance=0.01):
+    """
+    Burst mode against a no-op backend on the real clock: achieved vs target
+    clicks/s, and sends (injections) per second. A rate is stable when the
+    achieved rate is within tolerance of the target.
+    """
+    class CountingBackend(NullBackend):
+        sends = 0
+
+        def send(self, batch):
+            self.sends += 1
+
+    results = []
+    for target in targets:
+        backend = CountingBackend()
+        executor = ClickExecutor(backend)
+        executor.mode = 'burst'
+        executor.target_cps = target
+        executor.burst_duration_s = duration
+        executor.clicks = [{'x': 0, 'y': 0, 'type': 'left'}]
+        executor.start()
+        executor.thread.join()
+        achieved = executor.achieved_cps or 0.0
+        results.append({
+            'target_cps': target,
+            'achieved_cps': achieved,
+            'sends_per_sec': backend.sends / duration,
+            'stable': abs(achieved - target) <= tolerance * target,
+        })
+    return results
+
+def bench_timing_error(intervals_ms=(1, 5, 10, 20), duration=0.5):
+    """Achieved vs configured interval on the real clock"""
+    results = []
+    for interval_ms in intervals_ms:
+        executor = ClickExecutor(NullBackend())
+        executor.telemetry = RunTelemetry()
+        executor.clicks = [{'x': 0, 'y': 0, 'type': 'left', 'milliseconds': interval_ms}]
+        executor.repeat_count = max(2, int(duration * 1000 / interval_ms))
+        executor.start()
+        executor.thread.join()
+        stats = executor.telemetry.snapshot()
+        achieved_ms = 1000 / stats['cps_overall'] if stats['cps_overall'] else 0
+        results.append({
+            'interval_ms': interval_ms,
+            'steps': stats['steps'],
+            'achieved_interval_ms': achieved_ms,
+            'rate_error_percent': (achieved_ms - interval_ms) / interval_ms * 100,
+            'lateness_p99_us': stats['lateness_p99_ns'] / 1000,
+            'lateness_max_us': stats['lateness_max_ns'] / 1000,
+        })
+    return results
+
+def bench_profile_io(sizes=(10, 10_000, 1_000_000)):
+    """save_profile/load_profile time and file size for growing click lists"""
+    results = []
+    saved_dir = mouse_clicker.CONFIG_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        mouse_clicker.CONFIG_DIR = mouse_clicker.Path(tmp)
+        try:
+            for n in sizes:
+                data = {'hotkey': '`', 'repeat_mode': 'repeat', 'repeat_count': 1, 'clicks': make_clicks(n)}
+                t0 = time.perf_counter()
+                mouse_clicker.save_profile('bench', data)
+                save_s = time.perf_counter() - t0
+                size = (mouse_clicker.CONFIG_DIR / 'bench.json').stat().st_size
+                t0 = time.perf_counter()
+                loaded = mouse_clicker.load_profile('bench')
+                load_s = time.perf_counter() - t0
+                assert len(loaded['clicks']) == n
+                results.append({
+                    'steps': n,
+                    'file_bytes': size,
+                    'save_ms': save_s * 1000,
+                    'load_ms': load_s * 1000,
+                    'load_steps_per_sec': n / load_s if load_s else 0,
+                })
+        finally:
+            mouse_clicker.CONFIG_DIR = saved_dir
+    return results
+
+def bench_profile_switch(profiles=50, sizes=(100, 10_000), switches=20):
+    """
+    Switching the click list of a running sequence to another profile
+    (real clock, SendInput batches built with a fake SendInput):
+    uncached = load_profile + update_clicks (parse, compile, prepare on the
+    calling thread), cached = ProfileLibrary.switch on preloaded entries.
+    Also directory listing: first scan vs a names() call that finds the
+    directory unchanged.
+    """
+    results = []
+    saved_dir = mouse_clicker.CONFIG_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        mouse_clicker.CONFIG_DIR = mouse_clicker.Path(tmp)
+        try:
+            for n in sizes:
+                for i in range(profiles):
+                    mouse_clicker.save_profile(f'p{n}-{i}', {'clicks': make_clicks(n)})
+            t0 = time.perf_counter_ns()
+            library = mouse_clicker.ProfileLibrary()
+            count = len(library.names())
+            scan_ns = time.perf_counter_ns() - t0
+            t0 = time.perf_counter_ns()
+            library.names()
+            listing = {
+                'profiles': count,
+                'scan_ms': scan_ns / 1e6,
+                'rescan_ms': (time.perf_counter_ns() - t0) / 1e6,
+            }
+            for n in sizes:
+                names = [f'p{n}-{i}' for i in range(min(switches, profiles))]
+                backend = SendInputBackend(screen=(0, 0, 1920, 1080), send_input=lambda *args: 0)
+                executor = ClickExecutor(backend)
+                executor.repeat_until_stopped = True
+                executor.swap_boundary = 'step'
+                executor.clicks = make_clicks(n)
+                executor.start()
+                try:
+                    uncached = []
+                    for name in names:
+                        t0 = time.perf_counter_ns()
+                        executor.update_clicks(mouse_clicker.load_profile(name)['clicks'])
+                        uncached.append(time.perf_counter_ns() - t0)
+                    library = mouse_clicker.ProfileLibrary(capacity=len(names))
+                    library.preload(names, backend).join()
+                    cached = []
+                    for name in names:
+                        t0 = time.perf_counter_ns()
+                        library.switch(executor, name)
+                        cached.append(time.perf_counter_ns() - t0)
+                finally:
+                    executor.stop()
+                uncached.sort()
+                cached.sort()
+                results.append({
+                    'steps': n,
+                    'uncached_p50_ms': percentile(uncached, 0.5) / 1e6,
+                    'cached_p50_ms': percentile(cached, 0.5) / 1e6,
+                    'cached_max_ms': cached[-1] / 1e6,
+                })
+        finally:
+            mouse_clicker.CONFIG_DIR = saved_dir
+    results.append(listing)
+    return results
+
+def bench_blocks(repeats=500, outer=(1, 100, 2000), rounds=3):
+    """
+    Compact sequences: "click A `repeats` times at 10 ms, then B once",
+    looped `outer` times, as a flat click list vs one loop block with a
+    step repeat. Compares JSON size and compile time (parse + compile_plan,
+    or BlockSource past BLOCK_FLATTEN_LIMIT steps, which is then streamed)
+    and the input events injected per step, where repeated clicks at one
+    position don't move the cursor again.
+    """
+    a = {'x': 100, 'y': 200, 'type': 'left', 'milliseconds': 10}
+    b = {'x': 300, 'y': 400, 'type': 'right', 'milliseconds': 10}
+    results = []
+    for n in outer:
+        forms = {
+            'flat': ([a] * repeats + [b]) * n,
+            'blocks': [{'loop': [dict(a, repeat=repeats), b], 'count': n}],
+        }
+        result = {'steps': (repeats + 1) * n}
+        for name, clicks in forms.items():
+            text = json.dumps({'clicks': clicks})
+            timings = []
+            for _ in range(rounds):
+                t0 = time.perf_counter_ns()
+                clicks = json.loads(text)['clicks']
+                streamed = name == 'blocks' and mouse_clicker.streams_blocks(clicks)
+                compiled = mouse_clicker.BlockSource(clicks) if streamed else compile_plan(clicks)
+                timings.append(time.perf_counter_ns() - t0)
+            if name == 'flat':
+                plan = compiled
+            result[name] = {'json_bytes': len(text), 'compile_ms': min(timings) / 1e6, 'streamed': streamed}
+        events = [0]
+
+        def count_events(count, inputs, size):
+            events[0] += count
+
+        backend = SendInputBackend(screen=(0, 0, 1920, 1080), send_input=count_events)
+        batches = prepare_batches(plan, backend)
+        for batch in batches:
+            backend.send(batch)
+        result['events_per_step'] = events[0] / len(plan)
+        events[0] = 0
+        for batch in mouse_clicker.moving_batches(plan, batches, backend.prepare):
+            backend.send(batch)
+        result['events_per_step_moving'] = events[0] / len(plan)
+        results.append(result)
+    return results
+
+def bench_wait_condition(sides=(1, 16, 64), checks=2000, rounds=20, sharing=4, share_ms=200):
+    """
+    Wait steps against a synthetic screen: the cost of one region check
+    (NumPy vs pure Python, tolerance 8), how soon after the region changes
+    the following click is sent (real clock; the region changes after
+    5-60 ms of an unchanged screen, so polling has backed off), and how many
+    grabs a shared CaptureCache saves when several executors wait on the
+    same region.
+    """
+    import random
+
+    results = {'checks': []}
+    for side in sides:
+        reference = bytes(range(256)) * (side * side * 3 // 256) + bytes(side * side * 3 % 256)
+        frame = bytes(min(255, value + 4) for value in reference)
+        row = {'side': side}
+        for name, use_numpy in (('numpy', True), ('python', False)):
+            if use_numpy and mouse_clicker._numpy() is None:
+                row[f'{name}_us'] = None
+                continue
+            saved = mouse_clicker._numpy
+            if not use_numpy:
+                mouse_clicker._numpy = lambda: None
+            try:
+                condition = mouse_clicker.WaitCondition((0, 0, side, side), reference, 8)
+            finally:
+                mouse_clicker._numpy = saved
+            t0 = time.perf_counter_ns()
+            for _ in range(checks):
+                condition.matches(frame)
+            row[f'{name}_us'] = (time.perf_counter_ns() - t0) / checks / 1e3
+        results['checks'].append(row)
+
+    class TimedBackend(NullBackend):
+        sent_ns = 0
+
+        def send(self, batch):
+            self.sent_ns = time.perf_counter_ns()
+
+    rng = random.Random(1)
+    screen = mouse_clicker.SyntheticFrameSource(320, 200)
+    wait = {'x': 100, 'y': 100, 'type': 'wait', 'color': '#20c040', 'width': 8, 'height': 8, 'milliseconds': 0}
+    click = {'x': 0, 'y': 0, 'type': 'left', 'milliseconds': 0}
+    latencies = []
+    grabs = []
+    for _ in range(rounds):
+        screen.fill(0, 0, 320, 200, (0, 0, 0))
+        backend = TimedBackend()
+        executor = ClickExecutor(backend)
+        executor.capture = mouse_clicker.CaptureCache(screen)
+        executor.clicks = [wait, click]
+        executor.start()
+        time.sleep(rng.uniform(0.005, 0.06))
+        changed_ns = time.perf_counter_ns()
+        screen.fill(96, 96, 8, 8, (0x20, 0xc0, 0x40))
+        executor.thread.join()
+        latencies.append(backend.sent_ns - changed_ns)
+        grabs.append(executor.capture.grabs)
+    latencies.sort()
+    results['reaction'] = {
+        'p50_ms': percentile(latencies, 0.5) / 1e6,
+        'max_ms': latencies[-1] / 1e6,
+        'grabs_per_wait': sum(grabs) / len(grabs),
+    }
+
+    screen.fill(0, 0, 320, 200, (0, 0, 0))
+    cache = mouse_clicker.CaptureCache(screen)
+    executors = []
+    for _ in range(sharing):
+        executor = ClickExecutor(NullBackend())
+        executor.capture = cache
+        executor.clicks = [wait, click]
+        executor.start()
+        executors.append(executor)
+    time.sleep(share_ms / 1000)
+    for executor in executors:
+        executor.stop()
+    polls = cache.grabs + cache.hits
+    results['shared'] = {
+        'executors': sharing,
+        'polls': polls,
+        'grabs': cache.grabs,
+        'polls_per_sec': polls / (share_ms / 1000),
+    }
+    return results
+
+def bench_display_topology(sizes=(1_000, 100_000, 1_000_000), starts=100, rounds=10, interval_ms=2):
+    """
+    Monitor-relative profiles on a synthetic two-monitor layout: placing a
+    whole plan on screen before playback (NumPy vs pure Python) against the
+    per-step transform it replaces, how often the layout is queried over
+    many starts and one display change, and how soon a running sequence
+    clicks at the new position after the monitor moves (step swaps).
+    """
+    Monitor = mouse_clicker.Monitor
+    layout = [Monitor('DISPLAY1', 0, 0, 1920, 1080, 96, True), Monitor('DISPLAY2', 1920, 0, 2560, 1440, 144)]
+    moved = [Monitor('DISPLAY1', 0, 0, 1920, 1080, 96, True), Monitor('DISPLAY2', -3840, 0, 3840, 2160, 144)]
+    anchor = {'monitor': 'DISPLAY2', 'basis': {'width': 2560, 'height': 1440, 'dpi': 144}}
+    results = {'place': []}
+    displays = mouse_clicker.SyntheticDisplays(moved)
+    placement = mouse_clicker.DisplayTopology(displays).placement(anchor)
+    for n in sizes:
+        plan = compile_plan(make_clicks(n))
+        row = {'steps': n}
+        for name, use_numpy in (('numpy', True), ('python', False)):
+            if use_numpy and mouse_clicker._numpy() is None:
+                row[f'{name}_ms'] = None
+                continue
+            saved = mouse_clicker._numpy
+            if not use_numpy:
+                mouse_clicker._numpy = lambda: None
+            try:
+                t0 = time.perf_counter_ns()
+                placement.apply(plan)
+                row[f'{name}_ms'] = (time.perf_counter_ns() - t0) / 1e6
+            finally:
+                mouse_clicker._numpy = saved
+        point = placement.point
+        t0 = time.perf_counter_ns()
+        for x, y in zip(plan.xs, plan.ys):
+            point(x, y)
+        row['per_step_ns'] = (time.perf_counter_ns() - t0) / n
+        results['place'].append(row)
+
+    displays = mouse_clicker.SyntheticDisplays(layout)
+    topology = mouse_clicker.DisplayTopology(displays)
+    clicks = make_clicks(100)
+    for _ in range(starts):
+        executor = ClickExecutor(NullBackend(), VirtualClock())
+        executor.topology = topology
+        executor.anchor = anchor
+        executor.clicks = clicks
+        executor.start()
+        executor.thread.join()
+    displays.set_monitors(moved)
+    displays.set_monitors(layout)
+    executor.start()
+    executor.thread.join()
+    results['queries'] = {'starts': starts + 1, 'display_changes': 2, 'queries': displays.queries}
+
+    class PositionBackend(NullBackend):
+        x = 0
+
+        def prepare(self, x, y, action, count=1, move=True):
+            return x
+
+        def send(self, batch):
+            self.x = batch
+            self.sent_ns = time.perf_counter_ns()
+
+    latencies = []
+    for _ in range(rounds):
+        displays.set_monitors(layout)
+        backend = PositionBackend()
+        executor = ClickExecutor(backend)
+        executor.topology = topology
+        executor.anchor = anchor
+        executor.swap_boundary = 'step'
+        executor.repeat_until_stopped = True
+        executor.clicks = [{'x': 10, 'y': 10, 'type': 'left', 'milliseconds': interval_ms}]
+        executor.start()
+        time.sleep(0.01)
+        changed_ns = time.perf_counter_ns()
+        displays.set_monitors(moved)
+        while backend.x >= 0:
+            time.sleep(0.0002)
+        latencies.append(backend.sent_ns - changed_ns)
+        executor.stop()
+    latencies.sort()
+    results['relocate'] = {'interval_ms': interval_ms, 'p50_ms': percentile(latencies, 0.5) / 1e6,
+                           'max_ms': latencies[-1] / 1e6}
+    return results
+
+_FORMAT_LOAD_SNIPPET = """
+import sys, time
+import mouse_clicker as mc
+mc.CONFIG_DIR = mc.Path(sys.argv[1])
+t0 = time.perf_counter()
+if sys.argv[2] == 'json':
+    plan = mc.compile_plan(mc.load_profile('bench')['clicks'])
+else:
+    plan = mc.open_profile_binary('bench').plan
+print((time.perf_counter() - t0) * 1000)
+"""
+
+def bench_profile_formats(sizes=(10_000, 1_000_000)):
+    """
+    JSON vs binary profiles: file size, and time + peak RSS (fresh process)
+    until the profile is a playable ClickPlan
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    saved_dir = mouse_clicker.CONFIG_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        mouse_clicker.CONFIG_DIR = mouse_clicker.Path(tmp)
+        try:
+            for n in sizes:
+                data = {'hotkey': '`', 'repeat_mode': 'repeat', 'repeat_count': 1, 'clicks': make_clicks(n)}
+                mouse_clicker.save_profile('bench', data)
+                mouse_clicker.save_profile_binary('bench', data)
+                del data
+                result = {'steps': n}
+                for fmt, suffix in (('json', '.json'), ('binary', '.acp')):
+                    proc = subprocess.run(
+                        [sys.executable, '-c', _FORMAT_LOAD_SNIPPET + _RSS_SNIPPET, tmp, fmt],
+                        cwd=here, capture_output=True, text=True, check=True,
+                    )
+                    load_ms, rss_kb = proc.stdout.split()[-2:]
+                    result[fmt] = {
+                        'file_bytes': (mouse_clicker.CONFIG_DIR / f'bench{suffix}').stat().st_size,
+                        'load_ms': float(load_ms),
+                        'peak_rss_kb': int(rss_kb) if int(rss_kb) >= 0 else None,
+                    }
+                results.append(result)
+        finally:
+            mouse_clicker.CONFIG_DIR = saved_dir
+    return results
+
+def bench_gui_refresh(sizes=(1000, 10_000, 100_000), edits=50):
+    """
+    Responsiveness of the GUI click list against a real Listbox: the cost
+    of a full reload, of appending a step and of editing one. Returns None
+    when the GUI stack or a display is unavailable.
+    """
+    try:
+        import tkinter as tk
+        import clicker_gui
+        root = tk.Tk()
+    except Exception:
+        return None
+    root.withdraw()
+
+    def timed(action):
+        t0 = time.perf_counter()
+        action()
+        root.update_idletasks()
+        return (time.perf_counter() - t0) * 1000
+
+    results = []
+    try:
+        for n in sizes:
+            clicks = make_clicks(n)
+            listbox = tk.Listbox(root, height=12)
+            scrollbar = tk.Scrollbar(root)
+            view = clicker_gui.ClickListView(listbox, scrollbar, lambda: clicks)
+            reload_ms = timed(view.reset)
+
+            def append():
+                for _ in range(edits):
+                    clicks.append(dict(clicks[0]))
+                    view.inserted(len(clicks) - 1)
+
+            def update():
+                for i in range(edits):
+                    clicks[i]['milliseconds'] += 1
+                    view.updated(i)
+
+            results.append({
+                'steps': n,
+                'virtual': view.virtual,
+                'reload_ms': reload_ms,
+                'append_ms': timed(append) / edits,
+                'update_ms': timed(update) / edits,
+            })
+            listbox.destroy()
+            scrollbar.destroy()
+    finally:
+        root.destroy()
+    return results
+
+def print_plan_overhead(result):
+    print(f"Per-step overhead on {result['steps']} steps:")
+    print(f"  dict loop:     {result['legacy_ns_per_step']:8.0f} ns/step")
+    print(f"  compiled plan: {result['plan_ns_per_step']:8.0f} ns/step")
+    print(f"  (compile + thread start: {result['compile_ms']:.2f} ms)")
+
+def print_injection(result):
+    print(f"Injection on {result['steps']} steps (fake foreign call):")
+    print(f"  SetCursorPos + mouse_event: {result['legacy_calls_per_step']:.2f} calls, "
+          f"{result['legacy_ns_per_step']:6.0f} ns/step")
+    print(f"  batched SendInput:          {result['batched_calls_per_step']:.2f} calls, "
+          f"{result['batched_ns_per_step']:6.0f} ns/step")
+    print(f"  (prepare batches: {result['prepare_ms']:.2f} ms)")
+
+def print_max_rate(result):
+    print(f"Max sequence rate (no-op backend, virtual clock): {result['steps_per_sec']:,.0f} steps/s")
+
+def print_live_edit(results):
+    print("Live edits during max-rate playback:")
+    for result in results:
+        verdict = 'ok' if result['violations'] == 0 and result['final_version_played'] else 'FAILED'
+        print(f"  {result['boundary']:5s}: {result['edits_per_sec']:8,.0f} edits/s, "
+              f"{result['steps_per_sec']:10,.0f} steps/s, {result['applied']} swaps, "
+              f"swap latency p50 {result['swap_latency_p50_us']:7.1f} us max {result['swap_latency_max_us']:8.1f} us, "
+              f"{result['violations']} violations ({verdict})")
+
+def print_jitter(result):
+    print("Step jitter (interval + position):")
+    for row in result['cycles']:
+        cells = []
+        for name in ('numpy', 'python'):
+            ms = row[f'{name}_cycle_ms']
+            cells.append(f"{name} {ms:8.3f} ms" if ms is not None else f"{name} {'n/a':>8s}   ")
+        print(f"  {row['steps']:7,d}-step cycle: " + ', '.join(cells))
+    rates = result['steps_per_sec']
+    print(f"  max sequence rate: {rates['plain']:,.0f} steps/s plain, {rates['jitter']:,.0f} steps/s jittered")
+
+def print_stop_latency(results):
+    print("Stop latency (real clock, stop() until the thread exits):")
+    for result in results:
+        verdict = 'ok' if result['within_limit'] else 'SLOW'
+        print(f"  {result['mode']:11s} {result['interval_ms']:6d} ms interval: "
+              f"p50 {result['stop_p50_ms']:6.3f} ms, max {result['stop_max_ms']:6.3f} ms, "
+              f"{result['clicks_after_stop']} clicks after stop ({verdict})")
+
+def print_control_latency(results):
+    print("Control server, command to action over loopback TCP (real clock):")
+    for result in results:
+        verdict = 'ok' if result['within_limit'] else 'SLOW'
+        print(f"  {result['cmd']:7s} p50 {result['p50_ms']:6.3f} ms, p99 {result['p99_ms']:6.3f} ms ({verdict})")
+
+def print_window_dispatch(results):
+    print("Window-targeted dispatch, concurrent profiles (fake windows, real clock):")
+    for result in results:
+        line = (f"  {result['profiles']:3d} profiles @ {result['interval_ms']:2d} ms: "
+                f"{result['steps_per_sec']:10,.0f} steps/s, {result['lookups_per_profile']:.0f} lookup/profile")
+        if 'lateness_p99_us' in result:
+            line += f", worst late p99 {result['lateness_p99_us']:8.1f} us"
+        print(line)
+
+def print_burst_rate(results):
+    print("Burst mode (no-op backend, real clock):")
+    for result in results:
+        print(f"  target {result['target_cps']:11,.0f}/s: achieved {result['achieved_cps']:13,.1f}/s, "
+              f"{result['sends_per_sec']:9,.0f} sends/s ({'stable' if result['stable'] else 'unstable'})")
+    stable = [result['target_cps'] for result in results if result['stable']]
+    if stable:
+        print(f"  highest stable rate: {max(stable):,.0f} clicks/s")
+
+def print_timing_error(results):
+    print("Timing error (real clock):")
+    for result in results:
+        print(f"  {result['interval_ms']:3d} ms: achieved {result['achieved_interval_ms']:8.4f} ms "
+              f"({result['rate_error_percent']:+.3f}%), late p99 {result['lateness_p99_us']:7.1f} us, "
+              f"max {result['lateness_max_us']:7.1f} us")
+
+def print_profile_io(results):
+    print("Profile I/O (JSON):")
+    for result in results:
+        print(f"  {result['steps']:9,d} steps: {result['file_bytes'] / 1e6:9.2f} MB, "
+              f"save {result['save_ms']:9.1f} ms, load {result['load_ms']:9.1f} ms")
+
+def print_profile_switch(results):
+    print("Profile switch into a running sequence (caller's cost):")
+    for result in results[:-1]:
+        print(f"  {result['steps']:7,d} steps: uncached {result['uncached_p50_ms']:8.3f} ms, "
+              f"cached {result['cached_p50_ms']:6.3f} ms (max {result['cached_max_ms']:6.3f} ms)")
+    listing = results[-1]
+    print(f"  listing {listing['profiles']} profiles: first scan {listing['scan_ms']:.3f} ms, "
+          f"unchanged directory {listing['rescan_ms']:.3f} ms")
+
+def print_blocks(results):
+    print("Compact sequences (flat list vs loop block + step repeat):")
+    for result in results:
+        flat, blocks = result['flat'], result['blocks']
+        print(f"  {result['steps']:9,d} steps: JSON {flat['json_bytes'] / 1e3:9.1f} kB vs {blocks['json_bytes'] / 1e3:5.2f} kB, "
+              f"compile {flat['compile_ms']:8.2f} ms vs {blocks['compile_ms']:6.2f} ms{' (streamed)' if blocks.get('streamed') else ''}, "
+              f"{result['events_per_step']:.2f} events/step ({result['events_per_step_moving']:.2f} moving every step)")
+
+def print_wait_condition(results):
+    print("Wait steps (synthetic screen):")
+    for row in results['checks']:
+        cells = []
+        for name in ('numpy', 'python'):
+            us = row[f'{name}_us']
+            cells.append(f"{name} {us:8.2f} us" if us is not None else f"{name} {'n/a':>8s}   ")
+        print(f"  {row['side']:3d}x{row['side']:<3d} region check: " + ', '.join(cells))
+    reaction = results['reaction']
+    print(f"  region change to click: p50 {reaction['p50_ms']:6.3f} ms, max {reaction['max_ms']:6.3f} ms "
+          f"({reaction['grabs_per_wait']:.1f} grabs per wait)")
+    shared = results['shared']
+    print(f"  {shared['executors']} executors on one region: {shared['polls_per_sec']:,.0f} polls/s, "
+          f"{shared['grabs']} grabs for {shared['polls']} polls")
+
+def print_display_topology(results):
+    print("Monitor-relative coordinates (synthetic layout):")
+    for row in results['place']:
+        cells = []
+        for name in ('numpy', 'python'):
+            ms = row[f'{name}_ms']
+            cells.append(f"{name} {ms:8.3f} ms" if ms is not None else f"{name} {'n/a':>8s}   ")
+        print(f"  place {row['steps']:9,d} steps: " + ', '.join(cells)
+              + f" (per-step transform {row['per_step_ns']:.0f} ns/step)")
+    queries = results['queries']
+    print(f"  {queries['starts']} starts, {queries['display_changes']} display changes: "
+          f"{queries['queries']} layout queries")
+    relocate = results['relocate']
+    print(f"  monitor moved to click at new position ({relocate['interval_ms']} ms steps): "
+          f"p50 {relocate['p50_ms']:6.3f} ms, max {relocate['max_ms']:6.3f} ms")
+
+def print_profile_formats(results):
+    print("Profile formats (fresh process, load until playable):")
+    for result in results:
+        for fmt in ('json', 'binary'):
+            r = result[fmt]
+            rss = f"{r['peak_rss_kb'] / 1024:7.1f} MB" if r['peak_rss_kb'] else '    n/a'
+            print(f"  {result['steps']:9,d} steps {fmt:6s}: {r['file_bytes'] / 1e6:8.2f} MB file, "
+                  f"load {r['load_ms']:9.1f} ms, peak RSS {rss}")
+
+def print_independent(results):
+    print("Independent mode, one thread (real clock, 100 ms per target, 100 us spin):")
+    for result in results:
+        print(f"  {result['targets']:4d} targets: {result['clicks']:5d}/{result['expected_clicks']:5d} clicks, "
+              f"late p50 {result['lateness_p50_us']:7.1f} us p99 {result['lateness_p99_us']:7.1f} us, "
+              f"CPU {result['cpu_percent']:5.1f}% ({result['cpu_us_per_click']:.1f} us/click)")
+
+def print_gui_refresh(results):
+    print("GUI click list (ClickListView):")
+    if results is None:
+        print("  unavailable (no display or GUI dependencies)")
+        return
+    for result in results:
+        mode = 'virtual' if result['virtual'] else 'direct'
+        print(f"  {result['steps']:7,d} steps ({mode:7s}): reload {result['reload_ms']:8.1f} ms, "
+              f"append {result['append_ms']:6.2f} ms, edit {result['update_ms']:6.2f} ms")
+
+def print_startup(results):
+    print("Cold start (interpreter + imports):")
+    for name, result in results.items():
+        if result is None:
+            print(f"  {name:9s} unavailable (imports failed)")
+            continue
+        rss = f"{result['peak_rss_kb'] / 1024:.1f} MB" if result['peak_rss_kb'] else 'n/a'
+        print(f"  {name:9s} {result['startup_ms']:7.1f} ms, peak RSS {rss}")
+
+# name -> (benchmark, printer, kwargs for --quick)
+BENCHMARKS = {
+    'plan_overhead': (bench_plan_overhead, print_plan_overhead, {}),
+    'injection': (bench_injection, print_injection, {}),
+    'max_rate': (bench_max_rate, print_max_rate, {'n': 20_000}),
+    'live_edit': (bench_live_edit, print_live_edit, {'edits': 200}),
+    'jitter': (bench_jitter, print_jitter, {'sizes': (100, 10_000), 'n': 20_000}),
+    'stop_latency': (bench_stop_latency, print_stop_latency, {'rounds': 5}),
+    'control_latency': (bench_control_latency, print_control_latency, {'rounds': 20}),
+    'window_dispatch': (bench_window_dispatch, print_window_dispatch, {'profile_counts': (1, 4), 'duration': 0.3}),
+    'burst_rate': (bench_burst_rate, print_burst_rate, {'targets': (1_000, 100_000), 'duration': 0.2}),
+    'timing_error': (bench_timing_error, print_timing_error, {'duration': 0.2}),
+    'independent': (bench_independent, print_independent, {'target_counts': (1, 100), 'duration': 0.5}),
+    'profile_io': (bench_profile_io, print_profile_io, {'sizes': (10, 10_000)}),
+    'profile_switch': (bench_profile_switch, print_profile_switch, {'profiles': 20, 'switches': 10}),
+    'blocks': (bench_blocks, print_blocks, {'outer': (1, 100, 400)}),
+    'wait_condition': (bench_wait_condition, print_wait_condition, {'rounds': 8, 'share_ms': 100}),
+    'display_topology': (bench_display_topology, print_display_topology, {'sizes': (1_000, 100_000), 'rounds': 5}),
+    'profile_formats': (bench_profile_formats, print_profile_formats, {'sizes': (10_000, 100_000)}),
+    'gui_refresh': (bench_gui_refresh, print_gui_refresh, {'sizes': (1000, 10_000), 'edits': 10}),
+    'startup': (bench_startup, print_startup, {'rounds': 2}),
+}
+
+def flatten(value, prefix=''):
+    """{'a': [{'b': 1}]} -> {'a.0.b': 1} for numeric leaves"""
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = enumerate(value)
+    else:
+        return {prefix: value} if isinstance(value, (int, float)) and not isinstance(value, bool) else {}
+    flat = {}
+    for key, item in items:
+        flat.update(flatten(item, f'{prefix}.{key}' if prefix else str(key)))
+    return flat
+
+def compare(old_report, new_report):
+    """Print relative change of every numeric result present in both reports"""
+    old = flatten(old_report['results'])
+    new = flatten(new_report['results'])
+    print(f"Compared with {old_report.get('version', '?')}:")
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        change = f'{(after - before) / before * 100:+7.1f}%' if before else '    n/a'
+        print(f'  {key:50s} {before:14.3f} -> {after:14.3f} {change}')
+
+def git_version():
+    """Short commit hash of the working tree, or 'unknown'"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Click engine benchmarks')
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help='run only these benchmarks')
+    parser.add_argument('--quick', action='store_true', help='smaller sizes and shorter runs')
+    parser.add_argument('--json', metavar='FILE', help='write machine-readable results to FILE')
+    parser.add_argument('--compare', metavar='FILE', help='compare against results from an earlier --json run')
+    args = parser.parse_args(argv)
+
+    report = {
+        'version': git_version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'quick': args.quick,
+        'results': {},
+    }
+    for name in args.only or BENCHMARKS:
+        bench, printer, quick_kwargs = BENCHMARKS[name]
+        result = bench(**quick_kwargs) if args.quick else bench()
+        report['results'][name] = result
+        printer(result)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,17 @@
 """
 Build script to create standalone .exe using PyInstaller
 Run this once to create the executable.
+
+    python build_exe.py            # single-file MouseClicker.exe
+    python build_exe.py --onedir   # folder build: no unpack step on each launch
 """
 
+import argparse
 import subprocess
 import sys
 import os
 
-def build_exe():
+def build_exe(onedir=False):
     """Build the mouse clicker executable"""
     
     # Check if PyInstaller is installed
@@ -23,23 +27,33 @@ def build_exe():
     # Build command
     cmd = [
         sys.executable, "-m", "PyInstaller",
-        "--onefile",
+        "--onedir" if onedir else "--onefile",
         "--windowed",
         "--icon=NONE",
         "--name=MouseClicker",
         "--distpath=./dist",
         "--workpath=./build",
         "--specpath=./build",
+        # NumPy is optional everywhere (jitter tables, wait-step tolerance
+        # checks, anchor placement) and would add tens of MB; the executable
+        # always takes the pure-Python paths
+        "--exclude-module=numpy",
         "mouse_clicker.py"
     ]
     
     try:
         subprocess.run(cmd, check=True)
         print("\n✓ Build successful!")
-        print("Executable location: ./dist/MouseClicker.exe")
+        if onedir:
+            print("Executable location: ./dist/MouseClicker/MouseClicker.exe")
+        else:
+            print("Executable location: ./dist/MouseClicker.exe")
     except subprocess.CalledProcessError as e:
         print(f"\n✗ Build failed: {e}")
         sys.exit(1)
 
 if __name__ == '__main__':
-    build_exe()
+    parser = argparse.ArgumentParser(description='Build MouseClicker with PyInstaller')
+    parser.add_argument('--onedir', action='store_true',
+                        help='build a folder instead of a single file (faster startup)')
+    build_exe(parser.parse_args().onedir)
@@ -0,0 +1,506 @@
+"""
+AutoClicker control server - drive a ClickExecutor over a local socket
+Imported lazily by mouse_clicker.main() (--control / --serve), so normal
+runs never load asyncio.
+
+The protocol is line-delimited JSON. Every request is one object with a
+'cmd' and an optional 'id' that is echoed in the reply:
+    {"id": 1, "cmd": "load", "profile": "Profile 1"}
+    {"id": 1, "ok": true, "profile": "Profile 1", "steps": 12}
+Failed requests get {"ok": false, "error": "..."}. Commands:
+    load        {"profile", "repeat"?, "until_stopped"?}  (only while idle)
+    start, stop, pause, resume, status
+    edit        {"clicks": [...]}                replace the click list
+                {"index", "click": {...}}        change keys of one step
+                {"index", "insert": {...}}       insert a step
+                {"index", "delete": true}        delete a step
+    subscribe   {"interval"?}  metrics lines {"event": "metrics", ...}
+                               every interval seconds (default 0.25)
+    unsubscribe
+
+The server runs its own event loop on a daemon thread and calls the
+executor's thread-safe methods directly, so a command costs one socket
+round trip plus the method itself and never waits on the Tk main loop.
+start and stop, which may join the executor thread, run on the loop's
+worker threads, so they never hold up other connections or metrics.
+Edits go through update_clicks() and reach a running sequence at its next
+swap boundary. There is no authentication: the server only listens on
+loopback TCP or on a Unix socket.
+
+    python clicker_control.py 127.0.0.1:8765 start
+    python clicker_control.py 127.0.0.1:8765 edit '{"index": 0, "click": {"x": 10}}'
+    python clicker_control.py 127.0.0.1:8765 subscribe '{"interval": 1}'
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+from collections import deque
+
+from mouse_clicker import (
+    STEP_TYPES, ClickExecutor, ClickPlan, PostMessageBackend, RunTelemetry, configure_executor, is_block,
+    load_run_profile, window_backend,
+)
+
+DEFAULT_CONTROL_ADDRESS = '127.0.0.1:8765'
+
+# Hosts the TCP server may bind: the protocol has no authentication
+LOOPBACK_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+# Longest request line (a full click list sent with 'edit')
+CONTROL_LINE_LIMIT = 64 * 1024 * 1024
+
+CONTROL_COMMANDS = ('load', 'start', 'stop', 'pause', 'resume', 'status', 'edit', 'subscribe', 'unsubscribe')
+
+# Fastest metrics stream a subscriber may ask for
+MIN_METRICS_INTERVAL_S = 0.01
+
+def parse_address(address):
+    """
+    ('tcp', host, port) for 'host:port' or a bare port, ('unix', path) for
+    anything that looks like a path
+    """
+    if os.sep in address or '/' in address or address.endswith('.sock'):
+        return 'unix', address
+    host, _, port = address.rpartition(':')
+    host = host.strip('[]') or '127.0.0.1'
+    if host not in LOOPBACK_HOSTS:
+        raise ValueError(f'The control server only listens on loopback, not {host!r}')
+    try:
+        return 'tcp', host, int(port)
+    except ValueError:
+        raise ValueError(f'Not a host:port or socket path: {address!r}') from None
+
+def run_metrics(executor):
+    """Metrics event for executor: state and counters, plus telemetry when it has any"""
+    metrics = {
+        'event': 'metrics',
+        'state': executor.state,
+        'steps_done': executor.steps_done,
+        'max_lateness_ns': executor.max_lateness_ns,
+    }
+    if executor.achieved_cps is not None:
+        metrics['achieved_cps'] = executor.achieved_cps
+    telemetry = executor.telemetry
+    if telemetry is not None and telemetry.count:
+        metrics.update(telemetry.snapshot())
+    return metrics
+
+def edited_clicks(clicks, request):
+    """New click list for an 'edit' request; clicks itself is left untouched"""
+    if 'clicks' in request:
+        edited = request['clicks']
+        if not isinstance(edited, list):
+            raise ValueError("'clicks' must be a list")
+    else:
+        if not isinstance(clicks, list):
+            raise ValueError('Only a click list can be edited step by step')
+        edited = list(clicks)
+        index = int(request['index'])
+        if 'insert' in request:
+            edited.insert(index, request['insert'])
+        elif request.get('delete'):
+            del edited[index]
+        else:
+            edited[index] = {**edited[index], **request['click']}
+    for click in edited:
+        if isinstance(click, dict) and is_block(click):
+            continue  # Checked when compiled
+        if (not isinstance(click, dict) or not isinstance(click.get('x'), int)
+                or not isinstance(click.get('y'), int) or click.get('type') not in STEP_TYPES):
+            raise ValueError(f"A click needs integer x and y and a type ({', '.join(STEP_TYPES)}): {click!r}")
+    return edited
+
+def encode(message):
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+class ControlConnection:
+    """Per-client state: the writer and its metrics stream, if subscribed"""
+    def __init__(self, writer):
+        self.writer = writer
+        self.stream = None
+
+    def unsubscribe(self):
+        if self.stream is not None:
+            self.stream.cancel()
+            self.stream = None
+
+class ControlServer:
+    """
+    Serves the control protocol for one executor on a background thread.
+    start() binds (raising OSError / ValueError if it cannot) and returns
+    once the server accepts connections; close() shuts it down.
+
+    loads counts profiles loaded remotely and loaded_data holds the last
+    one's settings, so a GUI can poll for them from its own thread.
+    """
+    def __init__(self, executor, address=DEFAULT_CONTROL_ADDRESS):
+        self.executor = executor
+        self.address = address
+        self.kind = parse_address(address)
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.error = None
+        self.connections = set()
+        self.mapped = None  # MappedProfile behind the loaded steps
+        self.loads = 0
+        self.loaded_data = None
+
+    @property
+    def port(self):
+        """Bound TCP port (useful when the address asked for port 0)"""
+        if self.server is None or self.kind[0] != 'tcp':
+            return None
+        return self.server.sockets[0].getsockname()[1]
+
+    # ---- lifecycle ----
+
+    def start(self):
+        """Bind and start serving on a daemon thread"""
+        if self.thread is not None:
+            return
+        self.ready.clear()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.error is not None:
+            self.thread.join()
+            self.thread = None
+            raise self.error
+
+    def _listen(self):
+        if self.kind[0] == 'unix':
+            if not hasattr(asyncio, 'start_unix_server'):
+                raise ValueError('Unix sockets are not available here; use a host:port address')
+            return asyncio.start_unix_server(self._handle, self.kind[1], limit=CONTROL_LINE_LIMIT)
+        return asyncio.start_server(self._handle, self.kind[1], self.kind[2], limit=CONTROL_LINE_LIMIT)
+
+    def _run(self):
+        loop = self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            self.server = loop.run_until_complete(self._listen())
+        except (OSError, ValueError) as e:
+            self.error = e
+            self.ready.set()
+            loop.close()
+            return
+        self.ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self.server.close()
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+            if self.kind[0] == 'unix':
+                try:
+                    os.unlink(self.kind[1])
+                except OSError:
+                    pass
+
+    def close(self):
+        """
+        Stop serving (the executor keeps running) and release a loaded
+        binary profile, at once if no run is playing it
+        """
+        if self.thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.thread = None
+        self.server = None
+        thread = self.executor.thread
+        if thread is not None and thread.is_alive():
+            # The run may still be reading the mapped plan: leave the mapping
+            # to go away with its last reference, like an evicted ProfileEntry
+            self.mapped = None
+        else:
+            self.release_mapped()
+
+    def release_mapped(self):
+        """Close the MappedProfile of the last load, once the executor has let go of it"""
+        if self.mapped is None:
+            return
+        executor = self.executor
+        if executor.clicks is self.mapped.plan:
+            executor.clicks = []
+        executor.plan = executor.batches = executor.pending = executor.prepared = None
+        executor.jitter_generator = None
+        self.mapped.close()
+        self.mapped = None
+
+    # ---- connections ----
+
+    async def _handle(self, reader, writer):
+        conn = ControlConnection(writer)
+        self.connections.add(conn)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(encode(await self.dispatch(line, conn)))
+                await writer.drain()
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            # ValueError: a request line longer than CONTROL_LINE_LIMIT
+            pass
+        except asyncio.CancelledError:
+            # Server shutdown; end normally, as Python 3.11's stream callback
+            # reports a cancelled connection task as an error
+            pass
+        finally:
+            conn.unsubscribe()
+            self.connections.discard(conn)
+            writer.close()
+
+    async def dispatch(self, line, conn):
+        """Run one request line and return the reply"""
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('A request must be a JSON object')
+            request_id = request.get('id')
+            cmd = request.get('cmd')
+            if cmd not in CONTROL_COMMANDS:
+                raise ValueError(f'Unknown command: {cmd!r}')
+            result = getattr(self, f'cmd_{cmd}')(request, conn)
+            if asyncio.iscoroutine(result):
+                result = await result
+            reply = {'ok': True, **(result or {})}
+        except KeyError as e:
+            reply = {'ok': False, 'error': f'Missing field: {e}'}
+        except (ValueError, TypeError, IndexError, OSError) as e:
+            reply = {'ok': False, 'error': str(e) or type(e).__name__}
+        if request_id is not None:
+            reply['id'] = request_id
+        return reply
+
+    async def _stream_metrics(self, writer, interval):
+        while True:
+            writer.write(encode(run_metrics(self.executor)))
+            await writer.drain()
+            await asyncio.sleep(interval)
+
+    # ---- commands ----
+
+    def cmd_load(self, request, conn):
+        executor = self.executor
+        if executor.running:
+            raise ValueError('Stop the run before loading a profile')
+        name = request['profile']
+        loaded = load_run_profile(name)
+        if loaded is None:
+            raise ValueError(f'Profile not found or empty: {name}')
+        data, steps, mapped = loaded
+        try:
+            backend = window_backend(data.get('window'))
+        except ValueError:
+            if mapped is not None:
+                mapped.close()
+            raise
+        self.release_mapped()
+        self.mapped = mapped
+        configure_executor(executor, data, request.get('repeat'), request.get('until_stopped'))
+        executor.clicks = steps
+        # Keep a caller-supplied backend unless the profile asks for a window
+        if backend is not None or isinstance(executor.backend, PostMessageBackend):
+            executor.backend = backend
+        self.loaded_data = data
+        self.loads += 1
+        return {'profile': name, 'steps': len(steps) if isinstance(steps, (list, ClickPlan)) else None}
+
+    def blocking(self, call):
+        """Run a blocking executor call on a worker thread (awaitable)"""
+        return asyncio.get_running_loop().run_in_executor(None, call)
+
+    async def cmd_start(self, request, conn):
+        # start() may wait for the last run to wind down
+        await self.blocking(self.executor.start)
+        return {'state': self.executor.state}
+
+    async def cmd_stop(self, request, conn):
+        stopped = await self.blocking(self.executor.stop)
+        return {'stopped': stopped, 'steps_done': self.executor.steps_done}
+
+    def cmd_pause(self, request, conn):
+        self.executor.pause()
+        return {'state': self.executor.state}
+
+    def cmd_resume(self, request, conn):
+        self.executor.resume()
+        return {'state': self.executor.state}
+
+    def cmd_status(self, request, conn):
+        metrics = run_metrics(self.executor)
+        del metrics['event']
+        return metrics
+
+    def cmd_edit(self, request, conn):
+        clicks = edited_clicks(self.executor.clicks, request)
+        self.executor.update_clicks(clicks)
+        return {'steps': len(clicks)}
+
+    def cmd_subscribe(self, request, conn):
+        interval = max(float(request.get('interval', 0.25)), MIN_METRICS_INTERVAL_S)
+        conn.unsubscribe()
+        conn.stream = asyncio.ensure_future(self._stream_metrics(conn.writer, interval))
+        return {'interval': interval}
+
+    def cmd_unsubscribe(self, request, conn):
+        conn.unsubscribe()
+
+# ============================================================================
+# Reference Client
+# ============================================================================
+
+class ControlClient:
+    """
+    Blocking client for the control protocol. request() sends one command
+    and returns its reply, raising RuntimeError if the server refused it;
+    metrics events that arrive meanwhile are queued for events().
+    """
+    def __init__(self, address=DEFAULT_CONTROL_ADDRESS, timeout=5.0):
+        kind = parse_address(address)
+        if kind[0] == 'unix':
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(timeout)
+            sock.connect(kind[1])
+        else:
+            sock = socket.create_connection(kind[1:], timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self.reader = sock.makefile('rb')
+        self.next_id = 1
+        self.pending_events = deque()
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def send(self, cmd, **fields):
+        """Send a command without waiting; returns its id"""
+        request_id = self.next_id
+        self.next_id += 1
+        self.sock.sendall(encode({'id': request_id, 'cmd': cmd, **fields}))
+        return request_id
+
+    def read(self):
+        """Next message from the server"""
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('Control server closed the connection')
+        return json.loads(line)
+
+    def request(self, cmd, **fields):
+        request_id = self.send(cmd, **fields)
+        while True:
+            message = self.read()
+            if message.get('id') == request_id:
+                break
+            if 'event' in message:
+                self.pending_events.append(message)
+        if not message['ok']:
+            raise RuntimeError(message['error'])
+        return message
+
+    def events(self):
+        """Metrics events, queued ones first, until the connection closes"""
+        # Events come at the subscriber's interval, which may exceed the timeout
+        self.sock.settimeout(None)
+        while True:
+            while self.pending_events:
+                yield self.pending_events.popleft()
+            message = self.read()
+            if 'event' in message:
+                yield message
+
+    def load(self, profile, **fields):
+        return self.request('load', profile=profile, **fields)
+
+    def start(self):
+        return self.request('start')
+
+    def stop(self):
+        return self.request('stop')
+
+    def pause(self):
+        return self.request('pause')
+
+    def resume(self):
+        return self.request('resume')
+
+    def status(self):
+        return self.request('status')
+
+    def edit(self, **fields):
+        return self.request('edit', **fields)
+
+    def subscribe(self, interval=0.25):
+        """Start the metrics stream and return its events()"""
+        self.request('subscribe', interval=interval)
+        return self.events()
+
+def serve(address=DEFAULT_CONTROL_ADDRESS):
+    """Serve a fresh executor without the GUI until Ctrl+C. Returns a process exit code."""
+    executor = ClickExecutor()
+    executor.telemetry = RunTelemetry()
+    server = ControlServer(executor, address)
+    try:
+        server.start()
+    except (OSError, ValueError) as e:
+        print(f'Cannot serve on {address}: {e}', file=sys.stderr)
+        return 1
+    where = f'{server.kind[1]}:{server.port}' if server.kind[0] == 'tcp' else server.kind[1]
+    print(f'Control server listening on {where} (Ctrl+C to quit)')
+    try:
+        while server.thread.is_alive():
+            server.thread.join(0.1)
+    except KeyboardInterrupt:
+        pass
+    executor.stop()
+    server.close()
+    return 0
+
+def main(argv=None):
+    """Send one command: clicker_control.py ADDRESS CMD [JSON-FIELDS]"""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='clicker_control', description='Send a command to a running clicker')
+    parser.add_argument('address', help='host:port or Unix socket path of the control server')
+    parser.add_argument('cmd', choices=CONTROL_COMMANDS)
+    parser.add_argument('fields', nargs='?', default='{}', help='JSON object with the command fields')
+    args = parser.parse_args(argv)
+
+    try:
+        fields = json.loads(args.fields)
+        with ControlClient(args.address) as client:
+            if args.cmd == 'subscribe':
+                for event in client.subscribe(**fields):
+                    print(json.dumps(event))
+                return 0
+            print(json.dumps(client.request(args.cmd, **fields)))
+    except (OSError, ValueError, RuntimeError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
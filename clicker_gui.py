@@ -0,0 +1,1078 @@
+"""
+AutoClicker GUI - Tkinter front end for the click engine in mouse_clicker.py
+Imported lazily by mouse_clicker.main() so headless runs never load tkinter,
+keyboard or pynput
+"""
+
+import tkinter as tk
+from tkinter import filedialog, ttk
+import threading
+from pynput import mouse as pynput_mouse
+
+from mouse_clicker import (
+    CONFIG_DIR, PAUSED, STEP_TYPES, ClickExecutor, HotkeyDispatcher, MacroRecorder, ProfileLibrary, RunTelemetry,
+    apply_burst_settings, default_capture_cache, default_display_topology, default_window_cache,
+    install_keyboard_hook, is_block, map_click_points, parse_color, save_profile, window_backend,
+)
+
+# How often the stats panel polls the executor's telemetry
+STATS_REFRESH_MS = 500
+
+# Click lists longer than this are shown through a virtualized window of rows
+VIRTUAL_LIST_THRESHOLD = 2000
+
+# Monitor choice for coordinates that are not relative to any monitor
+ABSOLUTE = 'absolute'
+
+def anchor_label(anchor):
+    """Monitor field text for a profile's 'anchor'"""
+    if not anchor:
+        return ABSOLUTE
+    if anchor.get('window'):
+        return f"window {anchor['window'].get('title') or anchor['window'].get('class')}"
+    return str(anchor.get('monitor', 'primary'))
+
+# ============================================================================
+# Click List View
+# ============================================================================
+
+def format_click_row(idx, click):
+    """Listbox text for one click or block"""
+    if 'loop' in click:
+        return f"{idx+1}. LOOP x{click.get('count', 1)}: {len(click['loop'])} entries"
+    if 'call' in click:
+        return f"{idx+1}. CALL {click['call']} x{click.get('count', 1)}"
+    if 'define' in click:
+        return f"{idx+1}. DEFINE {click['define']}: {len(click['steps'])} entries"
+    minutes = click.get('minutes', 0)
+    seconds = click.get('seconds', 0)
+    milliseconds = click.get('milliseconds', 100)
+    interval = f"{minutes}m {seconds}s {milliseconds}ms"
+    jitter = ''
+    if click['type'] == 'wait':
+        target = 'patch' if 'patch' in click else click.get('color', '?')
+        if not isinstance(target, str):
+            target = '#%02x%02x%02x' % tuple(target)
+        jitter = f" for {target}"
+        if click.get('tolerance'):
+            jitter += f" \u00b1{click['tolerance']}"
+        if click.get('timeout_ms'):
+            jitter += f" <={click['timeout_ms']}ms then {click.get('on_timeout', 'continue')}"
+    elif click.get('jitter_ms') or click.get('jitter_px'):
+        jitter = f" ~{click.get('jitter_ms', 0)}ms/{click.get('jitter_px', 0)}px"
+    repeat = f" x{click['repeat']}" if 'repeat' in click else ''
+    return f"{idx+1}. ({click['x']},{click['y']}) {click['type'].upper()}{repeat} {interval}{jitter}"
+
+class ClickListView:
+    """
+    Keeps a Listbox in step with a click list without rebuilding it.
+
+    Short lists live in the Listbox and are edited row by row (inserted /
+    updated / deleted). Lists longer than `threshold` switch to a virtualized
+    view: the Listbox only holds the visible window of rows, text is
+    formatted when a row scrolls into view, and the scrollbar is driven
+    by this class. There an edit costs O(visible rows), not O(n). In the
+    direct view an insert or delete renumbers the rows after it, which
+    `threshold` bounds.
+    """
+    def __init__(self, listbox, scrollbar, get_clicks, threshold=VIRTUAL_LIST_THRESHOLD):
+        self.listbox = listbox
+        self.scrollbar = scrollbar
+        self.get_clicks = get_clicks
+        self.threshold = threshold
+        self.virtual = False
+        self.top = 0
+        self.selected = None
+        self.shown = None  # Click list the rows were last drawn from
+        listbox.bind('<MouseWheel>', self._on_wheel, add=True)
+        listbox.bind('<Button-4>', lambda event: self._on_wheel(event, -1), add=True)
+        listbox.bind('<Button-5>', lambda event: self._on_wheel(event, 1), add=True)
+        self._use_direct()
+
+    # ---- mode switching ----
+
+    def _use_direct(self):
+        self.virtual = False
+        self.listbox.config(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.config(command=self.listbox.yview)
+
+    def _use_virtual(self):
+        self.virtual = True
+        self.listbox.config(yscrollcommand='')
+        self.scrollbar.config(command=self._on_scroll)
+
+    def _rows(self):
+        return int(self.listbox.cget('height'))
+
+    # ---- edits ----
+
+    def reset(self):
+        """Reload everything (after loading a profile or recording)"""
+        clicks = self.shown = self.get_clicks()
+        self.selected = None
+        self.top = 0
+        self.listbox.delete(0, tk.END)
+        if len(clicks) > self.threshold:
+            self._use_virtual()
+            self._render()
+        else:
+            self._use_direct()
+            self.listbox.insert(tk.END, *[format_click_row(idx, click) for idx, click in enumerate(clicks)])
+
+    def inserted(self, index):
+        """A click was inserted at index"""
+        clicks = self.shown = self.get_clicks()
+        if not self.virtual and len(clicks) > self.threshold:
+            self.reset()
+            return
+        if self.virtual:
+            if self.selected is not None and self.selected >= index:
+                self.selected += 1
+            if index == len(clicks) - 1:
+                # Follow appends like a normal list would
+                self.top = max(0, len(clicks) - self._rows())
+            self._render()
+            return
+        self.listbox.insert(index, format_click_row(index, clicks[index]))
+        self._renumber(index + 1)
+        self.listbox.see(index)
+
+    def updated(self, index):
+        """The click at index changed"""
+        self.shown = self.get_clicks()
+        if self.virtual:
+            if self.top <= index < self.top + self._rows():
+                self._render()
+            return
+        self.listbox.delete(index)
+        self.listbox.insert(index, format_click_row(index, self.get_clicks()[index]))
+
+    def deleted(self, index):
+        """The click at index was removed"""
+        self.shown = self.get_clicks()
+        if self.virtual:
+            if self.selected == index:
+                self.selected = None
+            elif self.selected is not None and self.selected > index:
+                self.selected -= 1
+            if len(self.get_clicks()) <= self.threshold:
+                self.reset()
+            else:
+                self._render()
+            return
+        self.listbox.delete(index)
+        self._renumber(index)
+
+    def _renumber(self, start):
+        """Rewrite rows from start on, whose numbers shifted (direct view only)"""
+        clicks = self.get_clicks()
+        if start >= len(clicks):
+            return
+        # One delete and one insert rather than two calls per row; the view
+        # is put back where it was, as the delete may have scrolled it
+        view = self.listbox.yview()[0]
+        self.listbox.delete(start, tk.END)
+        self.listbox.insert(tk.END, *[format_click_row(idx, clicks[idx]) for idx in range(start, len(clicks))])
+        self.listbox.yview_moveto(view)
+
+    def selected_index(self):
+        """Absolute index of the selected click, or None"""
+        selection = self.listbox.curselection()
+        if not selection:
+            return None
+        index = selection[0] + (self.top if self.virtual else 0)
+        self.selected = index
+        return index
+
+    # ---- virtual window ----
+
+    def _render(self):
+        clicks = self.get_clicks()
+        rows = self._rows()
+        total = len(clicks)
+        self.top = max(0, min(self.top, total - rows))
+        end = min(total, self.top + rows)
+        self.listbox.delete(0, tk.END)
+        self.listbox.insert(tk.END, *[format_click_row(idx, clicks[idx]) for idx in range(self.top, end)])
+        if self.selected is not None and self.top <= self.selected < end:
+            self.listbox.selection_set(self.selected - self.top)
+        if total:
+            self.scrollbar.set(self.top / total, end / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _scroll_to(self, top):
+        if top != self.top:
+            self.top = top
+            self._render()
+
+    def _on_scroll(self, *args):
+        total = len(self.get_clicks())
+        rows = self._rows()
+        if args[0] == 'moveto':
+            self._scroll_to(int(float(args[1]) * total))
+        elif args[0] == 'scroll':
+            amount = int(args[1]) * (rows if args[2] == 'pages' else 1)
+            self._scroll_to(max(0, min(self.top + amount, total - rows)))
+
+    def _on_wheel(self, event, direction=None):
+        if not self.virtual:
+            return None
+        if direction is None:
+            direction = -1 if event.delta > 0 else 1
+        self._on_scroll('scroll', direction * 3, 'units')
+        return 'break'
+
+# ============================================================================
+# Tkinter GUI Application
+# ============================================================================
+
+class AutoClickerApp(tk.Tk):
+    def __init__(self, control_address=None):
+        super().__init__()
+        self.title('AutoClicker')
+        self.geometry('540x720')
+        self.resizable(False, False)
+        
+        self.executor = ClickExecutor()
+        self.executor.telemetry = RunTelemetry()
+        # Window spec executor.backend was made for; the backend (and the
+        # batches prepared with it) is kept until the target window changes
+        self.backend_window = None
+        # Handlers run on the dispatcher thread; widgets are only touched
+        # from the Tk thread, via after()
+        self.hotkeys = HotkeyDispatcher(self.executor, {
+            'start': self.start_from_hotkey,
+            'stop': self.stop_from_hotkey,
+            'switch': self.switch_from_hotkey,
+        })
+        self.library = ProfileLibrary()
+        self.switched = None  # Profile switched to by hotkey, not shown yet
+        self.start_hotkey = '`'
+        self.stop_hotkey = '`'
+        self.current_click_index = -1
+        self.listening_for_position = False
+        self.recorder = None
+        self.record_listener = None
+        
+        self.setup_ui()
+        self.library.preload()
+        self.start_hotkey_listener()
+        self.control_server = None
+        self.remote_loads = 0
+        self.shown_state = self.executor.state
+        if control_address:
+            self.start_control_server(control_address)
+        self.after(STATS_REFRESH_MS, self.refresh_stats)
+    
+    def setup_ui(self):
+        """Build the UI"""
+        main_frame = ttk.Frame(self)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        
+        # ---- TOP: Profile Library ----
+        # Picking a profile loads it (swapping it in if a run is active);
+        # typing a new name and pressing Save creates one
+        profile_frame = ttk.Frame(main_frame)
+        profile_frame.pack(fill=tk.X, pady=(0, 8))
+        
+        ttk.Label(profile_frame, text='Profile:').pack(side=tk.LEFT)
+        self.profile_var = tk.StringVar(value='Profile 1')
+        self.profile_box = ttk.Combobox(profile_frame, textvariable=self.profile_var, width=18,
+                                        postcommand=self.refresh_profile_names)
+        self.profile_box.pack(side=tk.LEFT, padx=5)
+        self.profile_box.bind('<<ComboboxSelected>>', lambda event: self.load_profile(self.profile_var.get()))
+        ttk.Button(profile_frame, text='Load', width=5, command=lambda: self.load_profile(self.profile_var.get().strip())).pack(side=tk.LEFT, padx=2)
+        ttk.Button(profile_frame, text='Save', width=5, command=lambda: self.save_profile(self.profile_var.get().strip())).pack(side=tk.LEFT, padx=2)
+        
+        ttk.Label(profile_frame, text='Switch key:').pack(side=tk.LEFT, padx=(10, 0))
+        self.switch_key_var = tk.StringVar()
+        ttk.Entry(profile_frame, textvariable=self.switch_key_var, width=8).pack(side=tk.LEFT, padx=5)
+        ttk.Button(profile_frame, text='Bind', width=5, command=self.bind_switch_hotkey).pack(side=tk.LEFT)
+        
+        # ---- Hotkey + Repeat Settings ----
+        hotkey_frame = ttk.LabelFrame(main_frame, text='Settings', padding=6)
+        hotkey_frame.pack(fill=tk.X, pady=(0, 8))
+        
+        # Hotkey row
+        hotkey_inner = ttk.Frame(hotkey_frame)
+        hotkey_inner.pack(fill=tk.X, pady=(0, 6))
+        
+        ttk.Label(hotkey_inner, text='Start Hotkey:').pack(side=tk.LEFT)
+        self.hotkey_var = tk.StringVar(value='`')
+        ttk.Entry(hotkey_inner, textvariable=self.hotkey_var, width=10).pack(side=tk.LEFT, padx=5)
+        ttk.Label(hotkey_inner, text='Stop Hotkey:').pack(side=tk.LEFT, padx=(10, 0))
+        self.stop_hotkey_var = tk.StringVar(value='`')
+        ttk.Entry(hotkey_inner, textvariable=self.stop_hotkey_var, width=10).pack(side=tk.LEFT, padx=5)
+        ttk.Button(hotkey_inner, text='Set', width=4, command=self.set_hotkey).pack(side=tk.LEFT)
+        
+        # Repeat options row
+        repeat_frame = ttk.Frame(hotkey_frame)
+        repeat_frame.pack(fill=tk.X)
+        
+        # "Repeat:" label
+        ttk.Label(repeat_frame, text='Repeat:', font=('', 9)).pack(side=tk.LEFT)
+
+        self.repeat_mode_var = tk.StringVar(value='repeat')
+        ttk.Radiobutton(repeat_frame, variable=self.repeat_mode_var, value='repeat', command=self.on_repeat_mode_change).pack(side=tk.LEFT, padx=(20, 10))
+        
+        self.repeat_var = tk.StringVar(value='1')
+        self.repeat_entry = ttk.Entry(repeat_frame, textvariable=self.repeat_var, width=3)
+        self.repeat_entry.pack(side=tk.LEFT)
+        ttk.Label(repeat_frame, text='times').pack(side=tk.LEFT, padx=5)
+        
+        ttk.Radiobutton(repeat_frame, text='until stopped', variable=self.repeat_mode_var, value='until_stopped', command=self.on_repeat_mode_change).pack(side=tk.LEFT, padx=20)
+        
+        # Mode row
+        mode_frame = ttk.Frame(hotkey_frame)
+        mode_frame.pack(fill=tk.X, pady=(6, 0))
+        ttk.Label(mode_frame, text='Mode:', font=('', 9)).pack(side=tk.LEFT)
+        self.mode_var = tk.StringVar(value='sequence')
+        ttk.Radiobutton(mode_frame, text='sequence', variable=self.mode_var, value='sequence').pack(side=tk.LEFT, padx=(27, 10))
+        ttk.Radiobutton(mode_frame, text='independent', variable=self.mode_var, value='independent').pack(side=tk.LEFT, padx=10)
+        self.stagger_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(mode_frame, text='stagger start', variable=self.stagger_var).pack(side=tk.LEFT, padx=10)
+        self.swap_step_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(mode_frame, text='apply edits mid-cycle', variable=self.swap_step_var).pack(side=tk.LEFT, padx=10)
+        
+        # Burst row: fixed clicks per second, optionally for a time or click budget
+        burst_frame = ttk.Frame(hotkey_frame)
+        burst_frame.pack(fill=tk.X, pady=(6, 0))
+        ttk.Radiobutton(burst_frame, text='burst', variable=self.mode_var, value='burst').pack(side=tk.LEFT, padx=(63, 6))
+        self.cps_var = tk.StringVar(value='10')
+        ttk.Entry(burst_frame, textvariable=self.cps_var, width=7).pack(side=tk.LEFT)
+        ttk.Label(burst_frame, text='clicks/s  for', font=('', 9)).pack(side=tk.LEFT, padx=5)
+        self.burst_duration_var = tk.StringVar(value='')
+        ttk.Entry(burst_frame, textvariable=self.burst_duration_var, width=6).pack(side=tk.LEFT)
+        ttk.Label(burst_frame, text='s  or', font=('', 9)).pack(side=tk.LEFT, padx=5)
+        self.burst_budget_var = tk.StringVar(value='')
+        ttk.Entry(burst_frame, textvariable=self.burst_budget_var, width=8).pack(side=tk.LEFT)
+        ttk.Label(burst_frame, text='clicks', font=('', 9)).pack(side=tk.LEFT, padx=5)
+        
+        # Target window row (blank = click with the real cursor)
+        window_frame = ttk.Frame(hotkey_frame)
+        window_frame.pack(fill=tk.X, pady=(6, 0))
+        ttk.Label(window_frame, text='Window:', font=('', 9)).pack(side=tk.LEFT)
+        self.window_var = tk.StringVar(value='')
+        ttk.Entry(window_frame, textvariable=self.window_var, width=40).pack(side=tk.LEFT, padx=(18, 5))
+        ttk.Label(window_frame, text='(title; clicks in background)', font=('', 8)).pack(side=tk.LEFT)
+        
+        # Monitor row: coordinates relative to a monitor survive rearranging it
+        monitor_frame = ttk.Frame(hotkey_frame)
+        monitor_frame.pack(fill=tk.X, pady=(6, 0))
+        ttk.Label(monitor_frame, text='Monitor:', font=('', 9)).pack(side=tk.LEFT)
+        self.anchor_var = tk.StringVar(value=ABSOLUTE)
+        self.anchor_box = ttk.Combobox(monitor_frame, textvariable=self.anchor_var, width=20, state='readonly',
+                                       postcommand=self.refresh_monitor_names)
+        self.anchor_box.pack(side=tk.LEFT, padx=(15, 5))
+        self.anchor_box.bind('<<ComboboxSelected>>', lambda event: self.set_anchor())
+        ttk.Label(monitor_frame, text='(coordinates relative to it)', font=('', 8)).pack(side=tk.LEFT)
+        
+        # ---- TWO-PANEL LAYOUT ----
+        panels_frame = ttk.Frame(main_frame)
+        panels_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Left Panel - Click Details
+        left_panel = ttk.LabelFrame(panels_frame, text='Click Details', padding=6)
+        left_panel.pack(side=tk.LEFT, fill=tk.BOTH, expand=False, padx=(0, 4))
+        
+        # Position
+        ttk.Label(left_panel, text='Position:', font=('', 9, 'bold')).pack(anchor=tk.W)
+        pos_frame = ttk.Frame(left_panel)
+        pos_frame.pack(fill=tk.X, pady=(2, 6))
+        ttk.Label(pos_frame, text='X:').pack(side=tk.LEFT)
+        self.x_var = tk.StringVar(value='0')
+        ttk.Entry(pos_frame, textvariable=self.x_var, width=6).pack(side=tk.LEFT, padx=2)
+        ttk.Label(pos_frame, text='Y:').pack(side=tk.LEFT, padx=(10, 0))
+        self.y_var = tk.StringVar(value='0')
+        ttk.Entry(pos_frame, textvariable=self.y_var, width=6).pack(side=tk.LEFT, padx=2)
+        
+        # Click Type
+        ttk.Label(left_panel, text='Click Type:', font=('', 9, 'bold')).pack(anchor=tk.W)
+        self.type_var = tk.StringVar(value='left')
+        type_menu = ttk.Combobox(left_panel, textvariable=self.type_var, values=list(STEP_TYPES), state='readonly', width=15)
+        type_menu.pack(fill=tk.X, pady=(2, 6))
+        
+        # Interval
+        ttk.Label(left_panel, text='Interval:', font=('', 9, 'bold')).pack(anchor=tk.W)
+        interval_frame = ttk.Frame(left_panel)
+        interval_frame.pack(fill=tk.X, pady=(2, 6))
+        
+        ttk.Label(interval_frame, text='Min:').pack(side=tk.LEFT)
+        self.min_var = tk.StringVar(value='0')
+        ttk.Entry(interval_frame, textvariable=self.min_var, width=3).pack(side=tk.LEFT, padx=2)
+        
+        ttk.Label(interval_frame, text='Sec:').pack(side=tk.LEFT, padx=(10, 0))
+        self.sec_var = tk.StringVar(value='0')
+        ttk.Entry(interval_frame, textvariable=self.sec_var, width=3).pack(side=tk.LEFT, padx=2)
+        
+        ttk.Label(interval_frame, text='Ms:').pack(side=tk.LEFT, padx=(10, 0))
+        self.ms_var = tk.StringVar(value='0')
+        ttk.Entry(interval_frame, textvariable=self.ms_var, width=3).pack(side=tk.LEFT, padx=2)
+        
+        # Times in a row (one list row instead of many)
+        ttk.Label(interval_frame, text='\u00d7').pack(side=tk.LEFT, padx=(10, 0))
+        self.step_repeat_var = tk.StringVar(value='1')
+        ttk.Entry(interval_frame, textvariable=self.step_repeat_var, width=4).pack(side=tk.LEFT, padx=2)
+        
+        # Jitter (random offsets drawn every cycle)
+        ttk.Label(left_panel, text='Jitter:', font=('', 9, 'bold')).pack(anchor=tk.W)
+        jitter_frame = ttk.Frame(left_panel)
+        jitter_frame.pack(fill=tk.X, pady=(2, 6))
+        ttk.Label(jitter_frame, text='\u00b1Ms:').pack(side=tk.LEFT)
+        self.jitter_ms_var = tk.StringVar(value='0')
+        ttk.Entry(jitter_frame, textvariable=self.jitter_ms_var, width=4).pack(side=tk.LEFT, padx=2)
+        ttk.Label(jitter_frame, text='\u00b1Px:').pack(side=tk.LEFT, padx=(10, 0))
+        self.jitter_px_var = tk.StringVar(value='0')
+        ttk.Entry(jitter_frame, textvariable=self.jitter_px_var, width=4).pack(side=tk.LEFT, padx=2)
+        
+        # Wait steps: colour at X, Y to wait for, tolerance and timeout
+        ttk.Label(left_panel, text='Wait For:', font=('', 9, 'bold')).pack(anchor=tk.W)
+        wait_frame = ttk.Frame(left_panel)
+        wait_frame.pack(fill=tk.X, pady=(2, 2))
+        self.wait_color_var = tk.StringVar(value='')
+        ttk.Entry(wait_frame, textvariable=self.wait_color_var, width=8).pack(side=tk.LEFT)
+        ttk.Button(wait_frame, text='Sample', width=7, command=self.sample_wait_color).pack(side=tk.LEFT, padx=2)
+        ttk.Label(wait_frame, text='\u00b1:').pack(side=tk.LEFT, padx=(4, 0))
+        self.wait_tolerance_var = tk.StringVar(value='0')
+        ttk.Entry(wait_frame, textvariable=self.wait_tolerance_var, width=3).pack(side=tk.LEFT, padx=2)
+        wait_timeout_frame = ttk.Frame(left_panel)
+        wait_timeout_frame.pack(fill=tk.X, pady=(0, 6))
+        ttk.Label(wait_timeout_frame, text='Timeout Ms:').pack(side=tk.LEFT)
+        self.wait_timeout_var = tk.StringVar(value='0')
+        ttk.Entry(wait_timeout_frame, textvariable=self.wait_timeout_var, width=6).pack(side=tk.LEFT, padx=2)
+        self.wait_on_timeout_var = tk.StringVar(value='continue')
+        ttk.Combobox(
+            wait_timeout_frame, textvariable=self.wait_on_timeout_var, values=['continue', 'skip', 'stop'],
+            state='readonly', width=8,
+        ).pack(side=tk.LEFT, padx=2)
+        
+        # Get Current Position Button
+        ttk.Button(left_panel, text='Get Current Position', width=22, command=self.get_position).pack(fill=tk.X, pady=(6, 6))
+        
+        # Add/Update buttons
+        button_frame = ttk.Frame(left_panel)
+        button_frame.pack(fill=tk.X, pady=(0, 6))
+        ttk.Button(button_frame, text='Add Click', width=13, command=self.add_click).pack(side=tk.LEFT, padx=(0, 3))
+        ttk.Button(button_frame, text='Update', width=13, command=self.update_click).pack(side=tk.LEFT)
+        
+        # Help text
+        ttk.Label(left_panel, text='Click "Get Current Position"\nthen click anywhere on screen\nto capture coordinates.', 
+                  font=('', 8), foreground='gray', justify=tk.LEFT).pack(fill=tk.X, pady=(0, 0))
+        
+        # Right Panel - Click List + Controls
+        right_panel = ttk.LabelFrame(panels_frame, text='Clicks & Control', padding=6)
+        right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+        
+        # Click List (Top)
+        list_frame = ttk.Frame(right_panel)
+        list_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 6))
+        
+        scroll = ttk.Scrollbar(list_frame)
+        scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.clicks_listbox = tk.Listbox(list_frame, font=('Courier', 8), height=12)
+        self.clicks_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.clicks_listbox.bind('<<ListboxSelect>>', self.on_click_select)
+        self.clicks_listbox.bind('<Delete>', lambda event: self.delete_click())
+        self.click_list = ClickListView(self.clicks_listbox, scroll, lambda: self.executor.clicks)
+        
+        # Control Buttons (Bottom)
+        control_frame = ttk.Frame(right_panel)
+        control_frame.pack(fill=tk.X)
+        
+        self.start_btn = ttk.Button(control_frame, text=f'Start ({self.start_hotkey})', command=self.start_clicking)
+        self.start_btn.pack(side=tk.LEFT, padx=(0, 4), fill=tk.X, expand=True)
+        
+        self.stop_btn = ttk.Button(control_frame, text=f'Stop ({self.stop_hotkey})', command=self.stop_clicking)
+        self.stop_btn.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        self.pause_btn = ttk.Button(control_frame, text='Pause', width=7, command=self.toggle_pause)
+        self.pause_btn.pack(side=tk.LEFT, padx=(4, 0))
+        
+        self.record_btn = ttk.Button(control_frame, text='Record', width=8, command=self.toggle_recording)
+        self.record_btn.pack(side=tk.LEFT, padx=(4, 0))
+        
+        self.status_label = ttk.Label(right_panel, text='Ready', foreground='green', font=('', 9))
+        self.status_label.pack(pady=(4, 0))
+        
+        # Live run statistics
+        stats_frame = ttk.Frame(right_panel)
+        stats_frame.pack(fill=tk.X, pady=(4, 0))
+        self.stats_label = ttk.Label(stats_frame, text='', font=('Courier', 8), justify=tk.LEFT)
+        self.stats_label.pack(side=tk.LEFT)
+        ttk.Button(stats_frame, text='Export', width=7, command=self.export_stats).pack(side=tk.RIGHT)
+    
+    def set_hotkey(self):
+        """Set the start/stop hotkeys (same key = toggle; chords like ctrl+f9 allowed)"""
+        start_key = self.hotkey_var.get().strip()
+        if not start_key:
+            return
+        stop_key = self.stop_hotkey_var.get().strip() or start_key
+        
+        self.start_hotkey = start_key
+        self.stop_hotkey = stop_key
+        self.hotkeys.set_hotkeys(start_key, stop_key)
+        self.start_btn.config(text=f'Start ({start_key})')
+        self.stop_btn.config(text=f'Stop ({stop_key})')
+    
+    def on_repeat_mode_change(self):
+        """Handle repeat mode radio button change"""
+        if self.repeat_mode_var.get() == 'until_stopped':
+            self.repeat_entry.config(state='disabled')
+        else:
+            self.repeat_entry.config(state='normal')
+    
+    def add_click(self):
+        """Add a new click from the left panel"""
+        try:
+            x = int(self.x_var.get())
+            y = int(self.y_var.get())
+            minutes = int(self.min_var.get())
+            seconds = int(self.sec_var.get())
+            milliseconds = int(self.ms_var.get())
+            
+            click = {
+                'x': x,
+                'y': y,
+                'type': self.type_var.get(),
+                'minutes': minutes,
+                'seconds': seconds,
+                'milliseconds': milliseconds
+            }
+            self.apply_jitter_fields(click)
+            self.apply_wait_fields(click)
+            self.apply_repeat_field(click)
+            
+            # Edits build a new list so a running sequence can swap it in whole
+            self.executor.update_clicks(self.executor.clicks + [click])
+            self.click_list.inserted(len(self.executor.clicks) - 1)
+            self.current_click_index = -1
+            self.clear_click_editor()
+        except ValueError:
+            pass
+    
+    def update_click(self):
+        """Update the currently selected click"""
+        if self.current_click_index < 0:
+            return
+        
+        try:
+            x = int(self.x_var.get())
+            y = int(self.y_var.get())
+            minutes = int(self.min_var.get())
+            seconds = int(self.sec_var.get())
+            milliseconds = int(self.ms_var.get())
+            
+            clicks = list(self.executor.clicks)
+            if is_block(clicks[self.current_click_index]):
+                return  # Blocks are edited in the profile JSON
+            click = dict(clicks[self.current_click_index])
+            click['x'] = x
+            click['y'] = y
+            click['type'] = self.type_var.get()
+            click['minutes'] = minutes
+            click['seconds'] = seconds
+            click['milliseconds'] = milliseconds
+            self.apply_jitter_fields(click)
+            self.apply_wait_fields(click)
+            self.apply_repeat_field(click)
+            clicks[self.current_click_index] = click
+            self.executor.update_clicks(clicks)
+            
+            self.click_list.updated(self.current_click_index)
+            self.current_click_index = -1
+            self.clear_click_editor()
+        except ValueError:
+            pass
+    
+    def apply_jitter_fields(self, click):
+        """Set the click's jitter keys from the editor (raises ValueError on bad input)"""
+        for key, var in (('jitter_ms', self.jitter_ms_var), ('jitter_px', self.jitter_px_var)):
+            value = int(var.get() or 0)
+            if value:
+                click[key] = value
+            else:
+                click.pop(key, None)
+    
+    def apply_repeat_field(self, click):
+        """Set the click's repeat count from the editor (raises ValueError on bad input)"""
+        repeat = int(self.step_repeat_var.get() or 1)
+        if repeat < 0:
+            raise ValueError(repeat)
+        if repeat != 1:
+            click['repeat'] = repeat
+        else:
+            click.pop('repeat', None)
+    
+    def apply_wait_fields(self, click):
+        """Set a wait step's condition keys from the editor, or drop them from a click (raises ValueError)"""
+        keys = ('color', 'tolerance', 'timeout_ms', 'on_timeout')
+        if click['type'] != 'wait':
+            for key in keys + ('patch', 'width', 'height'):
+                click.pop(key, None)
+            return
+        color = self.wait_color_var.get().strip()
+        values = {
+            'tolerance': int(self.wait_tolerance_var.get() or 0),
+            'timeout_ms': int(self.wait_timeout_var.get() or 0),
+            'on_timeout': self.wait_on_timeout_var.get(),
+        }
+        if color:
+            parse_color(color)
+            values['color'] = color
+            click.pop('patch', None)
+        elif 'patch' not in click:
+            raise ValueError('A wait step needs a colour')
+        for key in keys:
+            if values.get(key) and values[key] != 'continue':
+                click[key] = values[key]
+            else:
+                click.pop(key, None)
+    
+    def sample_wait_color(self):
+        """Fill the wait colour from the screen pixel at X, Y"""
+        try:
+            x, y = int(self.x_var.get()), int(self.y_var.get())
+            rgb = default_capture_cache().source.grab(x, y, 1, 1)
+        except (ValueError, OSError):
+            return
+        self.wait_color_var.set('#' + rgb.hex())
+    
+    def delete_click(self):
+        """Delete the currently selected click"""
+        if self.current_click_index < 0:
+            return
+        
+        clicks = list(self.executor.clicks)
+        del clicks[self.current_click_index]
+        self.executor.update_clicks(clicks)
+        self.click_list.deleted(self.current_click_index)
+        self.current_click_index = -1
+        self.clear_click_editor()
+    
+    def on_click_select(self, event):
+        """Load selected click into the editor"""
+        idx = self.click_list.selected_index()
+        if idx is None:
+            return
+        
+        self.current_click_index = idx
+        click = self.executor.clicks[idx]
+        self.clear_click_editor()
+        if is_block(click):
+            return  # Can be deleted here; edited in the profile JSON
+        
+        self.x_var.set(str(click['x']))
+        self.y_var.set(str(click['y']))
+        self.type_var.set(click['type'])
+        self.min_var.set(str(click.get('minutes', 0)))
+        self.sec_var.set(str(click.get('seconds', 0)))
+        self.ms_var.set(str(click.get('milliseconds', 100)))
+        self.step_repeat_var.set(str(click.get('repeat', 1)))
+        self.jitter_ms_var.set(str(click.get('jitter_ms', 0)))
+        self.jitter_px_var.set(str(click.get('jitter_px', 0)))
+        color = click.get('color', '')
+        self.wait_color_var.set(color if isinstance(color, str) else '#%02x%02x%02x' % tuple(color))
+        self.wait_tolerance_var.set(str(click.get('tolerance', 0)))
+        self.wait_timeout_var.set(str(click.get('timeout_ms', 0)))
+        self.wait_on_timeout_var.set(click.get('on_timeout', 'continue'))
+    
+    def refresh_clicks_display(self):
+        """Reload the whole list (after replacing executor.clicks)"""
+        self.click_list.reset()
+        
+        self.current_click_index = -1
+        self.clear_click_editor()
+    
+    def clear_click_editor(self):
+        """Clear the left panel editor"""
+        self.x_var.set('0')
+        self.y_var.set('0')
+        self.type_var.set('left')
+        self.min_var.set('0')
+        self.sec_var.set('0')
+        self.ms_var.set('100')
+        self.step_repeat_var.set('1')
+        self.jitter_ms_var.set('0')
+        self.jitter_px_var.set('0')
+        self.wait_color_var.set('')
+        self.wait_tolerance_var.set('0')
+        self.wait_timeout_var.set('0')
+        self.wait_on_timeout_var.set('continue')
+    
+    def get_position(self):
+        """Wait for user to click and capture position (physical coordinates)"""
+        if self.listening_for_position:
+            return
+        
+        self.listening_for_position = True
+        
+        window = self.window_spec()
+        
+        def on_click(x, y, button, pressed):
+            """Capture mouse click position"""
+            if pressed and self.listening_for_position:
+                x, y = int(x), int(y)
+                if window:
+                    # Window targets use client-area coordinates
+                    try:
+                        cache = default_window_cache()
+                        x, y = cache.windows.screen_to_client(cache.resolve(window['title']), x, y)
+                    except Exception:
+                        pass
+                elif self.executor.anchor:
+                    # Anchored profiles keep coordinates relative to their monitor
+                    try:
+                        x, y = default_display_topology().placement(self.executor.anchor).relative(x, y)
+                    except Exception:
+                        pass
+                self.x_var.set(str(int(x)))
+                self.y_var.set(str(int(y)))
+                self.listening_for_position = False
+                return False  # Stop listener
+            return True
+        
+        # Create listener in background thread and clean it up immediately after capture
+        def listen():
+            with pynput_mouse.Listener(on_click=on_click) as listener:
+                listener.join()
+        
+        thread = threading.Thread(target=listen, daemon=True)
+        thread.start()
+    
+    def on_mouse_click(self, x, y, pressed):
+        """Capture mouse click position"""
+        if pressed and self.listening_for_position:
+            self.x_var.set(str(x))
+            self.y_var.set(str(y))
+            self.listening_for_position = False
+            messagebox.showinfo('Position', f'Captured: ({x}, {y})')
+            return False
+    
+    def toggle_recording(self):
+        """Record every click (with timing) into the click list, or stop recording"""
+        if self.recorder is not None and self.recorder.recording:
+            self.record_listener.stop()
+            # The last press was on this button
+            clicks = self.recorder.stop(drop_last=1)
+            self.record_btn.config(text='Record')
+            if clicks and self.executor.anchor:
+                try:
+                    placement = default_display_topology().placement(self.executor.anchor)
+                    clicks = map_click_points(clicks, placement.relative)
+                except ValueError as e:
+                    self.status_label.config(text=f'Recorded absolute coordinates: {e}', foreground='red')
+                    self.executor.anchor = None
+                    self.anchor_var.set(ABSOLUTE)
+            if clicks:
+                self.executor.update_clicks(clicks)
+                self.refresh_clicks_display()
+            status = f'Recorded {len(clicks)} clicks'
+            if self.recorder.dropped:
+                status += f' ({self.recorder.dropped} dropped)'
+            self.status_label.config(text=status, foreground='green')
+            return
+        
+        if self.executor.running:
+            return
+        CONFIG_DIR.mkdir(exist_ok=True)
+        self.recorder = MacroRecorder(journal_path=CONFIG_DIR / 'recording.jsonl')
+        self.recorder.start()
+        self.record_listener = pynput_mouse.Listener(on_click=self.recorder.on_click)
+        self.record_listener.start()
+        self.record_btn.config(text='Stop Rec')
+        self.status_label.config(text='Recording...', foreground='red')
+    
+    def start_clicking(self):
+        """Start the autoclick"""
+        if self.executor.running:
+            return
+        
+        if not self.executor.clicks:
+            return
+        
+        try:
+            if self.repeat_mode_var.get() == 'until_stopped':
+                self.executor.repeat_until_stopped = True
+                self.executor.repeat_count = 1
+            else:
+                self.executor.repeat_until_stopped = False
+                self.executor.repeat_count = int(self.repeat_var.get())
+        except ValueError:
+            return
+        
+        self.executor.mode = self.mode_var.get()
+        self.executor.stagger = self.stagger_var.get()
+        try:
+            apply_burst_settings(self.executor, self.burst_settings())
+        except ValueError:
+            return
+        self.executor.swap_boundary = 'step' if self.swap_step_var.get() else 'cycle'
+        try:
+            window = self.window_spec()
+            if window != self.backend_window:
+                self.executor.backend = window_backend(window)
+                self.backend_window = window
+            self.executor.start()
+        except ValueError as e:
+            self.status_label.config(text=str(e), foreground='red')
+            return
+        self.status_label.config(text='Running', foreground='red')
+    
+    def stop_clicking(self):
+        """Stop the autoclick"""
+        self.executor.stop()
+        self.pause_btn.config(text='Pause')
+        self.status_label.config(text='Stopped', foreground='orange')
+    
+    def start_from_hotkey(self):
+        """Start hotkey (dispatcher thread): the settings are read on the Tk thread"""
+        self.after(0, self.start_clicking)
+    
+    def stop_from_hotkey(self):
+        """Stop hotkey (dispatcher thread): stop now, update the widgets on the Tk thread"""
+        self.executor.stop()
+        self.after(0, self.stop_clicking)
+    
+    def toggle_pause(self):
+        """Pause or resume the running autoclick, keeping its timing"""
+        self.executor.toggle_pause()
+        if self.executor.state == PAUSED:
+            self.pause_btn.config(text='Resume')
+            self.status_label.config(text='Paused', foreground='orange')
+        elif self.executor.running:
+            self.pause_btn.config(text='Pause')
+            self.status_label.config(text='Running', foreground='red')
+    
+    def start_hotkey_listener(self):
+        """Start listening for hotkey presses (OS key events, no polling)"""
+        self.hotkeys.set_hotkeys(self.start_hotkey, self.stop_hotkey)
+        self.hotkeys.set_switch_hotkeys(self.library.hotkeys())
+        try:
+            install_keyboard_hook(self.hotkeys)
+        except Exception:
+            return
+        self.hotkeys.start()
+        self.after(250, self.show_hotkey_latency)
+    
+    def show_hotkey_latency(self):
+        """Show press-to-first-click latency of the last hotkey start"""
+        latency = self.hotkeys.press_to_click_ns()
+        if latency is not None and self.executor.running:
+            self.status_label.config(text=f'Running (hotkey to click: {latency / 1e6:.1f} ms)')
+        self.after(250, self.show_hotkey_latency)
+    
+    def refresh_stats(self):
+        """Update the stats panel from the executor's telemetry (polled, never pushed)"""
+        executor = self.executor
+        telemetry = executor.telemetry
+        if executor.achieved_cps is not None:
+            # Burst runs: telemetry counts sends, each of which may carry several clicks
+            stats = telemetry.snapshot()
+            self.stats_label.config(text=(
+                f"{executor.steps_done} clicks  {executor.achieved_cps:.1f}/s "
+                f"(target {executor.target_cps:g}/s)\n"
+                f"late p99 {stats['lateness_p99_ns'] / 1e6:.2f}ms  "
+                f"inject p99 {stats['inject_p99_ns'] / 1e6:.2f}ms"
+            ))
+        elif telemetry.count:
+            stats = telemetry.snapshot()
+            self.stats_label.config(text=(
+                f"{stats['steps']} steps  {stats['cps']:.1f}/s\n"
+                f"late p99 {stats['lateness_p99_ns'] / 1e6:.2f}ms  "
+                f"inject p99 {stats['inject_p99_ns'] / 1e6:.2f}ms"
+            ))
+        if self.switched is not None:
+            name, self.switched = self.switched, None
+            self.load_profile(name)
+        if self.control_server is not None:
+            self.sync_remote()
+        self.after(STATS_REFRESH_MS, self.refresh_stats)
+    
+    def start_control_server(self, address):
+        """Serve the control protocol for this window's executor (see clicker_control)"""
+        from clicker_control import ControlServer
+        try:
+            server = ControlServer(self.executor, address)
+            server.start()
+        except (OSError, ValueError) as e:
+            self.status_label.config(text=f'Control server: {e}', foreground='red')
+            return
+        self.control_server = server
+    
+    def sync_remote(self):
+        """Show what control clients changed since the last poll (clicks, loaded profile, state)"""
+        server = self.control_server
+        if server.loads != self.remote_loads:
+            self.remote_loads = server.loads
+            self.show_profile_settings(server.loaded_data)
+        if self.executor.clicks is not self.click_list.shown and isinstance(self.executor.clicks, list):
+            self.refresh_clicks_display()
+        state = self.executor.state
+        if state != self.shown_state:
+            self.shown_state = state
+            if state == PAUSED:
+                self.pause_btn.config(text='Resume')
+                self.status_label.config(text='Paused', foreground='orange')
+            elif self.executor.running:
+                self.pause_btn.config(text='Pause')
+                self.status_label.config(text='Running', foreground='red')
+            else:
+                self.pause_btn.config(text='Pause')
+                self.status_label.config(text='Stopped', foreground='orange')
+    
+    def export_stats(self):
+        """Export per-step telemetry of the last run to CSV or JSON lines"""
+        if not self.executor.telemetry.count:
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension='.csv',
+            filetypes=[('CSV', '*.csv'), ('JSON lines', '*.jsonl')],
+        )
+        if path:
+            self.executor.telemetry.export(path)
+    
+    def burst_settings(self):
+        """Profile burst entries from the burst row (blank limits are None)"""
+        duration = self.burst_duration_var.get().strip()
+        budget = self.burst_budget_var.get().strip()
+        return {
+            'target_cps': float(self.cps_var.get()),
+            'burst_duration': float(duration) if duration else None,
+            'burst_budget': int(budget) if budget else None,
+        }
+    
+    def window_spec(self):
+        """Profile 'window' entry for the target window field, or None"""
+        title = self.window_var.get().strip()
+        return {'title': title} if title else None
+    
+    def refresh_monitor_names(self):
+        """Fill the monitor list from the display topology"""
+        names = [ABSOLUTE, 'primary']
+        try:
+            names += [monitor.device for monitor in default_display_topology().monitors()]
+        except Exception:
+            pass  # No display information; only absolute and primary are offered
+        self.anchor_box['values'] = names
+    
+    def set_anchor(self):
+        """Make the click list relative to the picked monitor (or absolute), converting its coordinates"""
+        choice = self.anchor_var.get()
+        if self.executor.running:
+            self.anchor_var.set(anchor_label(self.executor.anchor))
+            self.status_label.config(text='Stop clicking to change the monitor', foreground='red')
+            return
+        try:
+            topology = default_display_topology()
+            old = topology.placement(self.executor.anchor) if self.executor.anchor else None
+            anchor = topology.anchor(monitor=choice) if choice != ABSOLUTE else None
+            new = topology.placement(anchor) if anchor else None
+        except ValueError as e:
+            self.anchor_var.set(anchor_label(self.executor.anchor))
+            self.status_label.config(text=str(e), foreground='red')
+            return
+        clicks = self.executor.clicks
+        if isinstance(clicks, list) and clicks:
+            if old is not None:
+                clicks = map_click_points(clicks, old.point)
+            if new is not None:
+                clicks = map_click_points(clicks, new.relative)
+            self.executor.update_clicks(clicks)
+            self.refresh_clicks_display()
+        self.executor.anchor = anchor
+    
+    def refresh_profile_names(self):
+        """Fill the profile drop-down from the library (rescans only if CONFIG_DIR changed)"""
+        self.profile_box['values'] = self.library.names()
+    
+    def bind_switch_hotkey(self):
+        """Bind the switch key field to the selected profile (empty unbinds)"""
+        name = self.profile_var.get().strip()
+        if name not in self.library.names():
+            self.status_label.config(text='Save the profile before binding a key', foreground='red')
+            return
+        try:
+            self.library.bind_hotkey(name, self.switch_key_var.get().strip())
+        except OSError as e:
+            self.status_label.config(text=f'Could not save hotkey: {e}', foreground='red')
+            return
+        self.hotkeys.set_switch_hotkeys(self.library.hotkeys())
+    
+    def switch_from_hotkey(self, profile_name):
+        """Profile hotkey (dispatcher thread): swap the steps now, show them on the next poll"""
+        try:
+            self.library.switch(self.executor, profile_name)
+        except ValueError:
+            pass  # load_profile() reports it on the Tk thread
+        self.switched = profile_name
+    
+    def save_profile(self, profile_name):
+        """Save current configuration to a profile"""
+        if not profile_name:
+            return
+        data = {
+            'hotkey': self.start_hotkey,
+            'stop_hotkey': self.stop_hotkey,
+            'repeat_mode': self.repeat_mode_var.get(),
+            'repeat_count': int(self.repeat_var.get()),
+            'mode': self.mode_var.get(),
+            'stagger': self.stagger_var.get(),
+            'swap_boundary': 'step' if self.swap_step_var.get() else 'cycle',
+            'window': self.window_spec(),
+            'anchor': self.executor.anchor,
+            **self.burst_settings(),
+            'jitter_seed': self.executor.jitter_seed,
+            'clicks': self.executor.clicks
+        }
+        if not save_profile(profile_name, data):
+            self.status_label.config(text=f'Could not save profile: {profile_name}', foreground='red')
+    
+    def load_profile(self, profile_name):
+        """Load a profile from the library; while running, its steps are swapped in"""
+        if not profile_name:
+            return
+        try:
+            entry = self.library.use(profile_name)
+            clicks = entry.editable_clicks()
+            if clicks is None:
+                raise ValueError(f'{profile_name} is a pattern profile; play it with --run')
+            # Idle, start() may replace the backend, so only compile now
+            plan, batches = entry.prepared(self.executor.backend if self.executor.running else None)
+            self.executor.use_anchor(entry.data.get('anchor'))
+            self.executor.update_clicks(clicks, plan, batches)
+        except ValueError as e:
+            self.status_label.config(text=str(e), foreground='red')
+            return
+        self.profile_var.set(profile_name)
+        self.switch_key_var.set(self.library.switch_hotkeys.get(profile_name, ''))
+        self.show_profile_settings(entry.data)
+        self.refresh_clicks_display()
+    
+    def show_profile_settings(self, data):
+        """Fill the settings fields from a profile's settings"""
+        self.hotkey_var.set(data.get('hotkey', '`'))
+        self.stop_hotkey_var.set(data.get('stop_hotkey', data.get('hotkey', '`')))
+        self.set_hotkey()
+        self.repeat_mode_var.set(data.get('repeat_mode', 'repeat'))
+        self.repeat_var.set(str(data.get('repeat_count', 1)))
+        self.mode_var.set(data.get('mode', 'sequence'))
+        self.stagger_var.set(bool(data.get('stagger', False)))
+        self.swap_step_var.set(data.get('swap_boundary', 'cycle') == 'step')
+        self.window_var.set((data.get('window') or {}).get('title', ''))
+        self.anchor_var.set(anchor_label(data.get('anchor')))
+        self.executor.jitter_seed = data.get('jitter_seed')
+        self.cps_var.set(f"{data.get('target_cps', 10):g}")
+        self.burst_duration_var.set(f"{data['burst_duration']:g}" if data.get('burst_duration') else '')
+        self.burst_budget_var.set(str(data['burst_budget']) if data.get('burst_budget') else '')
+        self.on_repeat_mode_change()
+
+def main(control_address=None):
+    """Run the GUI, optionally with a control server on control_address"""
+    app = AutoClickerApp(control_address)
+    app.mainloop()
+    app.library.save_recent()
+    if app.control_server is not None:
+        app.control_server.close()
+    return 0
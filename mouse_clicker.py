@@ -2,27 +2,53 @@
 AutoClicker Application - Lightweight Mouse Automation
 Windows-only, minimal resource usage via ctypes Windows API
 DPI-aware coordinate handling using pynput physical coordinates
+
+This module is the click engine plus the entry point. The GUI (clicker_gui)
+and the keyboard library are only imported when needed, so headless runs
+start without loading tkinter:
+    python -m mouse_clicker                        # GUI
+    python -m mouse_clicker --run "Profile 1"      # headless
+    python -m mouse_clicker --record "Profile 1"   # record clicks headless
+    python -m mouse_clicker --serve 127.0.0.1:8765 # remote control, no GUI
 """
 
-import tkinter as tk
-from tkinter import ttk
+import abc
+import argparse
+import base64
+import heapq
 import json
+import math
+import mmap
+import operator
+import os
+import queue
+import struct
+import sys
 import threading
 import time
-from ctypes import windll, c_int, Structure, POINTER
+from array import array
+from collections import OrderedDict
+import ctypes
+from ctypes import (
+    c_int, c_int32, c_uint, c_uint32, c_size_t, c_ssize_t, c_void_p, c_wchar_p, Structure, POINTER,
+)
 from pathlib import Path
-import keyboard
-from pynput import mouse as pynput_mouse
 
-try:
-    # Try to set per-monitor DPI awareness (Windows 8.1+)
-    windll.shcore.SetProcessDpiAwareness(1)
-except Exception:
+# windll only exists on Windows; leave it as None elsewhere so the executor
+# can still be driven by a fake backend (e.g. on Linux)
+windll = getattr(ctypes, 'windll', None)
+
+def enable_dpi_awareness():
+    """Make the process DPI-aware so coordinates are physical pixels"""
     try:
-        # Fallback to system-wide DPI awareness (Windows Vista/7)
-        windll.user32.SetProcessDPIAware()
+        # Try to set per-monitor DPI awareness (Windows 8.1+)
+        windll.shcore.SetProcessDpiAwareness(1)
     except Exception:
-        pass
+        try:
+            # Fallback to system-wide DPI awareness (Windows Vista/7)
+            windll.user32.SetProcessDPIAware()
+        except Exception:
+            pass
 
 # ============================================================================
 # Windows API Direct Calls (Minimal Resource Usage)
@@ -32,496 +58,3976 @@ def set_cursor_position(x, y):
     """Set cursor position (physical coordinates)"""
     windll.user32.SetCursorPos(c_int(x), c_int(y))
 
+def left_click():
+    """Left click at the current cursor position"""
+    windll.user32.mouse_event(2, 0, 0, 0, 0)  # Left down
+    windll.user32.mouse_event(4, 0, 0, 0, 0)  # Left up
+
+def right_click():
+    """Right click at the current cursor position"""
+    windll.user32.mouse_event(8, 0, 0, 0, 0)  # Right down
+    windll.user32.mouse_event(16, 0, 0, 0, 0)  # Right up
+
+def double_click():
+    """Double left click at the current cursor position"""
+    windll.user32.mouse_event(2, 0, 0, 0, 0)  # Left down
+    windll.user32.mouse_event(4, 0, 0, 0, 0)  # Left up
+    windll.user32.mouse_event(2, 0, 0, 0, 0)  # Left down
+    windll.user32.mouse_event(4, 0, 0, 0, 0)  # Left up
+
+# Click types in action-code order (see compile_plan)
+CLICK_TYPES = ('left', 'right', 'double')
+ACTION_CODES = {click_type: code for code, click_type in enumerate(CLICK_TYPES)}
+_CLICK_FUNCTIONS = (left_click, right_click, double_click)
+# Plan step types: the click types, then 'wait' (see WaitCondition), which
+# holds a sequence until the screen matches and never reaches a backend
+STEP_TYPES = CLICK_TYPES + ('wait',)
+STEP_CODES = {step_type: code for code, step_type in enumerate(STEP_TYPES)}
+WAIT_ACTION = STEP_CODES['wait']
+
 def mouse_click(click_type='left'):
     """
     Perform mouse click
     click_type: 'left', 'right', or 'double'
     Uses physical coordinates for consistent behavior
     """
-    if click_type == 'left':
-        windll.user32.mouse_event(2, 0, 0, 0, 0)  # Left down
-        windll.user32.mouse_event(4, 0, 0, 0, 0)  # Left up
-    elif click_type == 'right':
-        windll.user32.mouse_event(8, 0, 0, 0, 0)  # Right down
-        windll.user32.mouse_event(16, 0, 0, 0, 0)  # Right up
-    elif click_type == 'double':
-        windll.user32.mouse_event(2, 0, 0, 0, 0)  # Left down
-        windll.user32.mouse_event(4, 0, 0, 0, 0)  # Left up
-        windll.user32.mouse_event(2, 0, 0, 0, 0)  # Left down
-        windll.user32.mouse_event(4, 0, 0, 0, 0)  # Left up
+    code = ACTION_CODES.get(click_type)
+    if code is not None:
+        _CLICK_FUNCTIONS[code]()
 
 # ============================================================================
 # Configuration Management
 # ============================================================================
 
 CONFIG_DIR = Path.home() / '.autoclicker'
-CONFIG_DIR.mkdir(exist_ok=True)
+
+def read_profile_json(profile_path):
+    """Parse a JSON profile file; None if it doesn't exist, ValueError if it can't be read"""
+    try:
+        with open(profile_path, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        raise ValueError(f'Cannot read profile {profile_path}: {e}') from e
+    if not isinstance(data, dict):
+        raise ValueError(f'Cannot read profile {profile_path}: not a JSON object')
+    return data
 
 def load_profile(profile_name):
-    """Load a profile from disk"""
-    profile_path = CONFIG_DIR / f'{profile_name}.json'
-    if profile_path.exists():
+    """Load a profile from disk; None if there is none, ValueError if it is unreadable"""
+    return read_profile_json(CONFIG_DIR / f'{profile_name}.json')
+
+def atomic_write(path, write, mode='w'):
+    """
+    Write a file via write(f) into a temporary sibling, then rename it over
+    path, so readers never see a half-written profile
+    """
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    try:
+        with open(tmp_path, mode) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
         try:
-            with open(profile_path, 'r') as f:
-                return json.load(f)
-        except Exception:
-            return None
-    return None
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
 
 def save_profile(profile_name, data):
     """Save a profile to disk"""
     profile_path = CONFIG_DIR / f'{profile_name}.json'
     try:
-        with open(profile_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        CONFIG_DIR.mkdir(exist_ok=True)
+        atomic_write(profile_path, lambda f: json.dump(data, f, indent=2))
         return True
     except Exception:
         return False
 
 # ============================================================================
-# Click Executor
+# Input Backends
 # ============================================================================
+#
+# A backend turns one plan step into a prepared batch of input events once,
+# before playback (prepare), and injects a whole batch per step (send):
+#   prepare(x, y, action, count=1, move=True) -> opaque batch
+#   send(batch)
+# count > 1 prepares a burst: one move followed by count clicks. move=False
+# leaves the move out, for a step that clicks where the one before it left
+# the cursor (see stationary_steps).
 
-class ClickExecutor:
-    def __init__(self):
-        self.running = False
-        self.thread = None
-        self.clicks = []
-        self.repeat_count = 1
-        self.repeat_until_stopped = False
-    
-    def execute_sequence(self):
-        """Execute clicks in sequence"""
-        repeat_num = 0
-        
-        while self.running:
-            if not self.repeat_until_stopped and repeat_num >= self.repeat_count:
-                self.running = False
-                break
-            
-            for click in self.clicks:
-                if not self.running:
-                    break
-                
-                x, y = click['x'], click['y']
-                click_type = click['type']
-                
-                # Calculate total interval in seconds
-                minutes = click.get('minutes', 0)
-                seconds = click.get('seconds', 0)
-                milliseconds = click.get('milliseconds', 100)
-                interval = minutes * 60 + seconds + milliseconds / 1000.0
-                
-                # Move cursor and click
-                set_cursor_position(x, y)
-                mouse_click(click_type)
-                
-                # Wait for interval
-                time.sleep(interval)
-            
-            repeat_num += 1
-    
-    def run(self):
-        """Execute clicks"""
-        if not self.clicks:
-            return
-        self.execute_sequence()
-    
-    def start(self):
-        """Start clicking in background thread"""
-        if self.running:
-            return
-        
-        self.running = True
-        self.thread = threading.Thread(target=self.run, daemon=True)
-        self.thread.start()
-    
-    def stop(self):
-        """Stop clicking immediately"""
-        self.running = False
+INPUT_MOUSE = 0
+MOUSEEVENTF_MOVE = 0x0001
+MOUSEEVENTF_LEFTDOWN = 0x0002
+MOUSEEVENTF_LEFTUP = 0x0004
+MOUSEEVENTF_RIGHTDOWN = 0x0008
+MOUSEEVENTF_RIGHTUP = 0x0010
+MOUSEEVENTF_VIRTUALDESK = 0x4000
+MOUSEEVENTF_ABSOLUTE = 0x8000
+
+MOVE_FLAGS = MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_VIRTUALDESK
+
+# Button flags for each action code, in injection order
+ACTION_FLAGS = (
+    (MOUSEEVENTF_LEFTDOWN, MOUSEEVENTF_LEFTUP),
+    (MOUSEEVENTF_RIGHTDOWN, MOUSEEVENTF_RIGHTUP),
+    (MOUSEEVENTF_LEFTDOWN, MOUSEEVENTF_LEFTUP, MOUSEEVENTF_LEFTDOWN, MOUSEEVENTF_LEFTUP),
+)
+
+class MOUSEINPUT(Structure):
+    _fields_ = [
+        ('dx', c_int32),           # LONG
+        ('dy', c_int32),           # LONG
+        ('mouseData', c_uint32),   # DWORD
+        ('dwFlags', c_uint32),     # DWORD
+        ('time', c_uint32),        # DWORD
+        ('dwExtraInfo', c_size_t), # ULONG_PTR
+    ]
+
+class INPUT(Structure):
+    # The real INPUT is a union of mouse/keyboard/hardware input;
+    # MOUSEINPUT is its largest member, so the layout matches
+    _fields_ = [
+        ('type', c_uint32),        # DWORD
+        ('mi', MOUSEINPUT),
+    ]
+
+INPUT_SIZE = ctypes.sizeof(INPUT)
+
+def virtual_screen_rect():
+    """(left, top, width, height) of the virtual desktop spanning all monitors"""
+    metrics = windll.user32.GetSystemMetrics
+    # SM_XVIRTUALSCREEN, SM_YVIRTUALSCREEN, SM_CXVIRTUALSCREEN, SM_CYVIRTUALSCREEN
+    return metrics(76), metrics(77), metrics(78), metrics(79)
+
+def normalize_coordinates(x, y, screen):
+    """Map physical (x, y) to SendInput's absolute 0-65535 virtual-desktop range"""
+    left, top, width, height = screen
+    nx = ((x - left) * 65535 + (width - 1) // 2) // max(width - 1, 1)
+    ny = ((y - top) * 65535 + (height - 1) // 2) // max(height - 1, 1)
+    return min(max(nx, 0), 65535), min(max(ny, 0), 65535)
+
+def build_step_events(x, y, action, screen, count=1, move=True):
+    """
+    Events for one step as (dx, dy, flags) tuples: an absolute move to (x, y)
+    (unless move is False) followed by count repetitions of the action's
+    button events
+    """
+    events = [(*normalize_coordinates(x, y, screen), MOVE_FLAGS)] if move else []
+    for _ in range(count):
+        events.extend((0, 0, flags) for flags in ACTION_FLAGS[action])
+    return tuple(events)
+
+class SendInputBackend:
+    """
+    Default backend: one SendInput call per step with a prebuilt INPUT array.
+    send_input can be replaced (e.g. by a recorder) to exercise batching
+    without Windows. Batches are normalized against screen; unless one is
+    given, it is the virtual desktop, read again by refresh_screen().
+    """
+    def __init__(self, screen=None, send_input=None):
+        self.live_screen = screen is None
+        self.screen = screen if screen is not None else virtual_screen_rect()
+        if send_input is None:
+            send_input = windll.user32.SendInput
+            send_input.argtypes = (c_uint, POINTER(INPUT), c_int)
+            send_input.restype = c_uint
+        self._send_input = send_input
+
+    def prepare(self, x, y, action, count=1, move=True):
+        events = build_step_events(x, y, action, self.screen, count, move)
+        inputs = (INPUT * len(events))(*[
+            INPUT(INPUT_MOUSE, MOUSEINPUT(dx, dy, 0, flags, 0, 0))
+            for dx, dy, flags in events
+        ])
+        return len(events), inputs
+
+    def send(self, batch):
+        self._send_input(batch[0], batch[1], INPUT_SIZE)
+
+    def refresh_screen(self):
+        """Read the virtual desktop again (not a given screen); True if it changed"""
+        if not self.live_screen:
+            return False
+        screen = virtual_screen_rect()
+        if screen == self.screen:
+            return False
+        self.screen = screen
+        return True
+
+class RecordingBackend:
+    """
+    Fake backend that records each sent batch of (dx, dy, flags) events
+    instead of injecting it. If a clock is given, each batch is stamped with
+    clock.now_ns() and the clock is advanced by cost_ns to simulate
+    injection time; otherwise the stamp is None.
+    """
+    def __init__(self, clock=None, cost_ns=0, screen=(0, 0, 1920, 1080)):
+        self.clock = clock
+        self.cost_ns = cost_ns
+        self.screen = screen
+        self.sent = []  # [(timestamp_ns, events)]
+
+    def prepare(self, x, y, action, count=1, move=True):
+        return build_step_events(x, y, action, self.screen, count, move)
+
+    def send(self, batch):
+        clock = self.clock
+        if clock is not None:
+            self.sent.append((clock.now_ns(), batch))
+            if self.cost_ns:
+                clock.advance(self.cost_ns)
+        else:
+            self.sent.append((None, batch))
+
+# Stands in for a wait step's batch; the executor waits instead of sending it
+WAIT_BATCH = object()
+
+def stationary_step(plan, index):
+    """
+    True if step index clicks where the step before it, played just before,
+    leaves the cursor, so it needn't move it again. Wait steps and steps
+    with position jitter on either side never count.
+    """
+    if index < 1:
+        return False
+    xs, ys, actions = plan.xs, plan.ys, plan.actions
+    if xs[index] != xs[index - 1] or ys[index] != ys[index - 1]:
+        return False
+    if actions[index] == WAIT_ACTION or actions[index - 1] == WAIT_ACTION:
+        return False
+    spread = plan.jitter.position_spread if plan.jitter is not None else None
+    return spread is None or not (spread[index] or spread[index - 1])
+
+def stationary_steps(plan):
+    """Indices of the plan's stationary steps (see stationary_step)"""
+    xs, ys = plan.xs, plan.ys
+    same = [i for i, (x, y, px, py) in enumerate(zip(xs[1:], ys[1:], xs, ys), 1) if x == px and y == py]
+    return [i for i in same if stationary_step(plan, i)]
+
+def prepare_batches(plan, backend):
+    """
+    Prepare one backend batch per plan step, sharing batches for repeated
+    steps. Wait steps get WAIT_BATCH. The batches play the plan in order:
+    stationary steps click without moving the cursor (see moving_batches).
+    """
+    cache = {}
+    batches = []
+    prepare = backend.prepare
+    xs, ys, actions = plan.xs, plan.ys, plan.actions
+    for key in zip(xs, ys, actions):
+        if key[2] == WAIT_ACTION:
+            batches.append(WAIT_BATCH)
+            continue
+        batch = cache.get(key)
+        if batch is None:
+            batch = cache[key] = prepare(*key)
+        batches.append(batch)
+    for index in stationary_steps(plan):
+        key = (xs[index], ys[index], actions[index], False)
+        batch = cache.get(key)
+        if batch is None:
+            batch = cache[key] = prepare(*key[:3], move=False)
+        batches[index] = batch
+    return batches
+
+def moving_batches(plan, batches, prepare):
+    """batches with every stationary step moving the cursor again, for playing steps out of order"""
+    steps = stationary_steps(plan)
+    if not steps:
+        return batches
+    batches = list(batches)
+    for index in steps:
+        batches[index] = prepare(plan.xs[index], plan.ys[index], plan.actions[index])
+    return batches
 
 # ============================================================================
-# Tkinter GUI Application
+# Window Targeting
 # ============================================================================
+#
+# PostMessageBackend clicks inside one window by posting mouse messages to it
+# instead of moving the global cursor, so the operator keeps the mouse and
+# several runs can target different windows at the same time. Coordinates
+# are relative to the window's client area. Window lookup and posting go
+# through a windows object (Win32Windows, or FakeWindows off Windows):
+#   find(title, class_name) -> handle or None
+#   post(hwnd, msg, wparam, lparam) -> bool
+#   screen_to_client(hwnd, x, y) -> (x, y)
+
+WM_MOUSEMOVE = 0x0200
+WM_LBUTTONDOWN = 0x0201
+WM_LBUTTONUP = 0x0202
+WM_LBUTTONDBLCLK = 0x0203
+WM_RBUTTONDOWN = 0x0204
+WM_RBUTTONUP = 0x0205
+MK_LBUTTON = 0x0001
+MK_RBUTTON = 0x0002
+
+# (message, wParam) for each action code, in posting order
+ACTION_MESSAGES = (
+    ((WM_LBUTTONDOWN, MK_LBUTTON), (WM_LBUTTONUP, 0)),
+    ((WM_RBUTTONDOWN, MK_RBUTTON), (WM_RBUTTONUP, 0)),
+    ((WM_LBUTTONDOWN, MK_LBUTTON), (WM_LBUTTONUP, 0), (WM_LBUTTONDBLCLK, MK_LBUTTON), (WM_LBUTTONUP, 0)),
+)
+
+def build_window_messages(x, y, action, count=1, move=True):
+    """
+    Messages for one step as (msg, wparam, lparam) tuples: a move to client
+    (x, y) (unless move is False) followed by count repetitions of the
+    action's button messages
+    """
+    lparam = ((y & 0xFFFF) << 16) | (x & 0xFFFF)
+    messages = [(WM_MOUSEMOVE, 0, lparam)] if move else []
+    for _ in range(count):
+        messages.extend((msg, wparam, lparam) for msg, wparam in ACTION_MESSAGES[action])
+    return tuple(messages)
 
-class AutoClickerApp(tk.Tk):
+class POINT(Structure):
+    _fields_ = [('x', c_int32), ('y', c_int32)]
+
+class Win32Windows:
+    """Window lookup and message posting through user32"""
     def __init__(self):
-        super().__init__()
-        self.title('AutoClicker')
-        self.geometry('540x540')
-        self.resizable(False, False)
-        
-        self.executor = ClickExecutor()
-        self.hotkey_thread = None
-        self.start_hotkey = '\\'
-        self.stop_hotkey = '`'
-        self.current_click_index = -1
-        self.listening_for_position = False
-        
-        self.setup_ui()
-        self.start_hotkey_listener()
-    
-    def setup_ui(self):
-        """Build the UI"""
-        main_frame = ttk.Frame(self)
-        main_frame.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
-        
-        # ---- TOP: Profile Management ----
-        profile_frame = ttk.Frame(main_frame)
-        profile_frame.pack(fill=tk.X, pady=(0, 8))
-        
-        # Load Profile
-        load_frame = ttk.Frame(profile_frame)
-        load_frame.pack(side=tk.LEFT, padx=(0, 20))
-        ttk.Label(load_frame, text='Load Profile:', font=('', 9)).pack(anchor=tk.W)
-        btn_frame = ttk.Frame(load_frame)
-        btn_frame.pack(anchor=tk.W, pady=(2, 0))
-        ttk.Button(btn_frame, text='Profile 1', width=13, command=lambda: self.load_profile('Profile 1')).pack(side=tk.LEFT, padx=3)
-        ttk.Button(btn_frame, text='Profile 2', width=13, command=lambda: self.load_profile('Profile 2')).pack(side=tk.LEFT, padx=3)
-        
-        # Save Profile
-        save_frame = ttk.Frame(profile_frame)
-        save_frame.pack(side=tk.LEFT, padx=(20, 0))
-        ttk.Label(save_frame, text='Save Profile:', font=('', 9)).pack(anchor=tk.W)
-        btn_frame = ttk.Frame(save_frame)
-        btn_frame.pack(anchor=tk.W, pady=(2, 0))
-        ttk.Button(btn_frame, text='Profile 1', width=13, command=lambda: self.save_profile('Profile 1')).pack(side=tk.LEFT, padx=2)
-        ttk.Button(btn_frame, text='Profile 2', width=13, command=lambda: self.save_profile('Profile 2')).pack(side=tk.LEFT, padx=2)
-        
-        # ---- Hotkey + Repeat Settings ----
-        hotkey_frame = ttk.LabelFrame(main_frame, text='Settings', padding=6)
-        hotkey_frame.pack(fill=tk.X, pady=(0, 8))
-        
-        # Hotkey row
-        hotkey_inner = ttk.Frame(hotkey_frame)
-        hotkey_inner.pack(fill=tk.X, pady=(0, 6))
-        
-        ttk.Label(hotkey_inner, text='Start/Stop Hotkey:').pack(side=tk.LEFT)
-        self.hotkey_var = tk.StringVar(value='`')
-        hotkey_entry = ttk.Entry(hotkey_inner, textvariable=self.hotkey_var, width=4)
-        hotkey_entry.pack(side=tk.LEFT, padx=5)
-        ttk.Button(hotkey_inner, text='Set', width=4, command=self.set_hotkey).pack(side=tk.LEFT)
-        
-        # Repeat options row
-        repeat_frame = ttk.Frame(hotkey_frame)
-        repeat_frame.pack(fill=tk.X)
-        
-        # "Repeat:" label
-        ttk.Label(repeat_frame, text='Repeat:', font=('', 9)).pack(side=tk.LEFT)
+        user32 = windll.user32
+        self._find = user32.FindWindowW
+        self._find.argtypes = (c_wchar_p, c_wchar_p)
+        self._find.restype = c_void_p
+        self._post = user32.PostMessageW
+        self._post.argtypes = (c_void_p, c_uint, c_size_t, c_ssize_t)
+        self._post.restype = c_int
+        self._screen_to_client = user32.ScreenToClient
+        self._screen_to_client.argtypes = (c_void_p, POINTER(POINT))
 
-        self.repeat_mode_var = tk.StringVar(value='repeat')
-        ttk.Radiobutton(repeat_frame, variable=self.repeat_mode_var, value='repeat', command=self.on_repeat_mode_change).pack(side=tk.LEFT, padx=(20, 10))
-        
-        self.repeat_var = tk.StringVar(value='1')
-        self.repeat_entry = ttk.Entry(repeat_frame, textvariable=self.repeat_var, width=3)
-        self.repeat_entry.pack(side=tk.LEFT)
-        ttk.Label(repeat_frame, text='times').pack(side=tk.LEFT, padx=5)
-        
-        ttk.Radiobutton(repeat_frame, text='until stopped', variable=self.repeat_mode_var, value='until_stopped', command=self.on_repeat_mode_change).pack(side=tk.LEFT, padx=20)
-        
-        # ---- TWO-PANEL LAYOUT ----
-        panels_frame = ttk.Frame(main_frame)
-        panels_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # Left Panel - Click Details
-        left_panel = ttk.LabelFrame(panels_frame, text='Click Details', padding=6)
-        left_panel.pack(side=tk.LEFT, fill=tk.BOTH, expand=False, padx=(0, 4))
-        
-        # Position
-        ttk.Label(left_panel, text='Position:', font=('', 9, 'bold')).pack(anchor=tk.W)
-        pos_frame = ttk.Frame(left_panel)
-        pos_frame.pack(fill=tk.X, pady=(2, 6))
-        ttk.Label(pos_frame, text='X:').pack(side=tk.LEFT)
-        self.x_var = tk.StringVar(value='0')
-        ttk.Entry(pos_frame, textvariable=self.x_var, width=6).pack(side=tk.LEFT, padx=2)
-        ttk.Label(pos_frame, text='Y:').pack(side=tk.LEFT, padx=(10, 0))
-        self.y_var = tk.StringVar(value='0')
-        ttk.Entry(pos_frame, textvariable=self.y_var, width=6).pack(side=tk.LEFT, padx=2)
-        
-        # Click Type
-        ttk.Label(left_panel, text='Click Type:', font=('', 9, 'bold')).pack(anchor=tk.W)
-        self.type_var = tk.StringVar(value='left')
-        type_menu = ttk.Combobox(left_panel, textvariable=self.type_var, values=['left', 'right', 'double'], state='readonly', width=15)
-        type_menu.pack(fill=tk.X, pady=(2, 6))
-        
-        # Interval
-        ttk.Label(left_panel, text='Interval:', font=('', 9, 'bold')).pack(anchor=tk.W)
-        interval_frame = ttk.Frame(left_panel)
-        interval_frame.pack(fill=tk.X, pady=(2, 6))
-        
-        ttk.Label(interval_frame, text='Min:').pack(side=tk.LEFT)
-        self.min_var = tk.StringVar(value='0')
-        ttk.Entry(interval_frame, textvariable=self.min_var, width=3).pack(side=tk.LEFT, padx=2)
-        
-        ttk.Label(interval_frame, text='Sec:').pack(side=tk.LEFT, padx=(10, 0))
-        self.sec_var = tk.StringVar(value='0')
-        ttk.Entry(interval_frame, textvariable=self.sec_var, width=3).pack(side=tk.LEFT, padx=2)
-        
-        ttk.Label(interval_frame, text='Ms:').pack(side=tk.LEFT, padx=(10, 0))
-        self.ms_var = tk.StringVar(value='0')
-        ttk.Entry(interval_frame, textvariable=self.ms_var, width=3).pack(side=tk.LEFT, padx=2)
-        
-        # Get Current Position Button
-        ttk.Button(left_panel, text='Get Current Position', width=22, command=self.get_position).pack(fill=tk.X, pady=(6, 6))
-        
-        # Add/Update buttons
-        button_frame = ttk.Frame(left_panel)
-        button_frame.pack(fill=tk.X, pady=(0, 6))
-        ttk.Button(button_frame, text='Add Click', width=13, command=self.add_click).pack(side=tk.LEFT, padx=(0, 3))
-        ttk.Button(button_frame, text='Update', width=13, command=self.update_click).pack(side=tk.LEFT)
-        
-        # Help text
-        ttk.Label(left_panel, text='Click "Get Current Position"\nthen click anywhere on screen\nto capture coordinates.', 
-                  font=('', 8), foreground='gray', justify=tk.LEFT).pack(fill=tk.X, pady=(0, 0))
-        
-        # Right Panel - Click List + Controls
-        right_panel = ttk.LabelFrame(panels_frame, text='Clicks & Control', padding=6)
-        right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
-        
-        # Click List (Top)
-        list_frame = ttk.Frame(right_panel)
-        list_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 6))
-        
-        scroll = ttk.Scrollbar(list_frame)
-        scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        self.clicks_listbox = tk.Listbox(list_frame, yscrollcommand=scroll.set, font=('Courier', 8), height=12)
-        self.clicks_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.clicks_listbox.bind('<<ListboxSelect>>', self.on_click_select)
-        scroll.config(command=self.clicks_listbox.yview)
-        
-        # Control Buttons (Bottom)
-        control_frame = ttk.Frame(right_panel)
-        control_frame.pack(fill=tk.X)
-        
-        self.start_btn = ttk.Button(control_frame, text=f'Start ({self.start_hotkey})', command=self.start_clicking)
-        self.start_btn.pack(side=tk.LEFT, padx=(0, 4), fill=tk.X, expand=True)
-        
-        self.stop_btn = ttk.Button(control_frame, text=f'Stop ({self.stop_hotkey})', command=self.stop_clicking)
-        self.stop_btn.pack(side=tk.LEFT, fill=tk.X, expand=True)
-        
-        self.status_label = ttk.Label(right_panel, text='Ready', foreground='green', font=('', 9))
-        self.status_label.pack(pady=(4, 0))
-    
-    def set_hotkey(self):
-        """Set the hotkey"""
-        key = self.hotkey_var.get().strip()
-        if not key:
-            return
-        
-        self.start_hotkey = key
-        self.stop_hotkey = key
-        self.start_btn.config(text=f'Start ({key})')
-        self.stop_btn.config(text=f'Stop ({key})')
-    
-    def on_repeat_mode_change(self):
-        """Handle repeat mode radio button change"""
-        if self.repeat_mode_var.get() == 'until_stopped':
-            self.repeat_entry.config(state='disabled')
-        else:
-            self.repeat_entry.config(state='normal')
-    
-    def add_click(self):
-        """Add a new click from the left panel"""
-        try:
-            x = int(self.x_var.get())
-            y = int(self.y_var.get())
-            minutes = int(self.min_var.get())
-            seconds = int(self.sec_var.get())
-            milliseconds = int(self.ms_var.get())
-            
-            click = {
-                'x': x,
-                'y': y,
-                'type': self.type_var.get(),
-                'minutes': minutes,
-                'seconds': seconds,
-                'milliseconds': milliseconds
-            }
-            
-            self.executor.clicks.append(click)
-            self.refresh_clicks_display()
-        except ValueError:
-            pass
-    
-    def update_click(self):
-        """Update the currently selected click"""
-        if self.current_click_index < 0:
-            return
-        
-        try:
-            x = int(self.x_var.get())
-            y = int(self.y_var.get())
-            minutes = int(self.min_var.get())
-            seconds = int(self.sec_var.get())
-            milliseconds = int(self.ms_var.get())
-            
-            click = self.executor.clicks[self.current_click_index]
-            click['x'] = x
-            click['y'] = y
-            click['type'] = self.type_var.get()
-            click['minutes'] = minutes
-            click['seconds'] = seconds
-            click['milliseconds'] = milliseconds
-            
-            self.refresh_clicks_display()
-        except ValueError:
-            pass
-    
-    def on_click_select(self, event):
-        """Load selected click into the editor"""
-        selection = self.clicks_listbox.curselection()
-        if not selection:
-            return
-        
-        idx = selection[0]
-        self.current_click_index = idx
-        click = self.executor.clicks[idx]
-        
-        self.x_var.set(str(click['x']))
-        self.y_var.set(str(click['y']))
-        self.type_var.set(click['type'])
-        self.min_var.set(str(click.get('minutes', 0)))
-        self.sec_var.set(str(click.get('seconds', 0)))
-        self.ms_var.set(str(click.get('milliseconds', 100)))
-    
-    def refresh_clicks_display(self):
-        """Refresh the listbox display"""
-        self.clicks_listbox.delete(0, tk.END)
-        for idx, click in enumerate(self.executor.clicks):
-            minutes = click.get('minutes', 0)
-            seconds = click.get('seconds', 0)
-            milliseconds = click.get('milliseconds', 100)
-            interval = f"{minutes}m {seconds}s {milliseconds}ms"
-            text = f"{idx+1}. ({click['x']},{click['y']}) {click['type'].upper()} {interval}"
-            self.clicks_listbox.insert(tk.END, text)
-        
-        self.current_click_index = -1
-        self.clear_click_editor()
-    
-    def clear_click_editor(self):
-        """Clear the left panel editor"""
-        self.x_var.set('0')
-        self.y_var.set('0')
-        self.type_var.set('left')
-        self.min_var.set('0')
-        self.sec_var.set('0')
-        self.ms_var.set('100')
-    
-    def get_position(self):
-        """Wait for user to click and capture position (physical coordinates)"""
-        if self.listening_for_position:
-            return
-        
-        self.listening_for_position = True
-        
-        def on_click(x, y, button, pressed):
-            """Capture mouse click position"""
-            if pressed and self.listening_for_position:
-                self.x_var.set(str(int(x)))
-                self.y_var.set(str(int(y)))
-                self.listening_for_position = False
-                return False  # Stop listener
-            return True
-        
-        # Create listener in background thread and clean it up immediately after capture
-        def listen():
-            with pynput_mouse.Listener(on_click=on_click) as listener:
-                listener.join()
-        
-        thread = threading.Thread(target=listen, daemon=True)
-        thread.start()
-    
-    def on_mouse_click(self, x, y, pressed):
-        """Capture mouse click position"""
-        if pressed and self.listening_for_position:
-            self.x_var.set(str(x))
-            self.y_var.set(str(y))
-            self.listening_for_position = False
-            messagebox.showinfo('Position', f'Captured: ({x}, {y})')
+    def find(self, title=None, class_name=None):
+        return self._find(class_name, title) or None
+
+    def post(self, hwnd, msg, wparam, lparam):
+        return bool(self._post(hwnd, msg, wparam, lparam))
+
+    def screen_to_client(self, hwnd, x, y):
+        point = POINT(x, y)
+        self._screen_to_client(hwnd, ctypes.byref(point))
+        return point.x, point.y
+
+class FakeWindows:
+    """
+    Stand-in for Win32Windows. windows maps handle -> (title, class_name,
+    (left, top) of the client area); posted messages are recorded as
+    (hwnd, msg, wparam, lparam). close() makes posting to a handle fail like
+    a destroyed window.
+    """
+    def __init__(self, windows=None):
+        self.windows = dict(windows or {})
+        self.posted = []
+        self.find_calls = 0
+
+    def find(self, title=None, class_name=None):
+        self.find_calls += 1
+        for hwnd, (window_title, window_class, _) in self.windows.items():
+            if (title is None or title == window_title) and (class_name is None or class_name == window_class):
+                return hwnd
+        return None
+
+    def post(self, hwnd, msg, wparam, lparam):
+        if hwnd not in self.windows:
             return False
-    
-    def start_clicking(self):
-        """Start the autoclick"""
-        if self.executor.running:
-            return
-        
-        if not self.executor.clicks:
+        self.posted.append((hwnd, msg, wparam, lparam))
+        return True
+
+    def screen_to_client(self, hwnd, x, y):
+        left, top = self.windows[hwnd][2]
+        return x - left, y - top
+
+    def close(self, hwnd):
+        self.windows.pop(hwnd, None)
+
+def describe_window(title=None, class_name=None):
+    """Human-readable window selector"""
+    parts = []
+    if title is not None:
+        parts.append(f'title {title!r}')
+    if class_name is not None:
+        parts.append(f'class {class_name!r}')
+    return ' and '.join(parts) or 'any window'
+
+class WindowCache:
+    """
+    Resolves (title, class_name) to a window handle once and shares it
+    between backends; a selector is looked up again only after invalidate().
+    """
+    def __init__(self, windows):
+        self.windows = windows
+        self._handles = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, title=None, class_name=None):
+        """Window handle for the selector; ValueError if no such window"""
+        key = (title, class_name)
+        hwnd = self._handles.get(key)
+        if hwnd is not None:
+            return hwnd
+        with self._lock:
+            hwnd = self._handles.get(key)
+            if hwnd is None:
+                hwnd = self.windows.find(title, class_name)
+                if hwnd is None:
+                    raise ValueError(f'Window not found: {describe_window(title, class_name)}')
+                self._handles[key] = hwnd
+        return hwnd
+
+    def invalidate(self, title=None, class_name=None):
+        """Forget the cached handle, e.g. after the window was closed"""
+        self._handles.pop((title, class_name), None)
+
+_window_cache = None
+
+def default_window_cache():
+    """Process-wide WindowCache over the real Win32 windows"""
+    global _window_cache
+    if _window_cache is None:
+        _window_cache = WindowCache(Win32Windows())
+    return _window_cache
+
+class PostMessageBackend:
+    """
+    Background backend: posts client-relative mouse messages to one window
+    and never moves the cursor. The window is resolved when the backend is
+    created (ValueError if missing) and looked up again if a post fails
+    because it was closed and reopened; batches that still can't be
+    delivered are counted in failed.
+    """
+    def __init__(self, title=None, class_name=None, cache=None):
+        self.cache = cache if cache is not None else default_window_cache()
+        self.title = title
+        self.class_name = class_name
+        self.hwnd = self.cache.resolve(title, class_name)
+        self.failed = 0
+
+    def prepare(self, x, y, action, count=1, move=True):
+        return build_window_messages(x, y, action, count, move)
+
+    def _post_all(self, batch):
+        post = self.cache.windows.post
+        hwnd = self.hwnd
+        for msg, wparam, lparam in batch:
+            if not post(hwnd, msg, wparam, lparam):
+                return False
+        return True
+
+    def send(self, batch):
+        if self._post_all(batch):
             return
-        
+        self.cache.invalidate(self.title, self.class_name)
         try:
-            if self.repeat_mode_var.get() == 'until_stopped':
-                self.executor.repeat_until_stopped = True
-                self.executor.repeat_count = 1
-            else:
-                self.executor.repeat_until_stopped = False
-                self.executor.repeat_count = int(self.repeat_var.get())
+            self.hwnd = self.cache.resolve(self.title, self.class_name)
         except ValueError:
+            self.failed += 1
             return
-        
-        self.executor.start()
-        self.status_label.config(text='Running', foreground='red')
-    
-    def stop_clicking(self):
-        """Stop the autoclick"""
-        self.executor.stop()
-        self.status_label.config(text='Stopped', foreground='orange')
-    
-    def start_hotkey_listener(self):
-        """Start listening for hotkey presses"""
-        def listen():
-            previous_state = {}
-            
-            while True:
-                try:
-                    # Check if the hotkey is pressed
-                    if keyboard.is_pressed(self.start_hotkey):
-                        if not previous_state.get(self.start_hotkey, False):
-                            # Key just pressed (transition from not pressed to pressed)
-                            previous_state[self.start_hotkey] = True
-                            
-                            # Toggle start/stop
-                            if self.executor.running:
-                                self.stop_clicking()
-                            else:
-                                self.start_clicking()
-                    else:
-                        # Key released
-                        previous_state[self.start_hotkey] = False
-                    
-                    time.sleep(0.05)  # Small delay to avoid busy-waiting
-                except Exception:
-                    time.sleep(0.1)
-        
-        self.hotkey_thread = threading.Thread(target=listen, daemon=True)
-        self.hotkey_thread.start()
-    
-    def save_profile(self, profile_name):
-        """Save current configuration to a profile"""
-        data = {
-            'hotkey': self.start_hotkey,
-            'repeat_mode': self.repeat_mode_var.get(),
-            'repeat_count': int(self.repeat_var.get()),
-            'clicks': self.executor.clicks
-        }
-        save_profile(profile_name, data)
-    
-    def load_profile(self, profile_name):
-        """Load a profile"""
-        data = load_profile(profile_name)
-        if data:
-            self.executor.clicks = data.get('clicks', [])
-            self.hotkey_var.set(data.get('hotkey', '`'))
-            self.set_hotkey()
-            self.repeat_mode_var.set(data.get('repeat_mode', 'repeat'))
-            self.repeat_var.set(str(data.get('repeat_count', 1)))
-            self.on_repeat_mode_change()
-            self.refresh_clicks_display()
+        if not self._post_all(batch):
+            self.failed += 1
+
+def window_backend(spec, cache=None):
+    """PostMessageBackend for a profile's 'window' entry ({'title', 'class'}), or None"""
+    if not spec or not (spec.get('title') or spec.get('class')):
+        return None
+    return PostMessageBackend(spec.get('title') or None, spec.get('class') or None, cache)
 
 # ============================================================================
-# Main Entry Point
+# Screen Capture
+# ============================================================================
+#
+# Wait steps (see WaitCondition) sample small screen regions. A frame source
+# grabs one region and returns it as packed RGB bytes, row by row:
+#   grab(left, top, width, height) -> bytes of width * height * 3
+# GdiFrameSource reads the real screen; SyntheticFrameSource serves an
+# in-memory screen, so wait steps can be exercised off Windows.
+
+SRCCOPY = 0x00CC0020
+CAPTUREBLT = 0x40000000
+
+# Grabs of one region younger than this are shared between wait steps
+CAPTURE_TICK_NS = 1_000_000
+CAPTURE_CACHE_SIZE = 64
+
+def bgra_to_rgb(bgra):
+    """Packed BGRA (GDI's 32-bit DIB layout) -> packed RGB bytes"""
+    rgb = bytearray(len(bgra) // 4 * 3)
+    rgb[0::3] = bgra[2::4]
+    rgb[1::3] = bgra[1::4]
+    rgb[2::3] = bgra[0::4]
+    return bytes(rgb)
+
+class BITMAPINFOHEADER(Structure):
+    _fields_ = [
+        ('biSize', c_uint32),
+        ('biWidth', c_int32),
+        ('biHeight', c_int32),
+        ('biPlanes', ctypes.c_uint16),
+        ('biBitCount', ctypes.c_uint16),
+        ('biCompression', c_uint32),
+        ('biSizeImage', c_uint32),
+        ('biXPelsPerMeter', c_int32),
+        ('biYPelsPerMeter', c_int32),
+        ('biClrUsed', c_uint32),
+        ('biClrImportant', c_uint32),
+    ]
+
+class GdiFrameSource:
+    """
+    Grabs screen regions with one BitBlt into a top-down 32-bit DIB section.
+    The memory DC and a DIB per region size are kept between grabs; call
+    close() to free them. Not thread-safe on its own (CaptureCache
+    serializes grabs).
+    """
+    def __init__(self):
+        user32, gdi32 = windll.user32, windll.gdi32
+        user32.GetDC.argtypes = (c_void_p,)
+        user32.GetDC.restype = c_void_p
+        user32.ReleaseDC.argtypes = (c_void_p, c_void_p)
+        gdi32.CreateCompatibleDC.argtypes = (c_void_p,)
+        gdi32.CreateCompatibleDC.restype = c_void_p
+        gdi32.CreateDIBSection.argtypes = (c_void_p, POINTER(BITMAPINFOHEADER), c_uint, POINTER(c_void_p), c_void_p, c_uint32)
+        gdi32.CreateDIBSection.restype = c_void_p
+        gdi32.SelectObject.argtypes = (c_void_p, c_void_p)
+        gdi32.SelectObject.restype = c_void_p
+        gdi32.BitBlt.argtypes = (c_void_p, c_int, c_int, c_int, c_int, c_void_p, c_int, c_int, c_uint32)
+        gdi32.DeleteObject.argtypes = (c_void_p,)
+        gdi32.DeleteDC.argtypes = (c_void_p,)
+        self._user32, self._gdi32 = user32, gdi32
+        self._screen_dc = user32.GetDC(None)
+        self._mem_dc = gdi32.CreateCompatibleDC(self._screen_dc)
+        self._dibs = {}  # (width, height) -> (bitmap, bits pointer)
+
+    def _dib(self, width, height):
+        dib = self._dibs.get((width, height))
+        if dib is None:
+            header = BITMAPINFOHEADER(ctypes.sizeof(BITMAPINFOHEADER), width, -height, 1, 32, 0, 0, 0, 0, 0, 0)
+            bits = c_void_p()
+            bitmap = self._gdi32.CreateDIBSection(self._mem_dc, ctypes.byref(header), 0, ctypes.byref(bits), None, 0)
+            if not bitmap:
+                raise OSError(f'CreateDIBSection failed for {width}x{height}')
+            dib = self._dibs[width, height] = (bitmap, bits.value)
+        return dib
+
+    def grab(self, left, top, width, height):
+        bitmap, bits = self._dib(width, height)
+        gdi32 = self._gdi32
+        previous = gdi32.SelectObject(self._mem_dc, bitmap)
+        try:
+            if not gdi32.BitBlt(self._mem_dc, 0, 0, width, height, self._screen_dc, left, top, SRCCOPY | CAPTUREBLT):
+                raise OSError('BitBlt failed')
+        finally:
+            gdi32.SelectObject(self._mem_dc, previous)
+        return bgra_to_rgb(ctypes.string_at(bits, width * height * 4))
+
+    def close(self):
+        for bitmap, _bits in self._dibs.values():
+            self._gdi32.DeleteObject(bitmap)
+        self._dibs = {}
+        if self._mem_dc:
+            self._gdi32.DeleteDC(self._mem_dc)
+            self._user32.ReleaseDC(None, self._screen_dc)
+            self._mem_dc = self._screen_dc = None
+
+class SyntheticFrameSource:
+    """
+    In-memory screen for tests and benchmarks: width x height RGB pixels,
+    changed with fill() / paste(). Regions outside the screen read as black.
+    grabs counts grab() calls.
+    """
+    def __init__(self, width, height, color=(0, 0, 0)):
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(bytes(color) * (width * height))
+        self.grabs = 0
+
+    def fill(self, left, top, width, height, color):
+        """Paint a rectangle in one colour"""
+        self.paste(left, top, width, height, bytes(color) * (width * height))
+
+    def paste(self, left, top, width, height, rgb):
+        """Copy packed RGB rows into the screen at (left, top)"""
+        for row in range(height):
+            start = ((top + row) * self.width + left) * 3
+            self.pixels[start:start + width * 3] = rgb[row * width * 3:(row + 1) * width * 3]
+
+    def grab(self, left, top, width, height):
+        self.grabs += 1
+        if left < 0 or top < 0 or left + width > self.width or top + height > self.height:
+            rows = []
+            for y in range(top, top + height):
+                for x in range(left, left + width):
+                    inside = 0 <= x < self.width and 0 <= y < self.height
+                    start = (y * self.width + x) * 3
+                    rows.append(bytes(self.pixels[start:start + 3]) if inside else b'\0\0\0')
+            return b''.join(rows)
+        if width == self.width:
+            start = top * self.width * 3
+            return bytes(self.pixels[start:start + width * height * 3])
+        stride = self.width * 3
+        start = (top * self.width + left) * 3
+        return b''.join(self.pixels[start + row * stride:start + row * stride + width * 3] for row in range(height))
+
+class CaptureCache:
+    """
+    Shares region grabs between wait steps, and between executors when they
+    use the same cache: a region grabbed less than tick_ns ago is served from
+    the cache instead of the screen. Grabs are serialized, so executors
+    polling the same region in the same tick cause one grab between them.
+    """
+    def __init__(self, source, tick_ns=CAPTURE_TICK_NS):
+        self.source = source
+        self.tick_ns = tick_ns
+        self._frames = {}  # region -> (time_ns, frame)
+        self._lock = threading.Lock()
+        self.grabs = 0
+        self.hits = 0
+
+    def grab(self, region, now_ns):
+        """Packed RGB bytes of region (left, top, width, height) as of now_ns"""
+        with self._lock:
+            cached = self._frames.get(region)
+            if cached is not None and 0 <= now_ns - cached[0] < self.tick_ns:
+                self.hits += 1
+                return cached[1]
+            frame = self.source.grab(*region)
+            if len(self._frames) >= CAPTURE_CACHE_SIZE:
+                self._frames.clear()
+            self._frames[region] = (now_ns, frame)
+            self.grabs += 1
+            return frame
+
+_capture_cache = None
+
+def default_capture_cache():
+    """Process-wide CaptureCache over the real screen"""
+    global _capture_cache
+    if _capture_cache is None:
+        _capture_cache = CaptureCache(GdiFrameSource())
+    return _capture_cache
+
 # ============================================================================
+# Display Topology
+# ============================================================================
+#
+# Coordinates are physical pixels of the virtual desktop, so a profile stops
+# lining up when monitors are rearranged or resized. A profile's 'anchor'
+# makes its coordinates relative to a monitor or a window instead:
+#   'monitor'  'primary', an index (primary first, then left to right) or a
+#              device name such as '\\.\DISPLAY2', which survives rearranging
+#   'window'   {'title', 'class'}: the client area of a top-level window
+#   'basis'    {'width', 'height', 'dpi'} of the monitor or client area the
+#              coordinates were taken on
+#   'scale'    'size' (default) stretches coordinates with the area's size,
+#              'dpi' with its scaling setting, 'none' only moves them
+# The anchor is resolved once per run into a Placement, which turns the whole
+# plan into screen coordinates before playback (see ClickExecutor.anchor).
+# The layout comes from a displays object (Win32Displays, or
+# SyntheticDisplays off Windows):
+#   monitors() -> [Monitor], primary first
+#   window_area(title, class_name) -> (left, top, width, height, dpi) of the
+#       client area on screen, or None
+#   watch(callback) -> calls callback() after each display change
+
+DEFAULT_DPI = 96
+ANCHOR_SCALES = ('size', 'dpi', 'none')
+# Plans at least this long are placed with NumPy when it is installed
+PLACE_NUMPY_MIN_STEPS = 32
+
+WM_SETTINGCHANGE = 0x001A
+WM_DISPLAYCHANGE = 0x007E
+WM_DPICHANGED = 0x02E0
+DISPLAY_CHANGE_MESSAGES = (WM_SETTINGCHANGE, WM_DISPLAYCHANGE, WM_DPICHANGED)
+MONITORINFOF_PRIMARY = 0x0001
+MDT_EFFECTIVE_DPI = 0
+
+class Monitor:
+    """One monitor: device name, (left, top, width, height) in physical pixels, effective dpi"""
+    __slots__ = ('device', 'left', 'top', 'width', 'height', 'dpi', 'primary')
+
+    def __init__(self, device, left, top, width, height, dpi=DEFAULT_DPI, primary=False):
+        self.device = device
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self.primary = primary
+
+    def area(self):
+        """(left, top, width, height, dpi)"""
+        return self.left, self.top, self.width, self.height, self.dpi
+
+    def contains(self, x, y):
+        return self.left <= x < self.left + self.width and self.top <= y < self.top + self.height
+
+class RECT(Structure):
+    _fields_ = [('left', c_int32), ('top', c_int32), ('right', c_int32), ('bottom', c_int32)]
+
+class MONITORINFOEXW(Structure):
+    _fields_ = [
+        ('cbSize', c_uint32),
+        ('rcMonitor', RECT),
+        ('rcWork', RECT),
+        ('dwFlags', c_uint32),
+        ('szDevice', ctypes.c_wchar * 32),
+    ]
+
+class WNDCLASSW(Structure):
+    _fields_ = [
+        ('style', c_uint),
+        ('lpfnWndProc', c_void_p),  # WNDPROC, passed as a cast pointer
+        ('cbClsExtra', c_int),
+        ('cbWndExtra', c_int),
+        ('hInstance', c_void_p),
+        ('hIcon', c_void_p),
+        ('hCursor', c_void_p),
+        ('hbrBackground', c_void_p),
+        ('lpszMenuName', c_wchar_p),
+        ('lpszClassName', c_wchar_p),
+    ]
+
+class MSG(Structure):
+    _fields_ = [
+        ('hwnd', c_void_p),
+        ('message', c_uint),
+        ('wParam', c_size_t),
+        ('lParam', c_ssize_t),
+        ('time', c_uint32),
+        ('pt', POINT),
+        ('lPrivate', c_uint32),
+    ]
+
+class Win32Displays:
+    """
+    Monitor layout through user32 (and shcore for per-monitor dpi). watch()
+    listens for display changes on a hidden top-level window, which gets
+    Windows' display-change broadcasts on its own message thread.
+    """
+    def __init__(self):
+        user32 = windll.user32
+        self._monitor_proc = ctypes.WINFUNCTYPE(c_int, c_void_p, c_void_p, POINTER(RECT), c_ssize_t)
+        self._window_proc = ctypes.WINFUNCTYPE(c_ssize_t, c_void_p, c_uint, c_size_t, c_ssize_t)
+        self._enum = user32.EnumDisplayMonitors
+        self._enum.argtypes = (c_void_p, c_void_p, self._monitor_proc, c_ssize_t)
+        self._info = user32.GetMonitorInfoW
+        self._info.argtypes = (c_void_p, POINTER(MONITORINFOEXW))
+        self._find = user32.FindWindowW
+        self._find.argtypes = (c_wchar_p, c_wchar_p)
+        self._find.restype = c_void_p
+        self._client_rect = user32.GetClientRect
+        self._client_rect.argtypes = (c_void_p, POINTER(RECT))
+        self._client_to_screen = user32.ClientToScreen
+        self._client_to_screen.argtypes = (c_void_p, POINTER(POINT))
+        self._default_proc = user32.DefWindowProcW
+        self._default_proc.argtypes = (c_void_p, c_uint, c_size_t, c_ssize_t)
+        self._default_proc.restype = c_ssize_t
+        self._proc = None  # The watcher's window procedure, kept alive
+
+    def _monitor_dpi(self, hmonitor):
+        dpi_x, dpi_y = c_uint(), c_uint()
+        try:
+            if windll.shcore.GetDpiForMonitor(c_void_p(hmonitor), MDT_EFFECTIVE_DPI, ctypes.byref(dpi_x), ctypes.byref(dpi_y)) == 0:
+                return dpi_x.value
+        except (AttributeError, OSError):
+            pass  # Before Windows 8.1
+        return DEFAULT_DPI
+
+    def monitors(self):
+        found = []
+
+        def on_monitor(hmonitor, hdc, rect, data):
+            info = MONITORINFOEXW()
+            info.cbSize = ctypes.sizeof(MONITORINFOEXW)
+            if self._info(hmonitor, ctypes.byref(info)):
+                r = info.rcMonitor
+                found.append(Monitor(info.szDevice, r.left, r.top, r.right - r.left, r.bottom - r.top,
+                                     self._monitor_dpi(hmonitor), bool(info.dwFlags & MONITORINFOF_PRIMARY)))
+            return 1
+
+        self._enum(None, None, self._monitor_proc(on_monitor), 0)
+        found.sort(key=lambda monitor: (not monitor.primary, monitor.left, monitor.top))
+        return found
+
+    def window_area(self, title=None, class_name=None):
+        hwnd = self._find(class_name, title)
+        if not hwnd:
+            return None
+        rect = RECT()
+        origin = POINT(0, 0)
+        if not self._client_rect(hwnd, ctypes.byref(rect)) or not self._client_to_screen(hwnd, ctypes.byref(origin)):
+            return None
+        try:
+            dpi = windll.user32.GetDpiForWindow(c_void_p(hwnd)) or DEFAULT_DPI
+        except AttributeError:
+            dpi = DEFAULT_DPI  # Before Windows 10 1607
+        return origin.x, origin.y, rect.right, rect.bottom, dpi
+
+    def watch(self, callback):
+        threading.Thread(target=self._pump, args=(callback,), daemon=True).start()
+
+    def _pump(self, callback):
+        user32 = windll.user32
+
+        def window_proc(hwnd, msg, wparam, lparam):
+            if msg in DISPLAY_CHANGE_MESSAGES:
+                callback()
+            return self._default_proc(hwnd, msg, wparam, lparam)
+
+        self._proc = self._window_proc(window_proc)
+        windll.kernel32.GetModuleHandleW.restype = c_void_p
+        instance = windll.kernel32.GetModuleHandleW(None)
+        class_name = 'AutoClickerDisplayWatch'
+        window_class = WNDCLASSW(lpfnWndProc=ctypes.cast(self._proc, c_void_p), hInstance=instance,
+                                 lpszClassName=class_name)
+        if not user32.RegisterClassW(ctypes.byref(window_class)):
+            return
+        create = user32.CreateWindowExW
+        create.argtypes = (c_uint32, c_wchar_p, c_wchar_p, c_uint32, c_int, c_int, c_int, c_int,
+                           c_void_p, c_void_p, c_void_p, c_void_p)
+        create.restype = c_void_p
+        # Never shown, but top-level, so display-change broadcasts reach it
+        if not create(0, class_name, class_name, 0, 0, 0, 0, 0, None, None, instance, None):
+            return
+        get_message = user32.GetMessageW
+        get_message.argtypes = (POINTER(MSG), c_void_p, c_uint, c_uint)
+        msg = MSG()
+        while get_message(ctypes.byref(msg), None, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+
+class SyntheticDisplays:
+    """
+    Stand-in for Win32Displays with a made-up layout. set_monitors() changes
+    it and reports a display change the way Windows would. windows maps
+    (title, class_name) -> client area (left, top, width, height, dpi).
+    queries counts monitors() calls.
+    """
+    def __init__(self, monitors, windows=None):
+        self._monitors = list(monitors)
+        self.windows = dict(windows or {})
+        self.queries = 0
+        self._callbacks = []
+
+    def monitors(self):
+        self.queries += 1
+        return list(self._monitors)
+
+    def window_area(self, title=None, class_name=None):
+        for (window_title, window_class), area in self.windows.items():
+            if (title is None or title == window_title) and (class_name is None or class_name == window_class):
+                return area
+        return None
+
+    def watch(self, callback):
+        self._callbacks.append(callback)
+
+    def set_monitors(self, monitors):
+        """Rearrange the layout (and report it)"""
+        self._monitors = list(monitors)
+        self.notify()
+
+    def notify(self):
+        """Report a display change"""
+        for callback in list(self._callbacks):
+            callback()
+
+class Placement:
+    """
+    Where anchor-relative coordinates land on screen:
+    x -> left + round(x * scale_x), y -> top + round(y * scale_y)
+    """
+    __slots__ = ('left', 'top', 'scale_x', 'scale_y')
+
+    def __init__(self, left=0, top=0, scale_x=1.0, scale_y=1.0):
+        self.left = left
+        self.top = top
+        self.scale_x = scale_x
+        self.scale_y = scale_y
+
+    def __eq__(self, other):
+        return isinstance(other, Placement) and (
+            (self.left, self.top, self.scale_x, self.scale_y) == (other.left, other.top, other.scale_x, other.scale_y))
+
+    def __repr__(self):
+        return f'Placement({self.left}, {self.top}, {self.scale_x:g}, {self.scale_y:g})'
+
+    @property
+    def identity(self):
+        return self.left == 0 and self.top == 0 and self.scale_x == 1 and self.scale_y == 1
+
+    def point(self, x, y):
+        """Screen coordinates of anchor-relative (x, y)"""
+        return self.left + round(x * self.scale_x), self.top + round(y * self.scale_y)
+
+    def relative(self, x, y):
+        """Anchor-relative coordinates of screen (x, y)"""
+        return round((x - self.left) / self.scale_x), round((y - self.top) / self.scale_y)
+
+    def apply(self, plan):
+        """
+        plan with its coordinates placed on screen, in one pass per column;
+        wait regions move with their steps. The plan itself if nothing moves.
+        """
+        if self.identity:
+            return plan
+        xs = place_column(plan.xs, self.left, self.scale_x)
+        ys = place_column(plan.ys, self.top, self.scale_y)
+        waits = plan.waits
+        if waits:
+            waits = {index: condition.centred_on(xs[index], ys[index]) for index, condition in waits.items()}
+        return ClickPlan(xs, ys, plan.actions, plan.intervals_ns, plan.jitter, waits)
+
+def place_column(column, origin, scale):
+    """array('i') of origin + round(value * scale) for a coordinate column"""
+    np = _numpy() if len(column) >= PLACE_NUMPY_MIN_STEPS else None
+    if np is not None:
+        values = np.frombuffer(column, dtype=np.int32)
+        if scale != 1:
+            values = np.rint(values * scale)
+        placed = array('i')
+        placed.frombytes((values + origin).astype(np.int32).tobytes())
+        return placed
+    if scale == 1:
+        return array('i', [origin + value for value in column])
+    return array('i', [origin + round(value * scale) for value in column])
+
+def map_click_points(clicks, transform):
+    """Copy of a click list (blocks included) with each (x, y) replaced by transform(x, y)"""
+    mapped = []
+    for entry in clicks:
+        if 'loop' in entry:
+            entry = {**entry, 'loop': map_click_points(entry['loop'], transform)}
+        elif 'define' in entry:
+            entry = {**entry, 'steps': map_click_points(entry['steps'], transform)}
+        elif 'x' in entry:
+            x, y = transform(int(entry['x']), int(entry['y']))
+            entry = {**entry, 'x': x, 'y': y}
+        mapped.append(entry)
+    return mapped
+
+class DisplayTopology:
+    """
+    Cached display layout over a displays object. monitors() asks it once
+    and keeps the answer until it reports a display change (or invalidate()
+    is called); subscribers, e.g. running executors with an anchor, are
+    told then. Window areas are looked up on every call, since windows move
+    without any display change.
+    """
+    def __init__(self, displays):
+        self.displays = displays
+        self._monitors = None
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.generation = 0  # Bumped on every invalidate()
+        displays.watch(self.invalidate)
+
+    def monitors(self):
+        """The monitors, primary first"""
+        monitors = self._monitors
+        if monitors is None:
+            with self._lock:
+                if self._monitors is None:
+                    self._monitors = tuple(self.displays.monitors())
+                monitors = self._monitors
+        return monitors
+
+    def invalidate(self):
+        """Forget the layout and tell the subscribers"""
+        with self._lock:
+            self._monitors = None
+            self.generation += 1
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    def subscribe(self, listener):
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def monitor(self, spec='primary'):
+        """Monitor for an anchor's 'monitor' entry; ValueError if there is none"""
+        monitors = self.monitors()
+        if spec == 'primary':
+            found = [monitor for monitor in monitors if monitor.primary] or monitors[:1]
+        elif isinstance(spec, int):
+            found = monitors[spec:spec + 1] if spec >= 0 else []
+        else:
+            found = [monitor for monitor in monitors if monitor.device == spec]
+        if not found:
+            raise ValueError(f'Monitor not found: {spec!r}')
+        return found[0]
+
+    def monitor_at(self, x, y):
+        """Monitor containing screen (x, y), or None"""
+        for monitor in self.monitors():
+            if monitor.contains(x, y):
+                return monitor
+        return None
+
+    def virtual_screen(self):
+        """(left, top, width, height) spanning every monitor"""
+        monitors = self.monitors()
+        left = min(monitor.left for monitor in monitors)
+        top = min(monitor.top for monitor in monitors)
+        right = max(monitor.left + monitor.width for monitor in monitors)
+        bottom = max(monitor.top + monitor.height for monitor in monitors)
+        return left, top, right - left, bottom - top
+
+    def area(self, anchor):
+        """(left, top, width, height, dpi) an anchor refers to; ValueError if it is gone"""
+        window = anchor.get('window')
+        if window:
+            title, class_name = window.get('title') or None, window.get('class') or None
+            area = self.displays.window_area(title, class_name)
+            if area is None:
+                raise ValueError(f'Window not found: {describe_window(title, class_name)}')
+            return area
+        if 'monitor' not in anchor:
+            raise ValueError(f"An anchor needs a 'monitor' or 'window': {anchor!r}")
+        return self.monitor(anchor['monitor']).area()
+
+    def placement(self, anchor):
+        """Placement of coordinates relative to anchor (see Display Topology)"""
+        scale = anchor.get('scale', 'size')
+        if scale not in ANCHOR_SCALES:
+            raise ValueError(f'Unknown anchor scale: {scale!r}')
+        left, top, width, height, dpi = self.area(anchor)
+        basis = anchor.get('basis') or {}
+        scale_x = scale_y = 1.0
+        if scale == 'size':
+            scale_x = width / basis.get('width', width)
+            scale_y = height / basis.get('height', height)
+        elif scale == 'dpi':
+            scale_x = scale_y = dpi / basis.get('dpi', dpi)
+        return Placement(left, top, scale_x, scale_y)
+
+    def anchor(self, monitor=None, window=None, scale='size'):
+        """Anchor for a monitor or window spec, with the basis it has right now"""
+        anchor = {'window': window} if window else {'monitor': 'primary' if monitor is None else monitor}
+        _, _, width, height, dpi = self.area(anchor)
+        anchor['basis'] = {'width': width, 'height': height, 'dpi': dpi}
+        if scale != 'size':
+            anchor['scale'] = scale
+        return anchor
+
+_display_topology = None
+
+def default_display_topology():
+    """Process-wide DisplayTopology over the real displays"""
+    global _display_topology
+    if _display_topology is None:
+        _display_topology = DisplayTopology(Win32Displays())
+    return _display_topology
+
+# ============================================================================
+# Clocks & Scheduling
+# ============================================================================
+
+# Event waits are only as fine as the OS timer tick (~15.6 ms on Windows),
+# so MonotonicClock.wait() leaves this much for short sleeps at the end
+EVENT_WAIT_MARGIN_S = 0.02
+WAIT_SLICE_S = 0.001
+
+class MonotonicClock:
+    """Real clock: monotonic nanoseconds + OS sleep"""
+    now_ns = staticmethod(time.perf_counter_ns)
+    sleep = staticmethod(time.sleep)
+
+    @staticmethod
+    def wait(event, seconds):
+        """Sleep up to seconds; return True as soon as event is set"""
+        end = time.perf_counter() + seconds
+        if seconds > EVENT_WAIT_MARGIN_S and event.wait(seconds - EVENT_WAIT_MARGIN_S):
+            return True
+        while not event.is_set():
+            left = end - time.perf_counter()
+            if left <= 0:
+                return False
+            time.sleep(min(left, WAIT_SLICE_S))
+        return True
+
+class VirtualClock:
+    """
+    Fake clock for tests/benchmarks. Time only moves when something sleeps
+    or reads it: every now_ns() call costs read_cost_ns (so spin loops end),
+    and every sleep() overshoots by sleep_overshoot_ns like a real OS would.
+    """
+    def __init__(self, start_ns=0, read_cost_ns=1000, sleep_overshoot_ns=0):
+        self._now = start_ns
+        self.read_cost_ns = read_cost_ns
+        self.sleep_overshoot_ns = sleep_overshoot_ns
+
+    def now_ns(self):
+        now = self._now
+        self._now += self.read_cost_ns
+        return now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self._now += int(seconds * 1_000_000_000) + self.sleep_overshoot_ns
+
+    def wait(self, event, seconds):
+        if event.is_set():
+            return True
+        self.sleep(seconds)
+        return False
+
+    def advance(self, ns):
+        self._now += ns
+
+class DeadlineScheduler:
+    """
+    Waits for absolute monotonic deadlines instead of relative sleeps, so
+    injection time and sleep overshoot don't accumulate into drift.
+    Waiting is hybrid: coarse OS sleep until spin_ns before the deadline,
+    then busy-wait on the clock for the remainder. With a wake event both
+    phases end as soon as the event is set.
+    """
+    def __init__(self, clock, spin_ns=2_000_000, wake=None):
+        self.clock = clock
+        self.spin_ns = spin_ns
+        self.wake = wake
+
+    def wait_until(self, deadline_ns):
+        """Block until deadline_ns, return lateness in ns (>= 0), or None if woken"""
+        clock = self.clock
+        now = clock.now_ns()
+        remaining = deadline_ns - now
+        if remaining > self.spin_ns:
+            seconds = (remaining - self.spin_ns) / 1_000_000_000
+            if self.wake is None:
+                clock.sleep(seconds)
+            elif clock.wait(self.wake, seconds):
+                return None
+            now = clock.now_ns()
+        wake = self.wake
+        if wake is None:
+            while now < deadline_ns:
+                now = clock.now_ns()
+        else:
+            while now < deadline_ns:
+                if wake.is_set():
+                    return None
+                now = clock.now_ns()
+        return now - deadline_ns
+
+# ============================================================================
+# Execution Plan
+# ============================================================================
+
+def click_interval_ns(click):
+    """
+    Interval after a click, in nanoseconds. minutes, seconds and
+    milliseconds may be fractional; ValueError unless they are numbers >= 0.
+    """
+    minutes = click.get('minutes', 0)
+    seconds = click.get('seconds', 0)
+    milliseconds = click.get('milliseconds', 100)
+    if type(minutes) is int and type(seconds) is int and type(milliseconds) is int:
+        if minutes >= 0 and seconds >= 0 and milliseconds >= 0:
+            return (minutes * 60 + seconds) * 1_000_000_000 + milliseconds * 1_000_000
+    for value in (minutes, seconds, milliseconds):
+        # Also rejects NaN and infinity
+        if not isinstance(value, (int, float)) or not 0 <= value < math.inf:
+            raise ValueError(f'Interval fields must be numbers >= 0: {click!r}')
+    return round((minutes * 60 + seconds) * 1e9 + milliseconds * 1e6)
+
+class ClickPlan:
+    """
+    Immutable, array-backed form of a click list. Compiled once per start so
+    the playback loop only indexes arrays:
+      xs, ys        array('i') coordinates
+      actions       array('B') action codes (index into STEP_TYPES)
+      intervals_ns  array('q') delay after each step
+      jitter        JitterSpec, or None when no step is jittered
+      waits         {step index: WaitCondition}, or None without wait steps
+    """
+    __slots__ = ('xs', 'ys', 'actions', 'intervals_ns', 'jitter', 'waits')
+
+    def __init__(self, xs, ys, actions, intervals_ns, jitter=None, waits=None):
+        object.__setattr__(self, 'xs', xs)
+        object.__setattr__(self, 'ys', ys)
+        object.__setattr__(self, 'actions', actions)
+        object.__setattr__(self, 'intervals_ns', intervals_ns)
+        object.__setattr__(self, 'jitter', jitter)
+        object.__setattr__(self, 'waits', waits)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ClickPlan is immutable')
+
+    def __len__(self):
+        return len(self.actions)
+
+def compile_plan(clicks):
+    """Compile a list of click dicts (and blocks, see Blocks) into a ClickPlan"""
+    xs = array('i')
+    ys = array('i')
+    actions = array('B')
+    intervals_ns = array('q')
+    for click in clicks:
+        if 'repeat' in click or 'type' not in click:
+            return flatten_blocks(clicks)
+        click_type = click['type']
+        if click_type not in STEP_CODES:
+            raise ValueError(f'Unknown click type: {click_type!r}')
+        xs.append(int(click['x']))
+        ys.append(int(click['y']))
+        actions.append(STEP_CODES[click_type])
+        intervals_ns.append(click_interval_ns(click))
+    waits = wait_indices(actions)
+    if waits:
+        wait_set = set(waits)
+        jitter = compile_jitter(len(actions), ((i, c) for i, c in enumerate(clicks) if i not in wait_set))
+        waits = compile_waits(((i, clicks[i]) for i in waits), xs, ys)
+    else:
+        jitter = compile_jitter(len(actions), enumerate(clicks))
+        waits = None
+    return ClickPlan(xs, ys, actions, intervals_ns, jitter, waits)
+
+# ----------------------------------------------------------------------------
+# Jitter
+#
+# A click may carry humanizing jitter, applied afresh every cycle:
+#   'jitter_ms'  largest interval offset in milliseconds (+/-)
+#   'jitter_px'  largest offset of x and y in pixels (+/-)
+#   'jitter'     distribution: 'uniform' (default) or 'gaussian' (sigma is
+#                half the spread, clipped to the spread)
+# The profile's 'jitter_seed' makes runs reproducible.
+
+JITTER_DISTRIBUTIONS = ('uniform', 'gaussian')
+# Jittered positions keep at most this many prepared batches
+JITTER_BATCH_CACHE = 65536
+
+class JitterSpec:
+    """
+    Per-step jitter settings as arrays (see ClickPlan.jitter):
+      interval_spread_ns  array('q')
+      position_spread     array('i')
+      gaussian            array('B') 1 where the distribution is gaussian
+    """
+    __slots__ = ('interval_spread_ns', 'position_spread', 'gaussian')
+
+    def __init__(self, interval_spread_ns, position_spread, gaussian):
+        self.interval_spread_ns = interval_spread_ns
+        self.position_spread = position_spread
+        self.gaussian = gaussian
+
+def compile_jitter(count, steps):
+    """JitterSpec from (index, click or extras dict) pairs, or None if nothing is jittered"""
+    spec = None
+    for index, click in steps:
+        jitter_ms = click.get('jitter_ms', 0)
+        jitter_px = click.get('jitter_px', 0)
+        if not jitter_ms and not jitter_px:
+            continue
+        distribution = click.get('jitter', 'uniform')
+        if distribution not in JITTER_DISTRIBUTIONS:
+            raise ValueError(f'Unknown jitter distribution: {distribution!r}')
+        if spec is None:
+            spec = JitterSpec(array('q', bytes(8 * count)), array('i', bytes(4 * count)), array('B', bytes(count)))
+        spec.interval_spread_ns[index] = int(abs(jitter_ms) * 1_000_000)
+        spec.position_spread[index] = abs(int(jitter_px))
+        spec.gaussian[index] = distribution == 'gaussian'
+    return spec
+
+def _numpy():
+    """numpy if installed (imported on first use), else None"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+class JitterGenerator:
+    """
+    Draws a whole cycle of jitter at once and returns the two tables the
+    sequence loop indexes: a batch and an interval per step. Offsets are
+    vectorized with NumPy when it is installed (use_numpy=None) and drawn
+    with random.Random otherwise; a given seed reproduces a run exactly as
+    long as the same generator is used. Jittered positions are prepared
+    through a bounded cache, so after warm-up a cycle makes no prepare()
+    calls.
+
+    The tables and scratch buffers are allocated once per plan and refilled
+    every cycle, so the tables returned are only valid until the next call.
+    """
+    def __init__(self, seed, prepare, use_numpy=None):
+        np = _numpy() if use_numpy is not False else None
+        if use_numpy and np is None:
+            raise ImportError('numpy is not installed')
+        self.np = np
+        if np is not None:
+            self.rng = np.random.default_rng(seed)
+        else:
+            import random
+            self.rng = random.Random(seed)
+        self.prepare = prepare
+        self._plan = None
+        self._base_batches = None
+        self._cache = {}
+
+    def _load(self, plan):
+        """Index the jittered steps of a new plan and allocate its buffers"""
+        spec = plan.jitter
+        self._plan = plan
+        self._base_batches = None
+        self._timed = [i for i, spread in enumerate(spec.interval_spread_ns) if spread]
+        self._moved = [i for i, spread in enumerate(spec.position_spread) if spread]
+        # Only jittered entries change from cycle to cycle; the rest keep
+        # the plan's values
+        self._intervals_ns = array('q', plan.intervals_ns)
+        self._batches = None
+        self._dxs = array('q', bytes(8 * len(self._moved)))
+        self._dys = array('q', bytes(8 * len(self._moved)))
+        self._offsets = array('q', bytes(8 * len(self._timed)))
+        if self.np is not None:
+            np = self.np
+            timed = np.array(self._timed, dtype=np.intp)
+            self._np_timed = timed
+            # Unjittered intervals of the timed steps, a copy so no buffer
+            # export pins a mapped profile open
+            self._np_base_intervals = np.array([plan.intervals_ns[i] for i in self._timed], dtype=np.int64)
+            # Views, so NumPy writes straight into the arrays handed out
+            self._np_intervals = np.frombuffer(self._intervals_ns, dtype=np.int64)
+            self._np_offsets_out = np.frombuffer(self._offsets, dtype=np.int64)
+            self._np_dxs = np.frombuffer(self._dxs, dtype=np.int64)
+            self._np_dys = np.frombuffer(self._dys, dtype=np.int64)
+            self._np_timed_draw = self._np_draw([spec.interval_spread_ns[i] for i in self._timed],
+                                                [spec.gaussian[i] for i in self._timed])
+            self._np_moved_draw = self._np_draw([spec.position_spread[i] for i in self._moved],
+                                                [spec.gaussian[i] for i in self._moved])
+
+    def _np_draw(self, spreads, gaussian):
+        """(spreads, gaussian, normal, unit): one group's settings and scratch"""
+        np = self.np
+        n = len(spreads)
+        return (np.array(spreads, dtype=np.float64), np.array(gaussian, dtype=bool),
+                np.empty(n, dtype=np.float64), np.empty(n, dtype=np.float64))
+
+    def _np_offsets(self, draw, out):
+        """Fill out (int64) with offsets for one group"""
+        np = self.np
+        spreads, gaussian, normal, unit = draw
+        rng = self.rng
+        rng.standard_normal(out=normal)
+        normal *= 0.5
+        np.clip(normal, -1.0, 1.0, out=normal)
+        rng.random(out=unit)
+        unit *= 2.0
+        unit -= 1.0
+        np.copyto(unit, normal, where=gaussian)
+        unit *= spreads
+        np.rint(unit, out=unit)
+        np.copyto(out, unit, casting='unsafe')
+
+    def _py_offsets(self, indices, spreads, gaussian, out):
+        rng = self.rng
+        for k, i in enumerate(indices):
+            if gaussian[i]:
+                unit = min(max(rng.gauss(0.0, 0.5), -1.0), 1.0)
+            else:
+                unit = rng.uniform(-1.0, 1.0)
+            out[k] = round(unit * spreads[i])
+
+    def next_cycle(self, plan, batches):
+        """(batches, intervals_ns) for one cycle of plan, given its unjittered batches"""
+        if plan is not self._plan:
+            self._load(plan)
+        spec = plan.jitter
+        timed = self._timed
+        moved = self._moved
+        intervals_ns = self._intervals_ns
+        dxs, dys = self._dxs, self._dys
+        np = self.np
+
+        if np is not None:
+            if timed:
+                offsets = self._np_offsets_out
+                self._np_offsets(self._np_timed_draw, offsets)
+                offsets += self._np_base_intervals
+                np.maximum(offsets, 0, out=offsets)
+                np.put(self._np_intervals, self._np_timed, offsets)
+            if moved:
+                self._np_offsets(self._np_moved_draw, self._np_dxs)
+                self._np_offsets(self._np_moved_draw, self._np_dys)
+        else:
+            if timed:
+                offsets = self._offsets
+                self._py_offsets(timed, spec.interval_spread_ns, spec.gaussian, offsets)
+                base = plan.intervals_ns
+                for i, offset in zip(timed, offsets):
+                    intervals_ns[i] = max(0, base[i] + offset)
+            if moved:
+                self._py_offsets(moved, spec.position_spread, spec.gaussian, dxs)
+                self._py_offsets(moved, spec.position_spread, spec.gaussian, dys)
+
+        if not moved:
+            return batches, intervals_ns
+        if batches is not self._base_batches:
+            # Unjittered steps keep these batches; moved ones are set below
+            self._base_batches = batches
+            self._batches = list(batches)
+        jittered = self._batches
+        cache = self._cache
+        if len(cache) > JITTER_BATCH_CACHE:
+            cache.clear()
+        xs, ys, actions = plan.xs, plan.ys, plan.actions
+        prepare = self.prepare
+        for i, dx, dy in zip(moved, dxs, dys):
+            key = (xs[i] + dx, ys[i] + dy, actions[i])
+            batch = cache.get(key)
+            if batch is None:
+                batch = cache[key] = prepare(*key)
+            jittered[i] = batch
+        return jittered, intervals_ns
+
+# ----------------------------------------------------------------------------
+# Wait steps
+#
+# A step of type 'wait' clicks nothing: it holds the sequence until the screen
+# region centred on its x, y matches, and the timeline restarts from there.
+#   'color'       '#rrggbb' or [r, g, b] that every pixel must match, or
+#   'patch'       a reference image: {'width', 'height', 'rgb': base64 of
+#                 packed RGB rows}, e.g. from capture_patch()
+#   'width', 'height'  region size for 'color' (default 1 x 1)
+#   'tolerance'   largest difference per colour channel (default 0)
+#   'timeout_ms'  give up after this long (default 0: wait until stopped)
+#   'on_timeout'  'continue' (default), 'skip' the next step, or 'stop' the run
+# Regions are in screen pixels, also when the clicks target a window.
+
+WAIT_TIMEOUT_ACTIONS = ('continue', 'skip', 'stop')
+# Tolerance checks on regions smaller than this (bytes of RGB) stay in pure
+# Python, which beats NumPy's per-call overhead there
+WAIT_NUMPY_MIN_BYTES = 96
+
+def parse_color(color):
+    """'#rrggbb' or [r, g, b] -> (r, g, b)"""
+    if isinstance(color, str):
+        text = color[1:] if color.startswith('#') else color
+        if len(text) != 6:
+            raise ValueError(f'Colour must be #rrggbb: {color!r}')
+        value = int(text, 16)
+        return (value >> 16) & 255, (value >> 8) & 255, value & 255
+    rgb = tuple(int(channel) for channel in color)
+    if len(rgb) != 3 or not all(0 <= channel <= 255 for channel in rgb):
+        raise ValueError(f'Colour must be three channels 0-255: {color!r}')
+    return rgb
+
+class WaitCondition:
+    """
+    What a wait step waits for: the packed RGB frame of region
+    (left, top, width, height) within tolerance of reference. matches() is
+    vectorized with NumPy when it is installed and the region isn't tiny;
+    an exact match is a plain bytes comparison either way.
+    """
+    __slots__ = ('region', 'reference', 'tolerance', 'timeout_ns', 'on_timeout', '_lo', '_hi')
+
+    def __init__(self, region, reference, tolerance=0, timeout_ns=0, on_timeout='continue'):
+        if on_timeout not in WAIT_TIMEOUT_ACTIONS:
+            raise ValueError(f'Unknown on_timeout: {on_timeout!r}')
+        left, top, width, height = region
+        if width < 1 or height < 1 or len(reference) != width * height * 3:
+            raise ValueError(f'Reference does not cover a {width}x{height} region')
+        self.region = region
+        self.reference = bytes(reference)
+        self.tolerance = tolerance
+        self.timeout_ns = timeout_ns
+        self.on_timeout = on_timeout
+        self._lo = self._hi = None
+        if tolerance:
+            np = _numpy() if len(self.reference) >= WAIT_NUMPY_MIN_BYTES else None
+            if np is not None:
+                widened = np.frombuffer(self.reference, dtype=np.uint8).astype(np.int16)
+                self._lo = np.clip(widened - tolerance, 0, 255).astype(np.uint8)
+                self._hi = np.clip(widened + tolerance, 0, 255).astype(np.uint8)
+            else:
+                self._lo = bytes(max(0, channel - tolerance) for channel in self.reference)
+                self._hi = bytes(min(255, channel + tolerance) for channel in self.reference)
+
+    def matches(self, frame):
+        """True if a grabbed frame of the region matches"""
+        lo = self._lo
+        if lo is None:
+            return frame == self.reference
+        if len(frame) != len(lo):
+            return False
+        if isinstance(lo, bytes):
+            return all(map(operator.le, lo, frame)) and all(map(operator.le, frame, self._hi))
+        np = _numpy()
+        pixels = np.frombuffer(frame, dtype=np.uint8)
+        return bool(((pixels >= lo) & (pixels <= self._hi)).all())
+
+    def centred_on(self, x, y):
+        """Copy of the condition with its region (same size) centred on (x, y)"""
+        moved = object.__new__(WaitCondition)
+        for name in self.__slots__:
+            setattr(moved, name, getattr(self, name))
+        width, height = self.region[2:]
+        moved.region = (x - width // 2, y - height // 2, width, height)
+        return moved
+
+def wait_condition(step, x, y):
+    """WaitCondition for a wait step dict centred on (x, y)"""
+    if 'patch' in step:
+        patch = step['patch']
+        width, height = int(patch['width']), int(patch['height'])
+        reference = base64.b64decode(patch['rgb'])
+    elif 'color' in step:
+        width, height = int(step.get('width', 1)), int(step.get('height', 1))
+        reference = bytes(parse_color(step['color'])) * max(0, width * height)
+    else:
+        raise ValueError('A wait step needs a color or patch')
+    region = (x - width // 2, y - height // 2, width, height)
+    timeout_ns = int(step.get('timeout_ms', 0) * 1_000_000)
+    return WaitCondition(region, reference, int(step.get('tolerance', 0)), timeout_ns, step.get('on_timeout', 'continue'))
+
+def wait_indices(actions):
+    """Indices of the wait steps in an action-code column"""
+    raw = bytes(actions)
+    marker = bytes((WAIT_ACTION,))
+    indices = []
+    index = raw.find(marker)
+    while index >= 0:
+        indices.append(index)
+        index = raw.find(marker, index + 1)
+    return indices
+
+def compile_waits(steps, xs, ys):
+    """{index: WaitCondition} from (index, step dict) pairs, or None if there are none"""
+    waits = {index: wait_condition(step, xs[index], ys[index]) for index, step in steps}
+    return waits or None
+
+def capture_patch(source, x, y, width, height):
+    """Reference patch of the screen centred on (x, y), for a wait step's 'patch'"""
+    rgb = source.grab(x - width // 2, y - height // 2, width, height)
+    return {'width': width, 'height': height, 'rgb': base64.b64encode(rgb).decode('ascii')}
+
+# ----------------------------------------------------------------------------
+# Blocks
+#
+# A click list can be written compactly. The short form is what profiles and
+# the editor keep; compile_plan flattens it when playback starts, or, past
+# BLOCK_FLATTEN_LIMIT steps, BlockSource expands it as it plays:
+#   'repeat' on a step                    play the step this many times in a row
+#   {'loop': [entries], 'count': n}       play the entries n times
+#   {'define': name, 'steps': [entries]}  a subroutine; plays nothing itself
+#   {'call': name, 'count': n}            play a subroutine (n times, default 1)
+# Blocks nest. Subroutine names are global to the list, wherever they are
+# defined, and subroutines may call each other but not recursively.
+# Flattening repeats whole columns at once, so it costs per entry written, not
+# per step played; a subroutine is flattened once however often it's called.
+
+# Longest flattened plan a list of blocks may produce. A flattened step costs
+# about 40 bytes with jitter and its batch slot, so this bounds a plan at
+# roughly 40 MB; longer lists are streamed through BlockSource
+BLOCK_FLATTEN_LIMIT = 1_000_000
+
+def is_block(entry):
+    """True for a loop, call or define entry of a click list"""
+    return 'loop' in entry or 'call' in entry or 'define' in entry
+
+def _block_count(entry, key):
+    count = entry.get(key, 1)
+    if not isinstance(count, int) or count < 0:
+        raise ValueError(f'{key!r} must be a whole number >= 0: {entry!r}')
+    return count
+
+def _find_subroutines(entries, found):
+    for entry in entries:
+        if 'define' in entry:
+            name = entry['define']
+            if name in found:
+                raise ValueError(f'Subroutine defined twice: {name!r}')
+            found[name] = entry['steps']
+            _find_subroutines(entry['steps'], found)
+        elif 'loop' in entry:
+            _find_subroutines(entry['loop'], found)
+    return found
+
+class _FlatSteps:
+    """Plan columns being flattened, with per-step jitter arrays and waits"""
+    __slots__ = ('xs', 'ys', 'actions', 'intervals_ns', 'jitter', 'waits')
+
+    def __init__(self):
+        self.xs = array('i')
+        self.ys = array('i')
+        self.actions = array('B')
+        self.intervals_ns = array('q')
+        self.jitter = None  # (interval_spread_ns, position_spread, gaussian) once any step has jitter
+        self.waits = {}
+
+    def __len__(self):
+        return len(self.actions)
+
+    @classmethod
+    def step(cls, click):
+        if 'type' not in click:
+            raise ValueError(f'Neither a step nor a block: {click!r}')
+        flat = cls()
+        flat.extend(compile_plan([{key: value for key, value in click.items() if key != 'repeat'}]))
+        return flat
+
+    def extend(self, steps, count=1):
+        """Append count copies of steps (a _FlatSteps or ClickPlan)"""
+        n = len(steps)
+        if not count or not n:
+            return
+        offset = len(self)
+        for name in ('xs', 'ys', 'actions', 'intervals_ns'):
+            getattr(self, name).extend(getattr(steps, name) * count)
+        jitter = steps.jitter
+        if isinstance(jitter, JitterSpec):
+            jitter = (jitter.interval_spread_ns, jitter.position_spread, jitter.gaussian)
+        if jitter is not None or self.jitter is not None:
+            if self.jitter is None:
+                self.jitter = (array('q', bytes(8 * offset)), array('i', bytes(4 * offset)), array('B', bytes(offset)))
+            if jitter is None:
+                jitter = (array('q', bytes(8 * n)), array('i', bytes(4 * n)), array('B', bytes(n)))
+            for mine, theirs in zip(self.jitter, jitter):
+                mine.extend(theirs * count)
+        if steps.waits:
+            for repeat in range(count):
+                base = offset + repeat * n
+                for index, condition in steps.waits.items():
+                    self.waits[base + index] = condition
+
+def _flatten(entries, subroutines, calling, flattened, into):
+    for entry in entries:
+        if 'define' in entry:
+            continue
+        if 'call' in entry:
+            name = entry['call']
+            if name not in subroutines:
+                raise ValueError(f'Unknown subroutine: {name!r}')
+            if name in calling:
+                raise ValueError(f'Subroutine calls itself: {name!r}')
+            body = flattened.get(name)
+            if body is None:
+                body = _FlatSteps()
+                _flatten(subroutines[name], subroutines, calling | {name}, flattened, body)
+                flattened[name] = body
+            count = _block_count(entry, 'count')
+        elif 'loop' in entry:
+            count = _block_count(entry, 'count')
+            body = _FlatSteps()
+            if count:
+                _flatten(entry['loop'], subroutines, calling, flattened, body)
+        else:
+            count = _block_count(entry, 'repeat')
+            body = _FlatSteps.step(entry)
+        if len(into) + len(body) * count > BLOCK_FLATTEN_LIMIT:
+            raise ValueError(f'Blocks flatten to more than {BLOCK_FLATTEN_LIMIT:,} steps; play them as a BlockSource')
+        into.extend(body, count)
+
+def flatten_blocks(clicks):
+    """ClickPlan for a click list that uses blocks or step repeats"""
+    flat = _FlatSteps()
+    _flatten(clicks, _find_subroutines(clicks, {}), frozenset(), {}, flat)
+    jitter = JitterSpec(*flat.jitter) if flat.jitter is not None else None
+    return ClickPlan(flat.xs, flat.ys, flat.actions, flat.intervals_ns, jitter, flat.waits or None)
+
+def _block_length(entries, subroutines, calling, lengths):
+    total = 0
+    for entry in entries:
+        if 'define' in entry:
+            continue
+        if 'call' in entry:
+            name = entry['call']
+            if name not in subroutines:
+                raise ValueError(f'Unknown subroutine: {name!r}')
+            if name in calling:
+                raise ValueError(f'Subroutine calls itself: {name!r}')
+            length = lengths.get(name)
+            if length is None:
+                length = lengths[name] = _block_length(subroutines[name], subroutines, calling | {name}, lengths)
+            total += length * _block_count(entry, 'count')
+        elif 'loop' in entry:
+            count = _block_count(entry, 'count')
+            if count:
+                total += count * _block_length(entry['loop'], subroutines, calling, lengths)
+        elif 'type' not in entry:
+            raise ValueError(f'Neither a step nor a block: {entry!r}')
+        else:
+            total += _block_count(entry, 'repeat')
+    return total
+
+def block_length(clicks):
+    """Steps one cycle of a click list plays, counted without flattening it"""
+    return _block_length(clicks, _find_subroutines(clicks, {}), frozenset(), {})
+
+def streams_blocks(clicks):
+    """True for a click list whose blocks play more than BLOCK_FLATTEN_LIMIT steps (see BlockSource)"""
+    if not any('repeat' in click or 'type' not in click for click in clicks):
+        return False
+    return block_length(clicks) > BLOCK_FLATTEN_LIMIT
+
+# ============================================================================
+# Binary Profiles
+# ============================================================================
+#
+# Optional fixed-layout profile format (.acp) for very long recorded macros.
+# Little-endian, every section 8-byte aligned:
+#   header      magic 'ACPF', version u16, reserved u16, step count u64,
+#               settings length u32, reserved u32
+#   settings    UTF-8 JSON: the profile minus 'clicks', plus 'step_extras'
+#               ({index: {key: value}}) for click keys without a column
+#   columns     n values each, in BINARY_COLUMNS order
+# The columns are mapped and used in place as a ClickPlan, so playback never
+# builds a dict per step. Conversion to and from JSON profiles is lossless;
+# 'present' records which optional interval keys the click dict had.
+
+BINARY_MAGIC = b'ACPF'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<4sHHQII')
+BINARY_COLUMNS = (
+    ('intervals_ns', 'q'),
+    ('xs', 'i'),
+    ('ys', 'i'),
+    ('minutes', 'i'),
+    ('seconds', 'i'),
+    ('milliseconds', 'i'),
+    ('actions', 'B'),
+    ('present', 'B'),
+)
+BINARY_STEP_KEYS = ('x', 'y', 'type', 'minutes', 'seconds', 'milliseconds')
+_PRESENT_BITS = (('minutes', 1), ('seconds', 2), ('milliseconds', 4))
+_INTERVAL_DEFAULTS = {'minutes': 0, 'seconds': 0, 'milliseconds': 100}
+
+def _aligned(size):
+    return (size + 7) & ~7
+
+def encode_binary_profile(data):
+    """Profile dict -> bytes in the .acp format"""
+    clicks = data.get('clicks', [])
+    columns = {name: array(code) for name, code in BINARY_COLUMNS}
+    step_extras = {}
+    for index, click in enumerate(clicks):
+        if 'repeat' in click or is_block(click):
+            raise ValueError('The binary format only holds flat click lists, not blocks or step repeats')
+        click_type = click['type']
+        if click_type not in STEP_CODES:
+            raise ValueError(f'Unknown click type: {click_type!r}')
+        columns['intervals_ns'].append(click_interval_ns(click))
+        columns['xs'].append(click['x'])
+        columns['ys'].append(click['y'])
+        columns['actions'].append(STEP_CODES[click_type])
+        present = 0
+        fractional = ()
+        for key, bit in _PRESENT_BITS:
+            value = click.get(key, _INTERVAL_DEFAULTS[key])
+            if type(value) is not int:
+                # Kept exactly in step_extras; intervals_ns has the sum
+                fractional += (key,)
+                value = _INTERVAL_DEFAULTS[key]
+            elif key in click:
+                present |= bit
+            columns[key].append(value)
+        columns['present'].append(present)
+        extras = {key: value for key, value in click.items() if key not in BINARY_STEP_KEYS or key in fractional}
+        if extras:
+            step_extras[str(index)] = extras
+
+    settings = {key: value for key, value in data.items() if key != 'clicks'}
+    if step_extras:
+        settings['step_extras'] = step_extras
+    settings_bytes = json.dumps(settings).encode('utf-8')
+
+    parts = [
+        BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, len(clicks), len(settings_bytes), 0),
+        settings_bytes.ljust(_aligned(len(settings_bytes)), b'\0'),
+    ]
+    for name, _code in BINARY_COLUMNS:
+        column = columns[name]
+        if sys.byteorder != 'little':
+            column.byteswap()
+        raw = column.tobytes()
+        parts.append(raw.ljust(_aligned(len(raw)), b'\0'))
+    return b''.join(parts)
+
+def decode_binary_profile(buffer):
+    """
+    Parse .acp bytes/mmap without copying the step data.
+    Returns (settings dict, {column name: memoryview}).
+    """
+    if sys.byteorder != 'little':
+        raise ValueError('Binary profiles can only be mapped on little-endian machines')
+    view = memoryview(buffer)
+    magic, version, _reserved, count, settings_len, _reserved2 = BINARY_HEADER.unpack_from(view)
+    if magic != BINARY_MAGIC:
+        raise ValueError('Not a binary profile')
+    if version != BINARY_VERSION:
+        raise ValueError(f'Unsupported binary profile version: {version}')
+    offset = BINARY_HEADER.size
+    settings = json.loads(bytes(view[offset:offset + settings_len]).decode('utf-8'))
+    offset += _aligned(settings_len)
+    columns = {}
+    for name, code in BINARY_COLUMNS:
+        size = count * struct.calcsize(code)
+        if offset + size > len(view):
+            raise ValueError('Truncated binary profile')
+        columns[name] = view[offset:offset + size].cast(code)
+        offset += _aligned(size)
+    return settings, columns
+
+class MappedProfile:
+    """
+    A binary profile opened with mmap. plan is a ClickPlan whose arrays are
+    views into the mapping, so steps are read straight from the file.
+    Call close() (or use as a context manager) once playback has finished.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        columns = {}
+        try:
+            self.settings, columns = decode_binary_profile(self._mmap)
+            extras = self.settings.get('step_extras', {})
+            waits = wait_indices(columns['actions'])
+            wait_set = set(waits)
+            jitter = compile_jitter(
+                len(columns['actions']), ((int(i), e) for i, e in extras.items() if int(i) not in wait_set)
+            )
+            waits = compile_waits(((i, extras.get(str(i), {})) for i in waits), columns['xs'], columns['ys'])
+        except Exception:
+            for column in columns.values():
+                column.release()
+            self._mmap.close()
+            raise
+        self._columns = columns
+        self.plan = ClickPlan(columns['xs'], columns['ys'], columns['actions'], columns['intervals_ns'], jitter, waits)
+
+    def __len__(self):
+        return len(self.plan)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def clicks(self):
+        """Materialize the steps as click dicts (inverse of encode_binary_profile)"""
+        columns = self._columns
+        extras = self.settings.get('step_extras', {})
+        clicks = []
+        for index in range(len(self)):
+            present = columns['present'][index]
+            click = {
+                'x': columns['xs'][index],
+                'y': columns['ys'][index],
+                'type': STEP_TYPES[columns['actions'][index]],
+            }
+            for key, bit in _PRESENT_BITS:
+                if present & bit:
+                    click[key] = columns[key][index]
+            click.update(extras.get(str(index), {}))
+            clicks.append(click)
+        return clicks
+
+    def to_profile(self):
+        """The equivalent JSON profile dict"""
+        data = {key: value for key, value in self.settings.items() if key != 'step_extras'}
+        data['clicks'] = self.clicks()
+        return data
+
+    def close(self):
+        if self._mmap is None:
+            return
+        for column in self._columns.values():
+            column.release()
+        self._columns = {}
+        self.plan = None
+        self._mmap.close()
+        self._mmap = None
+
+def save_profile_binary(profile_name, data):
+    """Save a profile to disk in the binary format"""
+    profile_path = CONFIG_DIR / f'{profile_name}.acp'
+    try:
+        payload = encode_binary_profile(data)
+        CONFIG_DIR.mkdir(exist_ok=True)
+        atomic_write(profile_path, lambda f: f.write(payload), 'wb')
+        return True
+    except Exception:
+        return False
+
+def map_profile_binary(profile_path):
+    """MappedProfile for a binary profile file; None if it doesn't exist, ValueError if it is invalid"""
+    try:
+        return MappedProfile(profile_path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        raise ValueError(f'Cannot read profile {profile_path}: {e}') from e
+
+def open_profile_binary(profile_name):
+    """Map a binary profile from disk; None if there is none, ValueError if it is invalid"""
+    return map_profile_binary(CONFIG_DIR / f'{profile_name}.acp')
+
+def convert_profile(profile_name, to):
+    """
+    Convert a profile between JSON and binary ('json' or 'binary'); returns
+    success. Raises ValueError if the source profile is unreadable.
+    """
+    if to == 'binary':
+        data = load_profile(profile_name)
+        return data is not None and save_profile_binary(profile_name, data)
+    mapped = open_profile_binary(profile_name)
+    if mapped is None:
+        return False
+    with mapped:
+        data = mapped.to_profile()
+    return save_profile(profile_name, data)
+
+# ============================================================================
+# Step Sources
+# ============================================================================
+#
+# A step source produces steps lazily instead of holding a click list:
+#   steps()     -> iterator of (x, y, action_code, interval_ns)
+#   rewindable  -> True if steps() can be called again to start over
+# ClickExecutor plays sources in sequence mode through a ReadAhead buffer,
+# so memory use stays constant however long (or endless) the source is.
+
+def step_from_click(click):
+    """Click dict -> (x, y, action_code, interval_ns)"""
+    click_type = click['type']
+    if click_type not in ACTION_CODES:
+        raise ValueError(f'Unknown click type: {click_type!r}')
+    return int(click['x']), int(click['y']), ACTION_CODES[click_type], click_interval_ns(click)
+
+class StepSource(abc.ABC):
+    """Base class for step sources"""
+    rewindable = True
+
+    @abc.abstractmethod
+    def steps(self):
+        """Iterate the steps of one pass: click dicts or step tuples"""
+
+class IterableSource(StepSource):
+    """
+    Steps from Python code. Pass a zero-argument callable returning a fresh
+    iterable to make the source rewindable; a plain iterator or generator
+    can only be played once. Items are click dicts or step tuples.
+    """
+    def __init__(self, steps):
+        self._factory = steps if callable(steps) else None
+        self._iterator = None if callable(steps) else iter(steps)
+        self.rewindable = self._factory is not None
+
+    def steps(self):
+        items = self._factory() if self._factory is not None else self._iterator
+        for item in items:
+            yield step_from_click(item) if isinstance(item, dict) else item
+
+class JsonLinesSource(StepSource):
+    """Click dicts read one line at a time from a JSON-lines file"""
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def steps(self):
+        with open(self.path) as f:
+            for line in f:
+                if line.strip():
+                    yield step_from_click(json.loads(line))
+
+class PlanSource(StepSource):
+    """Steps of a ClickPlan (e.g. a mapped binary profile)"""
+    def __init__(self, plan):
+        if plan.waits:
+            raise ValueError('Wait steps cannot be streamed; play the ClickPlan itself')
+        self.plan = plan
+
+    def steps(self):
+        plan = self.plan
+        return zip(plan.xs, plan.ys, plan.actions, plan.intervals_ns)
+
+class GridSweep(StepSource):
+    """
+    Clicks every spacing pixels over a rectangle, row by row. With
+    serpentine, every other row runs right to left so the cursor never
+    jumps back across the region.
+    """
+    def __init__(self, left, top, right, bottom, spacing_x, spacing_y=None,
+                 click_type='left', interval_ms=100, serpentine=True):
+        self.left, self.top, self.right, self.bottom = left, top, right, bottom
+        self.spacing_x = max(1, spacing_x)
+        self.spacing_y = max(1, spacing_y if spacing_y is not None else spacing_x)
+        self.action = ACTION_CODES[click_type]
+        self.interval_ns = interval_ms * 1_000_000
+        self.serpentine = serpentine
+
+    def steps(self):
+        columns = range(self.left, self.right + 1, self.spacing_x)
+        for row, y in enumerate(range(self.top, self.bottom + 1, self.spacing_y)):
+            xs = reversed(columns) if self.serpentine and row % 2 else columns
+            for x in xs:
+                yield x, y, self.action, self.interval_ns
+
+class SpiralPattern(StepSource):
+    """Clicks along an Archimedean spiral, `spacing` pixels between turns"""
+    def __init__(self, center_x, center_y, spacing, turns, points_per_turn=36,
+                 click_type='left', interval_ms=100):
+        self.center_x, self.center_y = center_x, center_y
+        self.spacing = spacing
+        self.turns = turns
+        self.points_per_turn = max(1, points_per_turn)
+        self.action = ACTION_CODES[click_type]
+        self.interval_ns = interval_ms * 1_000_000
+
+    def steps(self):
+        step_angle = 2 * math.pi / self.points_per_turn
+        radius_per_radian = self.spacing / (2 * math.pi)
+        for i in range(int(self.turns * self.points_per_turn) + 1):
+            angle = i * step_angle
+            radius = radius_per_radian * angle
+            yield (round(self.center_x + radius * math.cos(angle)),
+                   round(self.center_y + radius * math.sin(angle)),
+                   self.action, self.interval_ns)
+
+PATTERNS = {'grid': GridSweep, 'spiral': SpiralPattern}
+
+def pattern_from_spec(spec):
+    """Profile 'pattern' entry ({'type': 'grid', ...arguments}) -> StepSource"""
+    spec = dict(spec)
+    kind = spec.pop('type', None)
+    if kind not in PATTERNS:
+        raise ValueError(f'Unknown pattern type: {kind!r}')
+    try:
+        return PATTERNS[kind](**spec)
+    except (TypeError, KeyError) as e:
+        # Unknown or missing arguments, wrong types, or an unknown click_type
+        raise ValueError(f'Bad {kind} pattern: {e}') from e
+
+class BlockSource(StepSource):
+    """
+    A click list with blocks (see Blocks), expanded while it plays: every
+    cycle walks the block tree again, so memory grows with the entries
+    written, not with the steps played. Wait steps and jitter need a
+    compiled plan and are refused, and every step moves the cursor.
+    Unknown or recursive subroutines and bad counts fail here, up front.
+    """
+    def __init__(self, clicks):
+        self.clicks = clicks
+        self.subroutines = _find_subroutines(clicks, {})
+        self.length = _block_length(clicks, self.subroutines, frozenset(), {})
+        self._steps = {}  # id(step dict) -> step tuple
+        self._compile(clicks)
+
+    def _compile(self, entries):
+        for entry in entries:
+            if 'define' in entry:
+                self._compile(entry['steps'])
+            elif 'loop' in entry:
+                self._compile(entry['loop'])
+            elif 'call' not in entry:
+                if entry['type'] == 'wait' or entry.get('jitter_ms') or entry.get('jitter_px'):
+                    raise ValueError(f'Wait steps and jitter need blocks that flatten to at most '
+                                     f'{BLOCK_FLATTEN_LIMIT:,} steps: {entry!r}')
+                self._steps[id(entry)] = step_from_click(entry)
+
+    def steps(self):
+        return self._walk(self.clicks)
+
+    def _walk(self, entries):
+        for entry in entries:
+            if 'define' in entry:
+                continue
+            if 'call' in entry:
+                body, count = self.subroutines[entry['call']], entry.get('count', 1)
+            elif 'loop' in entry:
+                body, count = entry['loop'], entry.get('count', 1)
+            else:
+                step = self._steps[id(entry)]
+                for _ in range(entry.get('repeat', 1)):
+                    yield step
+                continue
+            for _ in range(count):
+                yield from self._walk(body)
+
+def as_step_source(steps):
+    """
+    Wrap an iterator/generator as a one-shot source and a click list as a
+    BlockSource; sources pass through
+    """
+    if isinstance(steps, StepSource):
+        return steps
+    if isinstance(steps, ClickPlan):
+        return PlanSource(steps)
+    if isinstance(steps, (list, tuple)):
+        return BlockSource(steps)
+    return IterableSource(steps)
+
+_READ_AHEAD_END = object()
+READ_AHEAD_CYCLE_END = object()
+# Yielded while the next chunk is late and the wake event is set
+READ_AHEAD_WOKEN = object()
+
+class ReadAhead:
+    """
+    Pulls steps from a source on a helper thread into a bounded queue of
+    chunks, converting each to a backend batch on the way. The click thread
+    only takes ready lists of (batch, interval_ns), so file reads, pattern
+    maths and batch preparation stay off the timing path. At most
+    chunk_size * max_chunks steps are buffered, and at most cache_size
+    prepared batches are kept for reuse.
+
+    The source is played `cycles` times (None = until closed) if it is
+    rewindable, once otherwise; READ_AHEAD_CYCLE_END is yielded after each
+    pass.
+
+    With a wake event, waiting for a chunk from a slow or stalled source
+    checks it every WAIT_SLICE_S and yields READ_AHEAD_WOKEN while it is
+    set, so pause() and stop() still reach the click thread. close() never
+    waits longer than WAIT_SLICE_S for the helper thread; one stuck inside
+    the source exits on its own once the source yields.
+    """
+    def __init__(self, source, prepare, cycles=1, chunk_size=64, max_chunks=4, cache_size=4096, wake=None):
+        self.source = source
+        self.prepare = prepare
+        self.cycles = cycles
+        self.wake = wake
+        self.chunk_size = chunk_size
+        self.cache_size = cache_size
+        self.queue = queue.Queue(maxsize=max_chunks)
+        self.error = None
+        self._closed = False
+        self.thread = threading.Thread(target=self._fill, daemon=True)
+        self.thread.start()
+
+    def _put(self, item):
+        while not self._closed:
+            try:
+                self.queue.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _fill(self):
+        cache = {}
+        prepare = self.prepare
+        chunk_size = self.chunk_size
+        cycle = 0
+        try:
+            while self.cycles is None or cycle < self.cycles:
+                produced = 0
+                chunk = []
+                for x, y, action, interval_ns in self.source.steps():
+                    key = (x, y, action)
+                    batch = cache.get(key)
+                    if batch is None:
+                        if len(cache) >= self.cache_size:
+                            cache.clear()
+                        batch = cache[key] = prepare(x, y, action)
+                    chunk.append((batch, interval_ns))
+                    if len(chunk) >= chunk_size:
+                        if not self._put(chunk):
+                            return
+                        produced += len(chunk)
+                        chunk = []
+                produced += len(chunk)
+                if chunk and not self._put(chunk):
+                    return
+                if not self._put(READ_AHEAD_CYCLE_END):
+                    return
+                cycle += 1
+                # One-shot sources can't repeat, and an empty source would spin
+                if not self.source.rewindable or not produced:
+                    break
+        except Exception as exc:
+            self.error = exc
+        finally:
+            self._put(_READ_AHEAD_END)
+
+    def __iter__(self):
+        get = self.queue.get
+        wake = self.wake
+        while True:
+            if wake is None:
+                chunk = get()
+            else:
+                try:
+                    chunk = get(timeout=WAIT_SLICE_S)
+                except queue.Empty:
+                    if wake.is_set():
+                        yield READ_AHEAD_WOKEN
+                    continue
+            if chunk is _READ_AHEAD_END:
+                if self.error is not None:
+                    raise self.error
+                return
+            yield chunk
+
+    def close(self):
+        """Stop the helper thread and drop anything buffered"""
+        self._closed = True
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        self.thread.join(WAIT_SLICE_S)
+
+# ============================================================================
+# Run Telemetry
+# ============================================================================
+
+TELEMETRY_FIELDS = ('step', 'time_ns', 'lateness_ns', 'inject_ns')
+
+class LogHistogram:
+    """
+    Fixed-size histogram of non-negative ns values in power-of-two buckets:
+    bucket b counts values whose bit length is b, i.e. [2**(b-1), 2**b)
+    """
+    __slots__ = ('counts',)
+
+    def __init__(self):
+        self.counts = array('q', bytes(8 * 64))
+
+    def add(self, value):
+        self.counts[min(value.bit_length(), 63)] += 1
+
+    def reset(self):
+        self.counts = array('q', bytes(8 * 64))
+
+    def percentile(self, fraction):
+        """Upper bound (ns) of the bucket holding the given fraction of values"""
+        counts = self.counts
+        total = sum(counts)
+        if not total:
+            return 0
+        target = fraction * total
+        seen = 0
+        for bucket, count in enumerate(counts):
+            seen += count
+            if seen >= target:
+                return (1 << bucket) - 1 if bucket else 0
+        return (1 << 63) - 1
+
+class RunTelemetry:
+    """
+    Per-step run statistics recorded from the click thread.
+
+    record() writes into preallocated ring buffers (the last `capacity`
+    steps) and log histograms; nothing grows during a run. There is a single
+    writer and the counter is bumped after the slot is written, so readers
+    on other threads (GUI polling, export) see at worst one stale slot
+    rather than needing a lock.
+    """
+    def __init__(self, capacity=4096):
+        # Power of two so the ring index is a mask
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.capacity = size
+        self._mask = size - 1
+        self.steps = array('q', bytes(8 * size))
+        self.times_ns = array('q', bytes(8 * size))
+        self.lateness_ns = array('q', bytes(8 * size))
+        self.inject_ns = array('q', bytes(8 * size))
+        self.lateness_histogram = LogHistogram()
+        self.inject_histogram = LogHistogram()
+        self.count = 0
+        self.first_ns = 0
+        self.max_lateness_ns = 0
+        self.max_inject_ns = 0
+
+    def reset(self):
+        self.lateness_histogram.reset()
+        self.inject_histogram.reset()
+        self.count = 0
+        self.first_ns = 0
+        self.max_lateness_ns = 0
+        self.max_inject_ns = 0
+
+    def record(self, step, lateness_ns, inject_ns, time_ns):
+        slot = self.count & self._mask
+        self.steps[slot] = step
+        self.times_ns[slot] = time_ns
+        self.lateness_ns[slot] = lateness_ns
+        self.inject_ns[slot] = inject_ns
+        self.lateness_histogram.add(lateness_ns)
+        self.inject_histogram.add(inject_ns)
+        if lateness_ns > self.max_lateness_ns:
+            self.max_lateness_ns = lateness_ns
+        if inject_ns > self.max_inject_ns:
+            self.max_inject_ns = inject_ns
+        if not self.count:
+            self.first_ns = time_ns
+        self.count += 1
+
+    def rows(self):
+        """Buffered steps, oldest first, as tuples in TELEMETRY_FIELDS order"""
+        count = self.count
+        start = max(0, count - self.capacity)
+        mask = self._mask
+        return [
+            (self.steps[i & mask], self.times_ns[i & mask], self.lateness_ns[i & mask], self.inject_ns[i & mask])
+            for i in range(start, count)
+        ]
+
+    def achieved_cps(self, window=256):
+        """Steps per second over the last `window` buffered steps"""
+        count = self.count
+        window = min(window, count, self.capacity)
+        if window < 2:
+            return 0.0
+        newest = self.times_ns[(count - 1) & self._mask]
+        oldest = self.times_ns[(count - window) & self._mask]
+        if newest <= oldest:
+            return 0.0
+        return (window - 1) * 1_000_000_000 / (newest - oldest)
+
+    def snapshot(self):
+        """Summary dict for display"""
+        count = self.count
+        overall = 0.0
+        if count > 1:
+            last = self.times_ns[(count - 1) & self._mask]
+            if last > self.first_ns:
+                overall = (count - 1) * 1_000_000_000 / (last - self.first_ns)
+        return {
+            'steps': count,
+            'cps': self.achieved_cps(),
+            'cps_overall': overall,
+            'lateness_p50_ns': min(self.lateness_histogram.percentile(0.5), self.max_lateness_ns),
+            'lateness_p99_ns': min(self.lateness_histogram.percentile(0.99), self.max_lateness_ns),
+            'lateness_max_ns': self.max_lateness_ns,
+            'inject_p50_ns': min(self.inject_histogram.percentile(0.5), self.max_inject_ns),
+            'inject_p99_ns': min(self.inject_histogram.percentile(0.99), self.max_inject_ns),
+            'inject_max_ns': self.max_inject_ns,
+        }
+
+    def export_csv(self, path):
+        """Write buffered steps to a CSV file"""
+        import csv
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(TELEMETRY_FIELDS)
+            writer.writerows(self.rows())
+
+    def export_jsonl(self, path):
+        """Write buffered steps to a JSON-lines file"""
+        with open(path, 'w') as f:
+            for row in self.rows():
+                f.write(json.dumps(dict(zip(TELEMETRY_FIELDS, row))) + '\n')
+
+    def export(self, path):
+        """Export as CSV or JSON lines depending on the file extension"""
+        if str(path).lower().endswith('.csv'):
+            self.export_csv(path)
+        else:
+            self.export_jsonl(path)
+
+# ============================================================================
+# Click Executor
+# ============================================================================
+
+# ClickExecutor.state values
+IDLE = 'idle'
+RUNNING = 'running'
+PAUSED = 'paused'
+STOPPING = 'stopping'
+
+# Shortest per-target interval in independent mode, so a 0 ms target can't
+# starve the others
+MIN_INDEPENDENT_INTERVAL_NS = 1_000_000
+
+# Burst mode wakes at most this often and sends every click that came due
+# since the last wake-up, so high rates cost one wait per tick, not per click
+BURST_TICK_NS = 1_000_000
+# Token bucket depth: a burst run that falls further behind than this drops
+# the backlog instead of sending it in one flood
+BURST_BACKLOG_NS = 10_000_000
+
+# Wait steps poll every WAIT_POLL_MIN_NS while the region is changing and back
+# off to WAIT_POLL_MAX_NS while it stays the same; a poll is never due sooner
+# than WAIT_POLL_COST_RATIO times the last grab took
+WAIT_POLL_MIN_NS = 1_000_000
+WAIT_POLL_MAX_NS = 16_000_000
+WAIT_POLL_COST_RATIO = 4
+
+class ClickExecutor:
+    """
+    Runs clicks on a background thread, in one of three modes:
+      'sequence'    - steps fire one after another; step N is due at
+                      start + the sum of the intervals before it
+      'independent' - every step is its own target that repeats on its own
+                      interval; all targets share one thread driven by a
+                      min-heap of (next_deadline, step). With stagger set,
+                      target i's first click is delayed by i/n of its
+                      interval so targets don't all fire in the same tick.
+      'burst'       - clicks at target_cps regardless of step intervals,
+                      rotating through the steps; see execute_burst()
+
+    Step jitter (see JitterSpec) is applied in sequence mode; every cycle
+    draws new offsets from a generator seeded with jitter_seed. Wait steps
+    (see WaitCondition) are sequence-only too; they grab the screen through
+    capture, default_capture_cache() unless set.
+
+    With an anchor (see Display Topology) the coordinates are relative to a
+    monitor or window: start() resolves the anchor through topology
+    (default_display_topology() unless set) and places the whole plan on
+    screen before the first step. If the display layout changes mid-run,
+    the plan is placed again and swapped in at the next swap_boundary.
+    SendInput runs follow display changes even without an anchor: the
+    virtual desktop is read again at start() and after each change.
+
+    repeat_count counts sequence cycles, or clicks per target in
+    independent mode. Step sources (see StepSource) are played in sequence
+    mode; they repeat only if they are rewindable.
+
+    When a step fires late, late_policy decides what happens to the rest of
+    the timeline:
+      'catch_up' - keep the original deadlines, so following steps fire
+                   early until the schedule is met again
+      'skip'     - if lateness exceeds skip_threshold_ns, re-anchor the
+                   timeline at the current time and drop the lost time
+
+    A running click list is edited with update_clicks(), never in place: it
+    compiles an immutable snapshot that the executor thread swaps in at the
+    next boundary set by swap_boundary:
+      'step'  - before the next step; the sequence continues at the same
+                position in the new list
+      'cycle' - when the current cycle ends, so every cycle plays a single
+                version of the list
+    Repeat counters and deadlines carry over, so the cadence is kept.
+
+    Lifecycle: state moves idle -> running <-> paused -> stopping -> idle.
+    Waits between steps sleep on the wake event, so stop() and pause() take
+    effect within a couple of milliseconds whatever the interval. A pause
+    shifts every later deadline by the time spent paused, so the timing
+    phase is kept on resume.
+    """
+    def __init__(self, backend=None, clock=None):
+        self.state = IDLE
+        self.state_changed = threading.Condition()
+        self.wake = threading.Event()  # Set to interrupt the executor's waits
+        self.thread = None
+        # Click dicts, a ClickPlan (e.g. MappedProfile.plan), or a step source
+        # (StepSource, generator, iterator) that is streamed instead
+        self.clicks = []
+        self.plan = None  # ClickPlan compiled from clicks in start()
+        self.batches = None  # Backend batches for each plan step
+        self.source = None  # StepSource when clicks is streamed
+        self.read_ahead = 64  # Steps per read-ahead chunk for step sources
+        self.repeat_count = 1
+        self.repeat_until_stopped = False
+        self.mode = 'sequence'
+        self.swap_boundary = 'cycle'
+        self.pending = None  # (plan, batches) waiting to be swapped in
+        # (clicks, plan, batches, backend) handed to update_clicks() while idle;
+        # start() reuses them while clicks and backend are unchanged
+        self.prepared = None
+        self.swap_lock = threading.Lock()
+        self.stagger = False
+        # Burst mode: clicks per second, and optional limits (None = until stopped)
+        self.target_cps = 10.0
+        self.burst_duration_s = None
+        self.burst_budget = None
+        self.burst_max = 32  # Most clicks injected in one send
+        self.achieved_cps = None  # Sustained rate of the current/last burst run
+        # Seed for step jitter; None draws a new one each run (kept in last_jitter_seed)
+        self.jitter_seed = None
+        self.last_jitter_seed = None
+        self.jitter_generator = None
+        self.capture = None  # CaptureCache for wait steps
+        self.anchor = None  # Profile 'anchor' the coordinates are relative to
+        self.topology = None  # DisplayTopology the anchor is resolved with
+        self.placement = None  # Placement of the anchor for the current run
+        self.backend = backend  # SendInputBackend is created on first start()
+        self.clock = clock if clock is not None else MonotonicClock()
+        self.spin_ns = 2_000_000
+        self.late_policy = 'catch_up'
+        self.skip_threshold_ns = 50_000_000
+        # Per-step lateness reporting: on_step(step_index, lateness_ns)
+        self.on_step = None
+        # Optional RunTelemetry; also times each injection when set
+        self.telemetry = None
+        self.steps_done = 0
+        self.max_lateness_ns = 0
+        self.first_step_ns = None  # Clock time of the first click of the run
+    
+    @property
+    def running(self):
+        """True while a run is active (running or paused)"""
+        return self.state == RUNNING or self.state == PAUSED
+    
+    def hold(self, wait_until, deadline):
+        """
+        Slow path of a step wait, taken when pause() or stop() woke the
+        executor thread. Blocks while paused, then waits for the deadline
+        shifted by the pause. Returns (lateness, paused_ns), or None once the
+        run is stopping.
+        """
+        clock = self.clock
+        paused_ns = 0
+        while True:
+            paused_at = clock.now_ns()
+            with self.state_changed:
+                while self.state == PAUSED:
+                    self.state_changed.wait()
+                if self.state != RUNNING:
+                    return None
+                self.wake.clear()
+            paused_ns += clock.now_ns() - paused_at
+            lateness = wait_until(deadline + paused_ns)
+            if lateness is not None and self.state == RUNNING:
+                return lateness, paused_ns
+    
+    def execute_sequence(self):
+        """Execute clicks in sequence"""
+        plan = self.plan
+        base_batches = self.batches
+        steps = len(plan)
+        send = self.backend.send
+        clock = self.clock
+        wait_until = DeadlineScheduler(clock, self.spin_ns, self.wake).wait_until
+        skip = self.late_policy == 'skip'
+        skip_threshold = self.skip_threshold_ns
+        on_step = self.on_step
+        telemetry = self.telemetry
+        step_swap = self.swap_boundary == 'step'
+        wait_batch = WAIT_BATCH
+        repeat_num = 0
+        deadline = clock.now_ns()
+        first_pending = True
+        
+        while True:
+            if self.state == STOPPING:
+                return
+            if not self.repeat_until_stopped and repeat_num >= self.repeat_count:
+                return
+            if self.pending is not None:
+                plan, base_batches = self.take_pending()
+                steps = len(plan)
+                if not steps:
+                    return
+            # Jitter for the whole cycle is drawn here, before the first deadline
+            batches, intervals_ns = self.cycle_tables(plan, base_batches)
+            
+            index = 0
+            while index < steps:
+                lateness = wait_until(deadline)
+                if lateness is None or self.state != RUNNING:
+                    resumed = self.hold(wait_until, deadline)
+                    if resumed is None:
+                        return
+                    lateness, paused_ns = resumed
+                    deadline += paused_ns
+                    # The cursor may have been moved while paused
+                    batches = self.resync(plan, batches, index)
+                if skip and lateness > skip_threshold:
+                    deadline += lateness
+                
+                batch = batches[index]
+                if batch is wait_batch:
+                    outcome = self.await_condition(plan.waits[index])
+                    if outcome is None or outcome == 'stop':
+                        return
+                    # The timeline restarts where the wait ended
+                    deadline = clock.now_ns() + intervals_ns[index]
+                    if outcome == 'skip':
+                        index += 1
+                        batches = self.resync(plan, batches, index + 1)
+                    index += 1
+                else:
+                    # Move cursor and click in one injection
+                    if telemetry is None:
+                        send(batch)
+                    else:
+                        sent_ns = clock.now_ns()
+                        send(batch)
+                        done_ns = clock.now_ns()
+                        telemetry.record(index, lateness, done_ns - sent_ns, done_ns)
+                    if first_pending:
+                        self.first_step_ns = clock.now_ns()
+                        first_pending = False
+                    
+                    self.steps_done += 1
+                    if lateness > self.max_lateness_ns:
+                        self.max_lateness_ns = lateness
+                    if on_step is not None:
+                        on_step(index, lateness)
+                    
+                    deadline += intervals_ns[index]
+                    index += 1
+                
+                if step_swap and self.pending is not None:
+                    # Continue at the same position in the new list
+                    plan, base_batches = self.take_pending()
+                    steps = len(plan)
+                    if not steps:
+                        return
+                    batches, intervals_ns = self.cycle_tables(plan, base_batches)
+                    batches = self.resync(plan, batches, index)
+            
+            repeat_num += 1
+    
+    def resync(self, plan, batches, index):
+        """
+        batches, made to move the cursor at step index if it is stationary
+        (see stationary_step) but the cursor may not be where the step before
+        it left it: after a pause, a skipped step or a swap mid-cycle
+        """
+        if index < len(plan) and stationary_step(plan, index):
+            batches = list(batches)
+            batches[index] = self.backend.prepare(plan.xs[index], plan.ys[index], plan.actions[index])
+        return batches
+    
+    def await_condition(self, condition):
+        """
+        Poll the screen until a wait step's condition matches. Returns
+        'match', the condition's on_timeout once its timeout has passed, or
+        None once the run is stopping. Time spent paused doesn't count
+        towards the timeout.
+        """
+        clock = self.clock
+        grab = self.capture.grab
+        region = condition.region
+        timeout_at = clock.now_ns() + condition.timeout_ns if condition.timeout_ns else None
+        poll_ns = WAIT_POLL_MIN_NS
+        previous = None
+        while True:
+            grab_ns = clock.now_ns()
+            frame = grab(region, grab_ns)
+            now = clock.now_ns()
+            if condition.matches(frame):
+                return 'match'
+            if timeout_at is not None and now >= timeout_at:
+                return condition.on_timeout
+            # Back off while nothing changes, but poll again soon after it does
+            poll_ns = min(poll_ns * 2, WAIT_POLL_MAX_NS) if frame == previous else WAIT_POLL_MIN_NS
+            previous = frame
+            wake_at = now + max(poll_ns, (now - grab_ns) * WAIT_POLL_COST_RATIO)
+            if timeout_at is not None and wake_at > timeout_at:
+                wake_at = timeout_at
+            clock.wait(self.wake, (wake_at - now) / 1e9)
+            # Woken (even by a pause already resumed): hold() clears the event
+            if self.wake.is_set() or self.state != RUNNING:
+                resumed = self.hold(lambda deadline: 0, 0)
+                if resumed is None:
+                    return None
+                if timeout_at is not None:
+                    timeout_at += resumed[1]
+    
+    def use_capture(self, plan):
+        """Check that plan's wait steps can run in this mode, and set up capture for them"""
+        if not plan.waits:
+            return
+        if self.mode != 'sequence':
+            raise ValueError(f'Wait steps need sequence mode, not {self.mode}')
+        if self.capture is None:
+            self.capture = default_capture_cache()
+    
+    def display_topology(self):
+        """topology, defaulting to the process-wide one"""
+        if self.topology is None:
+            self.topology = default_display_topology()
+        return self.topology
+    
+    def place(self, plan, batches):
+        """
+        (plan, batches) with the run's placement applied; batches becomes
+        None when the steps moved, as they must be prepared again
+        """
+        if self.placement is None:
+            return plan, batches
+        placed = self.placement.apply(plan)
+        return placed, batches if placed is plan else None
+    
+    def use_anchor(self, anchor):
+        """
+        Set the anchor for the next click list. While running, it is
+        resolved here (ValueError if its monitor or window is gone), so
+        update_clicks() places the list with it.
+        """
+        placement = None
+        if anchor is not None and self.running:
+            placement = self.display_topology().placement(anchor)
+            self.topology.subscribe(self.relocate)
+        self.anchor = anchor
+        if self.running:
+            self.placement = placement
+    
+    def follows_screen(self):
+        """
+        True if the run should follow display changes for its SendInput
+        backend: it reads the real screen, or a topology was given (e.g.
+        synthetic displays)
+        """
+        backend = self.backend
+        return isinstance(backend, SendInputBackend) and (backend.live_screen or self.topology is not None)
+    
+    def relocate(self):
+        """
+        Display layout changed (topology thread): take the new virtual
+        desktop for SendInput and resolve the anchor, if any, again. If
+        either moved the steps, they are prepared again and swapped in at
+        the next boundary (a streamed run prepares its next steps with the
+        new desktop). A missing monitor or window keeps the old placement.
+        """
+        anchor = self.anchor
+        if not self.running:
+            return
+        moved = False
+        backend = self.backend
+        if isinstance(backend, SendInputBackend):
+            screen = self.topology.virtual_screen()
+            if screen != backend.screen:
+                backend.screen = screen
+                moved = True
+        if anchor is not None:
+            try:
+                placement = self.topology.placement(anchor)
+            except ValueError:
+                placement = self.placement
+            if placement != self.placement:
+                self.placement = placement
+                moved = True
+        if not moved or self.source is not None:
+            return
+        try:
+            self.update_clicks(self.clicks)
+        except ValueError:
+            pass  # The run ended meanwhile
+    
+    def cycle_tables(self, plan, batches):
+        """(batches, intervals_ns) for the next cycle of plan, with fresh jitter if it has any"""
+        if plan.jitter is None:
+            return batches, plan.intervals_ns
+        if self.jitter_generator is None:
+            self.jitter_generator = JitterGenerator(self.last_jitter_seed, self.backend.prepare)
+        return self.jitter_generator.next_cycle(plan, batches)
+    
+    def execute_independent(self):
+        """Execute every click on its own interval from one heap-driven thread"""
+        plan = self.plan
+        batches = moving_batches(plan, self.batches, self.backend.prepare)
+        intervals_ns = [max(interval, MIN_INDEPENDENT_INTERVAL_NS) for interval in plan.intervals_ns]
+        count = len(plan)
+        send = self.backend.send
+        clock = self.clock
+        wait_until = DeadlineScheduler(clock, self.spin_ns, self.wake).wait_until
+        skip = self.late_policy == 'skip'
+        skip_threshold = self.skip_threshold_ns
+        on_step = self.on_step
+        telemetry = self.telemetry
+        limit = None if self.repeat_until_stopped else self.repeat_count
+        fired = [0] * count
+        first_pending = True
+        
+        start = clock.now_ns()
+        if self.stagger:
+            heap = [(start + intervals_ns[i] * i // count, i) for i in range(count)]
+        else:
+            heap = [(start, i) for i in range(count)]
+        heapq.heapify(heap)
+        if limit is not None and limit <= 0:
+            heap = []
+        
+        while heap:
+            if self.pending is not None:
+                # Targets that exist in both lists keep their deadlines and
+                # click counts; new targets start now
+                plan, batches = self.take_pending()
+                batches = moving_batches(plan, batches, self.backend.prepare)
+                intervals_ns = [max(interval, MIN_INDEPENDENT_INTERVAL_NS) for interval in plan.intervals_ns]
+                count = len(plan)
+                fired = fired[:count] + [0] * (count - len(fired))
+                scheduled = {i for _, i in heap if i < count}
+                heap = [(d, i) for d, i in heap if i < count]
+                now = clock.now_ns()
+                for i in range(count):
+                    if i not in scheduled and (limit is None or fired[i] < limit):
+                        heap.append((now, i))
+                heapq.heapify(heap)
+                if not heap:
+                    break
+            
+            deadline, index = heap[0]
+            lateness = wait_until(deadline)
+            if lateness is None or self.state != RUNNING:
+                resumed = self.hold(wait_until, deadline)
+                if resumed is None:
+                    return
+                lateness, paused_ns = resumed
+                if paused_ns:
+                    # Shifting every deadline keeps the heap order
+                    heap = [(d + paused_ns, i) for d, i in heap]
+                    deadline += paused_ns
+            if skip and lateness > skip_threshold:
+                deadline += lateness
+            
+            if telemetry is None:
+                send(batches[index])
+            else:
+                sent_ns = clock.now_ns()
+                send(batches[index])
+                done_ns = clock.now_ns()
+                telemetry.record(index, lateness, done_ns - sent_ns, done_ns)
+            if first_pending:
+                self.first_step_ns = clock.now_ns()
+                first_pending = False
+            
+            self.steps_done += 1
+            if lateness > self.max_lateness_ns:
+                self.max_lateness_ns = lateness
+            if on_step is not None:
+                on_step(index, lateness)
+            
+            fired[index] += 1
+            if limit is not None and fired[index] >= limit:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, (deadline + intervals_ns[index], index))
+    
+    def execute_stream(self):
+        """Execute steps pulled lazily from a step source, in sequence"""
+        backend = self.backend
+        send = backend.send
+        clock = self.clock
+        wait_until = DeadlineScheduler(clock, self.spin_ns, self.wake).wait_until
+        skip = self.late_policy == 'skip'
+        skip_threshold = self.skip_threshold_ns
+        on_step = self.on_step
+        telemetry = self.telemetry
+        cycles = None if self.repeat_until_stopped else self.repeat_count
+        index = 0
+        deadline = clock.now_ns()
+        first_pending = True
+        
+        reader = ReadAhead(self.source, backend.prepare, cycles, self.read_ahead, wake=self.wake)
+        try:
+            for chunk in reader:
+                if chunk is READ_AHEAD_CYCLE_END:
+                    index = 0
+                    continue
+                if chunk is READ_AHEAD_WOKEN:
+                    # The source is behind; state changes land before the
+                    # wake is set, so clearing it first can't lose one
+                    self.wake.clear()
+                    if self.state != RUNNING:
+                        resumed = self.hold(wait_until, deadline)
+                        if resumed is None:
+                            return
+                        deadline += resumed[1]
+                    continue
+                for batch, interval_ns in chunk:
+                    lateness = wait_until(deadline)
+                    if lateness is None or self.state != RUNNING:
+                        resumed = self.hold(wait_until, deadline)
+                        if resumed is None:
+                            return
+                        lateness, paused_ns = resumed
+                        deadline += paused_ns
+                    if skip and lateness > skip_threshold:
+                        deadline += lateness
+                    
+                    if telemetry is None:
+                        send(batch)
+                    else:
+                        sent_ns = clock.now_ns()
+                        send(batch)
+                        done_ns = clock.now_ns()
+                        telemetry.record(index, lateness, done_ns - sent_ns, done_ns)
+                    if first_pending:
+                        self.first_step_ns = clock.now_ns()
+                        first_pending = False
+                    
+                    self.steps_done += 1
+                    if lateness > self.max_lateness_ns:
+                        self.max_lateness_ns = lateness
+                    if on_step is not None:
+                        on_step(index, lateness)
+                    
+                    deadline += interval_ns
+                    index += 1
+        finally:
+            reader.close()
+    
+    def execute_burst(self):
+        """
+        Click at target_cps using a token bucket anchored at the start time:
+        click i is due at start + i / target_cps. Each wake-up (at most every
+        BURST_TICK_NS) sends every click that came due as bursts of up to
+        burst_max clicks on the current step (prepare(count=N)), then moves
+        to the next step. If the thread falls behind by more than
+        BURST_BACKLOG_NS worth of clicks the excess is dropped rather than
+        sent in a flood. Stops after burst_duration_s or burst_budget clicks
+        when set.
+        """
+        plan = self.plan
+        prepare = self.backend.prepare
+        send = self.backend.send
+        clock = self.clock
+        wait_until = DeadlineScheduler(clock, self.spin_ns, self.wake).wait_until
+        on_step = self.on_step
+        telemetry = self.telemetry
+        period_ns = 1_000_000_000 / self.target_cps
+        burst_max = max(1, self.burst_max)
+        capacity = max(burst_max, int(BURST_BACKLOG_NS / period_ns))
+        budget = self.burst_budget
+        bursts = {}  # (step, count) -> prepared batch
+        credited = 0  # Tokens granted so far
+        clicks = 0
+        index = 0
+        
+        start = clock.now_ns()
+        end = start + int(self.burst_duration_s * 1_000_000_000) if self.burst_duration_s else None
+        wake_at = start
+        while budget is None or clicks < budget:
+            if self.pending is not None:
+                plan, _ = self.take_pending()
+                bursts = {}
+                if not plan:
+                    return
+                index %= len(plan)
+            
+            lateness = wait_until(wake_at)
+            if lateness is None or self.state != RUNNING:
+                resumed = self.hold(wait_until, wake_at)
+                if resumed is None:
+                    return
+                lateness, paused_ns = resumed
+                start += paused_ns
+                if end is not None:
+                    end += paused_ns
+            now = clock.now_ns()
+            if end is not None and now >= end:
+                return
+            
+            due = int((now - start) / period_ns) + 1
+            count = min(due - credited, capacity)
+            credited = due
+            if budget is not None:
+                count = min(count, budget - clicks)
+            if count > 0:
+                sent_ns = now
+                remaining = count
+                while remaining:
+                    n = min(remaining, burst_max)
+                    batch = bursts.get((index, n))
+                    if batch is None:
+                        batch = bursts[index, n] = prepare(plan.xs[index], plan.ys[index], plan.actions[index], n)
+                    send(batch)
+                    remaining -= n
+                if telemetry is not None:
+                    done_ns = clock.now_ns()
+                    telemetry.record(index, lateness, done_ns - sent_ns, done_ns)
+                if self.first_step_ns is None:
+                    self.first_step_ns = sent_ns
+                
+                clicks += count
+                self.steps_done = clicks
+                if lateness > self.max_lateness_ns:
+                    self.max_lateness_ns = lateness
+                if on_step is not None:
+                    on_step(index, lateness)
+                # Click i is due at i periods, so clicks span (clicks) periods
+                self.achieved_cps = clicks * 1_000_000_000 / (now - start + period_ns)
+                index = (index + 1) % len(plan)
+            
+            # Next token, but no sooner than one tick from now
+            wake_at = max(start + int(credited * period_ns), now + BURST_TICK_NS)
+            if end is not None and wake_at > end:
+                wake_at = end
+    
+    def update_clicks(self, clicks, plan=None, batches=None):
+        """
+        Replace the click list. While running, the new list is compiled here
+        and swapped in by the executor thread at the next swap_boundary; an
+        empty list ends the run there. The caller must not mutate clicks
+        afterwards - build a new list for the next edit.
+
+        plan (and batches, prepared with this executor's backend) may be
+        passed when the caller already compiled clicks, e.g. a cached
+        ProfileLibrary entry; the swap then costs no compiling at all. With
+        an anchor, plan is placed first (and batches prepared again if that
+        moved the steps).
+        """
+        if not self.running:
+            self.clicks = clicks
+            screen = getattr(self.backend, 'screen', None)
+            self.prepared = (clicks, plan, batches, self.backend, screen) if plan is not None else None
+            return
+        if self.source is not None:
+            raise ValueError('A streamed step source cannot be edited while running')
+        if plan is None:
+            plan = clicks if isinstance(clicks, ClickPlan) else compile_plan(clicks)
+        plan, batches = self.place(plan, batches)
+        self.use_capture(plan)
+        if batches is None:
+            batches = prepare_batches(plan, self.backend)
+        with self.swap_lock:
+            self.clicks = clicks
+            self.pending = (plan, batches)
+    
+    def take_pending(self):
+        """Claim the pending snapshot (executor thread)"""
+        with self.swap_lock:
+            pending, self.pending = self.pending, None
+        self.plan, self.batches = pending
+        return pending
+    
+    def run(self):
+        """Execute clicks"""
+        try:
+            if self.source is not None:
+                self.execute_stream()
+            elif not self.plan:
+                return
+            elif self.mode == 'independent':
+                self.execute_independent()
+            elif self.mode == 'burst':
+                self.execute_burst()
+            else:
+                self.execute_sequence()
+        finally:
+            if self.topology is not None:
+                self.topology.unsubscribe(self.relocate)
+            self.set_state(IDLE)
+    
+    def set_state(self, state):
+        """Change state and wake the executor thread to notice it"""
+        with self.state_changed:
+            self.state = state
+            self.wake.set()
+            self.state_changed.notify_all()
+    
+    def start(self):
+        """
+        Start clicking in background thread. ValueError if the previous run
+        is still winding down after stop()'s timeout.
+        """
+        if self.running:
+            return
+        # A previous run may still be winding down
+        if not self.stop():
+            raise ValueError('The previous run has not stopped yet')
+        
+        if self.mode == 'burst' and not self.target_cps > 0:
+            raise ValueError(f'Burst mode needs a positive target_cps, not {self.target_cps!r}')
+        if self.backend is None:
+            self.backend = SendInputBackend()
+        elif isinstance(self.backend, SendInputBackend):
+            # Monitors may have changed since the last run
+            self.backend.refresh_screen()
+        clicks = self.clicks
+        prepared = self.prepared if self.prepared is not None and self.prepared[0] is clicks else None
+        self.plan = self.batches = self.source = None
+        if isinstance(clicks, ClickPlan):
+            self.plan = clicks
+        elif prepared is not None:
+            self.plan = prepared[1]
+        elif isinstance(clicks, (list, tuple)) and not streams_blocks(clicks):
+            self.plan = compile_plan(clicks)
+        else:
+            if self.mode != 'sequence':
+                if isinstance(clicks, (list, tuple)):
+                    raise ValueError(f'{self.mode.capitalize()} mode needs blocks that flatten to at most '
+                                     f'{BLOCK_FLATTEN_LIMIT:,} steps')
+                raise ValueError(f'{self.mode.capitalize()} mode needs a click list or ClickPlan, not a step source')
+            self.source = as_step_source(clicks)
+        self.placement = None
+        if self.anchor is not None:
+            if self.source is not None:
+                raise ValueError('Anchored coordinates need a click list or ClickPlan, not a step source')
+            if isinstance(self.backend, PostMessageBackend):
+                raise ValueError('Anchored coordinates are for the cursor; window targets use client coordinates')
+            self.placement = self.display_topology().placement(self.anchor)
+        if self.plan is not None:
+            fresh = (prepared is not None and prepared[3] is self.backend
+                     and prepared[4] == getattr(self.backend, 'screen', None))
+            batches = prepared[2] if fresh else None
+            self.plan, batches = self.place(self.plan, batches)
+            self.use_capture(self.plan)
+            self.batches = batches if batches is not None else prepare_batches(self.plan, self.backend)
+        self.pending = None
+        self.steps_done = 0
+        self.max_lateness_ns = 0
+        self.first_step_ns = None
+        self.achieved_cps = None
+        self.last_jitter_seed = self.jitter_seed if self.jitter_seed is not None else int.from_bytes(os.urandom(4), 'little')
+        self.jitter_generator = None
+        if self.telemetry is not None:
+            self.telemetry.reset()
+        if self.placement is not None or self.follows_screen():
+            self.display_topology().subscribe(self.relocate)
+        self.wake.clear()
+        self.state = RUNNING
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def stop(self, timeout=1.0):
+        """
+        Stop clicking and wait up to timeout seconds for the executor thread
+        to exit. Returns True once it has (or when called from that thread).
+        """
+        with self.state_changed:
+            if self.state == RUNNING or self.state == PAUSED:
+                self.set_state(STOPPING)
+        thread = self.thread
+        if thread is None or thread is threading.current_thread():
+            return True
+        thread.join(timeout)
+        return not thread.is_alive()
+    
+    def pause(self):
+        """Hold the run before its next step"""
+        with self.state_changed:
+            if self.state == RUNNING:
+                self.set_state(PAUSED)
+    
+    def resume(self):
+        """Continue a paused run; later steps keep their spacing"""
+        with self.state_changed:
+            if self.state == PAUSED:
+                self.set_state(RUNNING)
+    
+    def toggle_pause(self):
+        """Pause a running run, or resume a paused one"""
+        with self.state_changed:
+            if self.state == RUNNING:
+                self.set_state(PAUSED)
+            elif self.state == PAUSED:
+                self.set_state(RUNNING)
+
+# ============================================================================
+# Macro Recorder
+# ============================================================================
+
+def split_interval_ms(total_ms):
+    """Whole milliseconds -> minutes/seconds/milliseconds click fields"""
+    minutes, rest = divmod(total_ms, 60_000)
+    seconds, milliseconds = divmod(rest, 1000)
+    return {'minutes': minutes, 'seconds': seconds, 'milliseconds': milliseconds}
+
+def events_to_clicks(xs, ys, actions, times_ns, last_interval_ms=100):
+    """
+    Recorded button presses -> click dicts. Each click's interval is the time
+    to the next press, rounded against the first press so rounding to whole
+    milliseconds never accumulates drift.
+    """
+    clicks = []
+    count = len(actions)
+    if not count:
+        return clicks
+    origin = times_ns[0]
+    previous_ms = 0
+    for i in range(count):
+        if i + 1 < count:
+            next_ms = (times_ns[i + 1] - origin + 500_000) // 1_000_000
+            interval_ms = next_ms - previous_ms
+            previous_ms = next_ms
+        else:
+            interval_ms = last_interval_ms
+        click = {'x': xs[i], 'y': ys[i], 'type': CLICK_TYPES[actions[i]]}
+        click.update(split_interval_ms(interval_ms))
+        clicks.append(click)
+    return clicks
+
+class MacroRecorder:
+    """
+    Records every mouse button press with its timestamp.
+
+    on_click() matches pynput's Listener callback and runs on the input hook
+    thread, so it only writes into a preallocated ring buffer and never
+    blocks or allocates containers. If the ring is full the event is
+    counted in `dropped` instead of waiting. A writer thread drains the ring
+    every flush_interval seconds, keeps the events, and appends them in
+    batches to a JSON-lines journal (if journal_path is given) so a crash
+    loses at most one batch. stop() returns the recording as click dicts.
+    """
+    def __init__(self, clock=None, capacity=8192, flush_interval=0.25, journal_path=None):
+        self.clock = clock if clock is not None else MonotonicClock()
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self._mask = size - 1
+        self.capacity = size
+        self._ring_xs = array('i', bytes(4 * size))
+        self._ring_ys = array('i', bytes(4 * size))
+        self._ring_actions = array('B', bytes(size))
+        self._ring_times = array('q', bytes(8 * size))
+        self._written = 0
+        self._read = 0
+        self.dropped = 0
+        self.recording = False
+        self.flush_interval = flush_interval
+        self.journal_path = journal_path
+        # Drained events, owned by the writer thread
+        self.xs = array('i')
+        self.ys = array('i')
+        self.actions = array('B')
+        self.times_ns = array('q')
+        self._stop_event = threading.Event()
+        self._writer = None
+
+    def on_click(self, x, y, button, pressed):
+        """Input hook callback: (x, y, button, pressed), button named 'left'/'right'"""
+        if not pressed or not self.recording:
+            return
+        name = getattr(button, 'name', button)
+        if name == 'left':
+            action = 0
+        elif name == 'right':
+            action = 1
+        else:
+            return
+        written = self._written
+        if written - self._read > self._mask:
+            self.dropped += 1
+            return
+        slot = written & self._mask
+        self._ring_xs[slot] = int(x)
+        self._ring_ys[slot] = int(y)
+        self._ring_actions[slot] = action
+        self._ring_times[slot] = self.clock.now_ns()
+        self._written = written + 1
+
+    def drain(self):
+        """Move buffered events out of the ring; returns how many were moved"""
+        start = self._read
+        end = self._written
+        mask = self._mask
+        for i in range(start, end):
+            slot = i & mask
+            self.xs.append(self._ring_xs[slot])
+            self.ys.append(self._ring_ys[slot])
+            self.actions.append(self._ring_actions[slot])
+            self.times_ns.append(self._ring_times[slot])
+        self._read = end
+        if end > start and self.journal_path is not None:
+            with open(self.journal_path, 'a') as f:
+                for i in range(len(self.actions) - (end - start), len(self.actions)):
+                    f.write(json.dumps({
+                        'x': self.xs[i], 'y': self.ys[i],
+                        'type': CLICK_TYPES[self.actions[i]], 'time_ns': self.times_ns[i],
+                    }) + '\n')
+        return end - start
+
+    def _run_writer(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.drain()
+
+    def start(self):
+        """Start recording (clears any previous recording)"""
+        if self.recording:
+            return
+        for events in (self.xs, self.ys, self.actions, self.times_ns):
+            del events[:]
+        self._read = self._written
+        self.dropped = 0
+        if self.journal_path is not None:
+            open(self.journal_path, 'w').close()
+        self._stop_event.clear()
+        self._writer = threading.Thread(target=self._run_writer, daemon=True)
+        self._writer.start()
+        self.recording = True
+
+    def stop(self, drop_last=0, last_interval_ms=100):
+        """
+        Stop recording and return the clicks. drop_last discards trailing
+        presses, e.g. the click on a "Stop" button.
+        """
+        self.recording = False
+        if self._writer is not None:
+            self._stop_event.set()
+            self._writer.join()
+            self._writer = None
+        self.drain()
+        end = max(0, len(self.actions) - drop_last)
+        return events_to_clicks(self.xs[:end], self.ys[:end], self.actions[:end], self.times_ns[:end], last_interval_ms)
+
+# ============================================================================
+# Global Hotkeys
+# ============================================================================
+
+def normalize_key(name):
+    """Key name as compared in chords: lowercase, no left/right prefix"""
+    name = name.lower()
+    for prefix in ('left ', 'right '):
+        if name.startswith(prefix):
+            return name[len(prefix):]
+    return name
+
+def parse_chord(hotkey):
+    """
+    'ctrl+shift+s' -> frozenset({'ctrl', 'shift', 's'}). A '+' where a key
+    is expected is the plus key itself: '+', 'ctrl++', '++ctrl'
+    """
+    keys = []
+    part = ''
+    for char in hotkey:
+        if char == '+' and part.strip():
+            keys.append(part)
+            part = ''
+        else:
+            part += char
+    if part.strip():
+        keys.append(part)
+    return frozenset(normalize_key(key.strip()) for key in keys)
+
+class HotkeyDispatcher:
+    """
+    Turns raw key events into start/stop/toggle actions.
+
+    on_key(name, pressed) is fed from an OS keyboard hook (see
+    install_keyboard_hook) or from synthetic events in tests. It only updates
+    the set of held keys and, when a key press completes a bound chord, puts
+    (action, press_time_ns) on a queue; the hook thread never blocks on the
+    executor. A worker thread (start()) or run_pending() drains the queue and
+    calls the handlers, which default to the executor's start/stop.
+
+    When the start and stop hotkeys are the same chord it is bound as toggle.
+    Profile hotkeys (set_switch_hotkeys) dispatch handlers['switch'](name).
+    Presses are stamped with the executor's clock, or with clock; with a
+    clock and handlers the executor may be None as long as only a stop
+    hotkey is bound (e.g. to end a recording).
+    """
+    def __init__(self, executor, handlers=None, clock=None):
+        self.executor = executor
+        self.clock = clock if clock is not None else executor.clock
+        self.handlers = handlers if handlers is not None else {
+            'start': executor.start,
+            'stop': executor.stop,
+        }
+        self.queue = queue.Queue()
+        self.thread = None
+        self._bindings = {}
+        self._run_bindings = {}
+        self._switch_bindings = {}
+        self._pressed = set()
+        self.last_start_press_ns = None
+
+    def set_hotkeys(self, start=None, stop=None):
+        """Bind start/stop hotkeys (either may be None); replaces old bindings atomically"""
+        start_chord = parse_chord(start) if start else None
+        stop_chord = parse_chord(stop) if stop else None
+        bindings = {}
+        if start_chord and start_chord == stop_chord:
+            bindings[start_chord] = 'toggle'
+        else:
+            if start_chord:
+                bindings[start_chord] = 'start'
+            if stop_chord:
+                bindings[stop_chord] = 'stop'
+        self._run_bindings = bindings
+        self._bindings = {**self._switch_bindings, **bindings}
+    
+    def set_switch_hotkeys(self, hotkeys):
+        """Bind {hotkey: profile_name}; start/stop hotkeys win over a profile on the same chord"""
+        self._switch_bindings = {parse_chord(hotkey): ('switch', name) for hotkey, name in hotkeys.items() if hotkey}
+        self._bindings = {**self._switch_bindings, **self._run_bindings}
+
+    def on_key(self, name, pressed):
+        """Key event callback; cheap enough to run inside the OS hook"""
+        name = normalize_key(name)
+        if not pressed:
+            self._pressed.discard(name)
+            return
+        if name in self._pressed:
+            return  # Auto-repeat while held
+        self._pressed.add(name)
+        now = self.clock.now_ns()
+        for chord, action in self._bindings.items():
+            if name in chord and chord <= self._pressed:
+                self.queue.put((action, now))
+
+    def dispatch(self, action, press_ns):
+        """Run one action on the executor"""
+        if isinstance(action, tuple):
+            handler, argument = action
+            self.handlers[handler](argument)
+            return
+        if action == 'toggle':
+            action = 'stop' if self.executor.running else 'start'
+        if action == 'start':
+            if self.executor.running:
+                return
+            self.last_start_press_ns = press_ns
+        self.handlers[action]()
+
+    def run_pending(self):
+        """Dispatch every queued action on the calling thread"""
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            self.dispatch(*item)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            self.dispatch(*item)
+
+    def start(self):
+        """Dispatch queued actions on a background thread"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def close(self):
+        """Stop the dispatch thread"""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def press_to_click_ns(self):
+        """Latency from the last start hotkey press to the run's first click, or None"""
+        press = self.last_start_press_ns
+        first = self.executor.first_step_ns
+        if press is None or first is None or first < press:
+            return None
+        return first - press
+
+def install_keyboard_hook(dispatcher):
+    """Feed global key events from the keyboard library; returns an unhook function"""
+    import keyboard
+
+    def on_event(event):
+        if event.name:
+            dispatcher.on_key(event.name, event.event_type == 'down')
+
+    hook = keyboard.hook(on_event)
+    return lambda: keyboard.unhook(hook)
+
+# ============================================================================
+# Profile Library
+# ============================================================================
+#
+# ProfileLibrary serves every profile in CONFIG_DIR by name for the GUI and
+# for hotkey switching. Switching profiles mid-run has to be cheap, so:
+#   - the directory is scanned once; it is rescanned only when its mtime
+#     changes (a profile was added, removed or saved via atomic_write)
+#   - loaded profiles are kept parsed and compiled (ClickPlan, plus batches
+#     for the last backend used) in an LRU cache, checked against the file's
+#     mtime and size on every get()
+#   - recently used and hotkey-bound profiles are preloaded on a background
+#     thread, so the first switch to them is a cache hit as well
+# The profile hotkeys (saved when bound) and the recent list (saved by
+# save_recent(), e.g. on exit) are kept in LIBRARY_FILE.
+
+PROFILE_SUFFIXES = ('.json', '.acp')  # In lookup order: JSON wins over binary
+LIBRARY_FILE = '.library.json'
+PROFILE_CACHE_SIZE = 16
+RECENT_PROFILES = 8
+
+class ProfileEntry:
+    """
+    A parsed profile as cached by ProfileLibrary:
+      data    profile settings (a binary profile's settings hold no clicks)
+      clicks  click list of a JSON profile, None for binary / pattern ones
+      plan    compiled ClickPlan (mapped from the file for binary profiles),
+              None for a pattern profile or blocks too long to flatten,
+              which are played as a step source
+    """
+    def __init__(self, name, path, stat):
+        self.name = name
+        self.path = path
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.mapped = None
+        self._batches = None  # (backend, screen, batches)
+        if path.suffix == '.acp':
+            # Not closed on eviction: a running executor may still play it,
+            # so the mapping goes away with its last reference instead
+            self.mapped = map_profile_binary(path)
+            if self.mapped is None:
+                raise ValueError(f'Profile disappeared: {path}')
+            self.data, self.clicks, self.plan = self.mapped.settings, None, self.mapped.plan
+            return
+        self.data = read_profile_json(path)
+        if self.data is None:
+            raise ValueError(f'Profile disappeared: {path}')
+        self.clicks = self.plan = None
+        if self.data.get('pattern'):
+            pattern_from_spec(self.data['pattern'])  # Fail now on a bad spec
+            return
+        self.clicks = self.data.get('clicks') or []
+        try:
+            if streams_blocks(self.clicks):
+                BlockSource(self.clicks)  # Fail now on steps it can't stream
+                return
+            self.plan = compile_plan(self.clicks)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f'Cannot read profile {path}: bad click ({e!r})') from e
+
+    def steps(self):
+        """What an executor plays: the click list, the mapped plan, or a fresh pattern source"""
+        if self.clicks is not None:
+            return self.clicks
+        if self.plan is not None:
+            return self.plan
+        return pattern_from_spec(self.data['pattern'])
+
+    def editable_clicks(self):
+        """The steps as a click list (materialized once for binary profiles)"""
+        if self.clicks is None and self.mapped is not None:
+            self.clicks = self.mapped.clicks()
+        return self.clicks
+
+    def prepared(self, backend):
+        """(plan, batches) for backend; batches is None until a backend exists"""
+        if self.plan is None or backend is None:
+            return self.plan, None
+        # SendInput batches depend on the virtual desktop they were built for
+        screen = getattr(backend, 'screen', None)
+        cached = self._batches
+        if cached is None or cached[0] is not backend or cached[1] != screen:
+            cached = self._batches = (backend, screen, prepare_batches(self.plan, backend))
+        return self.plan, cached[2]
+
+class ProfileLibrary:
+    """
+    Every profile in a directory (CONFIG_DIR by default). names() lists
+    them, get() returns a cached ProfileEntry (raising ValueError for a
+    missing or unreadable profile), switch() makes one the executor's click
+    list without stopping it. Safe to use from the GUI, hotkey and preload
+    threads at once.
+    """
+    def __init__(self, directory=None, capacity=PROFILE_CACHE_SIZE):
+        self.directory = Path(directory) if directory is not None else CONFIG_DIR
+        self.capacity = capacity
+        self.index = {}  # name -> path
+        self.scans = 0
+        self._dir_mtime_ns = None
+        self._cache = OrderedDict()  # name -> ProfileEntry, least recently used first
+        self._lock = threading.Lock()
+        self.recent = []  # Most recently used first
+        self.switch_hotkeys = {}  # name -> hotkey
+        self._read_settings()
+
+    # ---- index ----
+
+    def refresh(self):
+        """Rescan the directory if its mtime changed since the last scan"""
+        try:
+            mtime_ns = self.directory.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        if mtime_ns == self._dir_mtime_ns and self.scans:
+            return
+        index = {}
+        if mtime_ns is not None:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    stem, suffix = os.path.splitext(entry.name)
+                    if suffix not in PROFILE_SUFFIXES or stem.startswith('.') or not entry.is_file():
+                        continue
+                    known = index.get(stem)
+                    if known is None or PROFILE_SUFFIXES.index(suffix) < PROFILE_SUFFIXES.index(known.suffix):
+                        index[stem] = Path(entry.path)
+        self.index = index
+        self._dir_mtime_ns = mtime_ns
+        self.scans += 1
+
+    def names(self):
+        """Sorted names of every profile in the directory"""
+        self.refresh()
+        return sorted(self.index, key=str.lower)
+
+    # ---- cache ----
+
+    def get(self, name):
+        """Cached ProfileEntry for name, reloaded if its file changed"""
+        self.refresh()
+        path = self.index.get(name)
+        if path is None:
+            # The directory mtime can be too coarse to show a brand new file
+            self._dir_mtime_ns = None
+            self.refresh()
+            path = self.index.get(name)
+            if path is None:
+                raise ValueError(f'No such profile: {name}')
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self._dir_mtime_ns = None
+            raise ValueError(f'No such profile: {name}') from None
+        with self._lock:
+            entry = self._cache.get(name)
+            if (entry is not None and entry.path == path
+                    and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size):
+                self._cache.move_to_end(name)
+                return entry
+        entry = ProfileEntry(name, path, stat)
+        with self._lock:
+            self._cache[name] = entry
+            self._cache.move_to_end(name)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+        return entry
+
+    def cached(self, name):
+        """True if name is in the cache (possibly stale)"""
+        with self._lock:
+            return name in self._cache
+
+    def use(self, name):
+        """get(), and remember name as recently used"""
+        entry = self.get(name)
+        self.remember(name)
+        return entry
+
+    def remember(self, name):
+        """Move name to the front of the recent list (saved by save_recent())"""
+        if not self.recent or self.recent[0] != name:
+            self.recent = [name] + [other for other in self.recent if other != name][:RECENT_PROFILES - 1]
+
+    def save_recent(self):
+        """Persist the recent list; it is only a preload hint, so errors are ignored"""
+        try:
+            self._write_settings()
+        except OSError:
+            pass
+
+    def preload(self, names=None, backend=None):
+        """
+        Load names (default: hotkey-bound, then recent profiles, up to the
+        cache capacity) on a background thread; with backend, prepare their
+        batches too. Unreadable profiles are skipped. Returns the thread.
+        """
+        if names is None:
+            names = list(dict.fromkeys([*self.switch_hotkeys, *self.recent]))[:self.capacity]
+
+        def load():
+            for name in names:
+                try:
+                    self.get(name).prepared(backend)
+                except ValueError:
+                    pass
+
+        thread = threading.Thread(target=load, daemon=True)
+        thread.start()
+        return thread
+
+    def switch(self, executor, name):
+        """
+        Make profile name the executor's click list and return its entry. A
+        running executor keeps going: the steps are swapped in at its next
+        swap boundary, while mode, repeat and the other settings stay those
+        of the run (the profile's anchor is taken, as it belongs to the
+        steps). An idle executor also takes the profile's settings.
+        """
+        entry = self.get(name)
+        running = executor.running
+        if not running:
+            configure_executor(executor, entry.data)
+        if entry.plan is None:
+            if running:
+                raise ValueError(f'Streamed profile {name} cannot be swapped into a running sequence')
+            executor.clicks = entry.steps()
+        else:
+            plan, batches = entry.prepared(executor.backend)
+            if running:
+                executor.use_anchor(entry.data.get('anchor'))
+            executor.update_clicks(entry.steps(), plan, batches)
+        self.remember(name)
+        return entry
+
+    # ---- hotkeys and recent list ----
+
+    def bind_hotkey(self, name, hotkey):
+        """Bind a switch hotkey to profile name (None or '' unbinds it)"""
+        chord = parse_chord(hotkey) if hotkey else None
+        bindings = {other: key for other, key in self.switch_hotkeys.items()
+                    if other != name and parse_chord(key) != chord}
+        if hotkey:
+            bindings[name] = hotkey
+        self.switch_hotkeys = bindings
+        self._write_settings()
+
+    def hotkeys(self):
+        """{hotkey: name} for HotkeyDispatcher.set_switch_hotkeys()"""
+        return {hotkey: name for name, hotkey in self.switch_hotkeys.items()}
+
+    def _read_settings(self):
+        try:
+            settings = read_profile_json(self.directory / LIBRARY_FILE) or {}
+        except ValueError:
+            settings = {}
+        self.recent = [name for name in settings.get('recent', []) if isinstance(name, str)]
+        self.switch_hotkeys = dict(settings.get('switch_hotkeys', {}))
+
+    def _write_settings(self):
+        settings = {'recent': self.recent, 'switch_hotkeys': self.switch_hotkeys}
+        self.directory.mkdir(exist_ok=True)
+        atomic_write(self.directory / LIBRARY_FILE, lambda f: json.dump(settings, f, indent=2))
+
+# ============================================================================
+# Headless Runner
+# ============================================================================
+
+def load_run_profile(profile_name):
+    """
+    (settings, steps, mapped) for playing a profile, or None if there is no
+    such profile (ValueError if it is unreadable). A JSON profile is used if
+    present, otherwise a binary one is mapped (mapped is then the
+    MappedProfile to close after the run). A JSON profile with a 'pattern'
+    entry streams that generated pattern instead of 'clicks'.
+    """
+    mapped = None
+    data = load_profile(profile_name)
+    if data is not None and data.get('pattern'):
+        steps = pattern_from_spec(data['pattern'])
+    elif data is not None:
+        steps = data.get('clicks')
+    else:
+        mapped = open_profile_binary(profile_name)
+        if mapped is None:
+            return None
+        data, steps = mapped.settings, mapped.plan
+    if not data or not steps:
+        if mapped is not None:
+            mapped.close()
+        return None
+    return data, steps, mapped
+
+def apply_burst_settings(executor, data):
+    """Copy a profile's burst settings (target_cps, burst_duration, burst_budget) onto executor"""
+    executor.target_cps = float(data.get('target_cps', executor.target_cps))
+    duration = data.get('burst_duration')
+    executor.burst_duration_s = float(duration) if duration else None
+    budget = data.get('burst_budget')
+    executor.burst_budget = int(budget) if budget else None
+
+def configure_executor(executor, data, repeat_count=None, until_stopped=None):
+    """
+    Copy a profile's playback settings (repeat, mode, swap boundary, burst,
+    jitter seed, anchor) onto executor. repeat_count / until_stopped override the
+    profile's repeat settings when given.
+    """
+    until = until_stopped if until_stopped is not None else data.get('repeat_mode') == 'until_stopped'
+    executor.repeat_until_stopped = until
+    executor.repeat_count = repeat_count if repeat_count is not None else int(data.get('repeat_count', 1))
+    executor.mode = data.get('mode', 'sequence')
+    executor.stagger = bool(data.get('stagger', False))
+    executor.swap_boundary = data.get('swap_boundary', 'cycle')
+    apply_burst_settings(executor, data)
+    executor.jitter_seed = data.get('jitter_seed')
+    executor.anchor = data.get('anchor')
+
+def stats_path_for(stats_path, profile_name, several):
+    """stats.csv -> 'stats-<profile>.csv' when several profiles run at once"""
+    if not several:
+        return stats_path
+    path = Path(stats_path)
+    return str(path.with_name(f'{path.stem}-{profile_name}{path.suffix}'))
+
+def run_headless(profile_names, repeat_count=None, until_stopped=None, stop_hotkey=None, stats_path=None,
+                 switch_hotkeys=False):
+    """
+    Play saved profiles without the GUI. Returns a process exit code.
+    Several profiles play at the same time, one executor each; at most one
+    of them may drive the real cursor, the others must target a window.
+    repeat_count / until_stopped override the profiles' repeat settings.
+    stop_hotkey stops playback from anywhere (imports keyboard only then).
+    stats_path exports per-step telemetry (.csv or .jsonl) after the run.
+    switch_hotkeys binds the ProfileLibrary's profile hotkeys, which swap
+    another profile's steps into the (single) running profile.
+    """
+    if isinstance(profile_names, str):
+        profile_names = [profile_names]
+    several = len(profile_names) > 1
+    if switch_hotkeys and several:
+        print('Profile hotkeys can only switch a single running profile', file=sys.stderr)
+        return 1
+    runs = []  # [(profile_name, executor)]
+    mapped_profiles = []
+    cursor_profiles = []
+    try:
+        for profile_name in profile_names:
+            try:
+                loaded = load_run_profile(profile_name)
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                return 1
+            if loaded is None:
+                print(f'Profile not found or empty: {profile_name}', file=sys.stderr)
+                return 1
+            data, steps, mapped = loaded
+            if mapped is not None:
+                mapped_profiles.append(mapped)
+            try:
+                backend = window_backend(data.get('window'))
+            except ValueError as e:
+                print(f'{profile_name}: {e}', file=sys.stderr)
+                return 1
+            if backend is None:
+                cursor_profiles.append(profile_name)
+            if len(cursor_profiles) > 1:
+                print(f"Only one profile can use the cursor at a time: {', '.join(cursor_profiles)} "
+                      "(give the others a target window)", file=sys.stderr)
+                return 1
+
+            executor = ClickExecutor(backend)
+            executor.clicks = steps
+            configure_executor(executor, data, repeat_count, until_stopped)
+            if stats_path:
+                executor.telemetry = RunTelemetry()
+            runs.append((profile_name, executor))
+
+        executors = [executor for _, executor in runs]
+        library = ProfileLibrary() if switch_hotkeys else None
+        if stop_hotkey or library is not None:
+            def stop_all():
+                for executor in executors:
+                    executor.stop()
+
+            def switch(profile_name):
+                try:
+                    library.switch(executors[0], profile_name)
+                except ValueError as e:
+                    print(e, file=sys.stderr)
+
+            hotkeys = HotkeyDispatcher(executors[0], {'start': stop_all, 'stop': stop_all, 'switch': switch})
+            hotkeys.set_hotkeys(stop=stop_hotkey)
+            if library is not None:
+                hotkeys.set_switch_hotkeys(library.hotkeys())
+            install_keyboard_hook(hotkeys)
+            hotkeys.start()
+
+        for profile_name, executor in runs:
+            try:
+                executor.start()
+            except ValueError as e:
+                for started in executors:
+                    started.stop()
+                print(f'{profile_name}: {e}', file=sys.stderr)
+                return 1
+        if library is not None:
+            library.preload(list(library.switch_hotkeys), executors[0].backend)
+        try:
+            # Join with a timeout so Ctrl+C is still delivered
+            for executor in executors:
+                while executor.thread.is_alive():
+                    executor.thread.join(0.1)
+        except KeyboardInterrupt:
+            for executor in executors:
+                executor.stop()
+
+        for profile_name, executor in runs:
+            if executor.achieved_cps is not None:
+                label = f'{profile_name}: ' if several else ''
+                print(f'{label}burst achieved {executor.achieved_cps:.1f} clicks/s '
+                      f'(target {executor.target_cps:g})')
+        if stats_path:
+            for profile_name, executor in runs:
+                executor.telemetry.export(stats_path_for(stats_path, profile_name, several))
+                stats = executor.telemetry.snapshot()
+                label = f'{profile_name}: ' if several else ''
+                print(f"{label}{stats['steps']} steps, {stats['cps_overall']:.1f} steps/s, "
+                      f"lateness p99 {stats['lateness_p99_ns'] / 1e6:.3f} ms")
+        return 0
+    finally:
+        # Drop the views into the mapped files before unmapping them
+        for _, executor in runs:
+            executor.clicks = executor.plan = executor.batches = executor.pending = executor.prepared = None
+            executor.jitter_generator = None
+        for mapped in mapped_profiles:
+            mapped.close()
+
+def record_headless(profile_name, stop_hotkey=None, binary=False):
+    """
+    Record mouse clicks into a profile until stop_hotkey or Ctrl+C.
+    The journal next to the profile keeps the events if the process dies.
+    """
+    from pynput import mouse as pynput_mouse
+
+    CONFIG_DIR.mkdir(exist_ok=True)
+    journal_path = CONFIG_DIR / f'{profile_name}.recording.jsonl'
+    recorder = MacroRecorder(journal_path=journal_path)
+    done = threading.Event()
+    if stop_hotkey:
+        hotkeys = HotkeyDispatcher(None, {'stop': done.set}, MonotonicClock())
+        hotkeys.set_hotkeys(stop=stop_hotkey)
+        install_keyboard_hook(hotkeys)
+        hotkeys.start()
+
+    recorder.start()
+    listener = pynput_mouse.Listener(on_click=recorder.on_click)
+    listener.start()
+    print('Recording... press Ctrl+C' + (f' or {stop_hotkey}' if stop_hotkey else '') + ' to stop')
+    try:
+        while not done.wait(0.1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    listener.stop()
+    clicks = recorder.stop()
+
+    data = {'hotkey': '`', 'repeat_mode': 'repeat', 'repeat_count': 1, 'clicks': clicks}
+    saved = save_profile_binary(profile_name, data) if binary else save_profile(profile_name, data)
+    if not saved:
+        print(f'Could not save profile: {profile_name}', file=sys.stderr)
+        return 1
+    journal_path.unlink()
+    print(f'Recorded {len(clicks)} clicks' + (f' ({recorder.dropped} dropped)' if recorder.dropped else ''))
+    return 0
+
+# ============================================================================
+# Main Entry Point
+# ============================================================================
+
+def main(argv=None):
+    """Start the GUI, or run a profile headless when --run is given"""
+    parser = argparse.ArgumentParser(prog='mouse_clicker', description='Lightweight mouse automation')
+    parser.add_argument('--run', metavar='PROFILE', nargs='+', help=f'play profiles from {CONFIG_DIR} without the GUI (several run at once)')
+    parser.add_argument('--record', metavar='PROFILE', help='record mouse clicks into a profile (use --to binary for long macros)')
+    repeat = parser.add_mutually_exclusive_group()
+    repeat.add_argument('--repeat', type=int, metavar='N', help='repeat the sequence N times')
+    repeat.add_argument('--until-stopped', action='store_true', default=None, help='repeat until stopped')
+    parser.add_argument('--stop-hotkey', metavar='KEY', help='global hotkey that stops playback')
+    parser.add_argument('--switch-hotkeys', action='store_true', help="bind the profile library's switch hotkeys during --run")
+    parser.add_argument('--stats', metavar='FILE', help='write per-step telemetry to FILE (.csv or .jsonl)')
+    parser.add_argument('--convert', metavar='PROFILE', help='convert a profile between JSON and binary (see --to)')
+    parser.add_argument('--to', choices=('binary', 'json'), help='target format for --convert (default binary) or --record (default json)')
+    control = parser.add_mutually_exclusive_group()
+    control.add_argument('--control', metavar='ADDRESS', help='serve the control protocol next to the GUI (host:port or a Unix socket path)')
+    control.add_argument('--serve', metavar='ADDRESS', help='serve the control protocol without the GUI until Ctrl+C')
+    args = parser.parse_args(argv)
+
+    if args.convert:
+        try:
+            converted = convert_profile(args.convert, args.to or 'binary')
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        if not converted:
+            print(f'Could not convert profile: {args.convert}', file=sys.stderr)
+            return 1
+        return 0
+
+    enable_dpi_awareness()
+    if args.record:
+        return record_headless(args.record, args.stop_hotkey, args.to == 'binary')
+    if args.run:
+        return run_headless(args.run, args.repeat, args.until_stopped, args.stop_hotkey, args.stats, args.switch_hotkeys)
+    if args.serve:
+        import clicker_control
+        return clicker_control.serve(args.serve)
+
+    import clicker_gui
+    return clicker_gui.main(args.control)
 
 if __name__ == '__main__':
-    app = AutoClickerApp()
-    app.mainloop()
+    sys.exit(main())
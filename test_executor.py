@@ -0,0 +1,619 @@
+"""
+Executor checks that must hold on any OS, run with pytest:
+
+    python -m pytest -q test_executor.py
+
+The benchmarks in benchmark.py measure; these fail on a broken invariant.
+"""
+
+import itertools
+import json
+import threading
+import time
+
+import pytest
+
+import mouse_clicker
+from mouse_clicker import (
+    MOVE_FLAGS, BlockSource, CaptureCache, ClickExecutor, MacroRecorder, MonotonicClock, RecordingBackend,
+    SyntheticFrameSource, VirtualClock, block_length, compile_plan, prepare_batches, streams_blocks,
+)
+
+class TaggingBackend(RecordingBackend):
+    """RecordingBackend whose batches are the (x, y) they were prepared for"""
+    def prepare(self, x, y, action, count=1, move=True):
+        return (x, y)
+
+def snapshot(steps, version):
+    """Click list tagging each step with its position (x) and the edit version (y)"""
+    return [{'x': i, 'y': version, 'type': 'left', 'milliseconds': 0} for i in range(steps)]
+
+def torn_batches(sent, steps, boundary):
+    """
+    Positions in the sent batches where a live edit showed: a version older
+    than one already played, a gap in the step order, or (for 'cycle') a
+    new version starting anywhere but step 0
+    """
+    torn = []
+    version, last_x = 0, steps - 1
+    for index, (_, (x, version_sent)) in enumerate(sent):
+        if version_sent != version:
+            if version_sent < version or (boundary == 'cycle' and x != 0):
+                torn.append(index)
+            version = version_sent
+        if x != (last_x + 1) % steps:
+            torn.append(index)
+        last_x = x
+    return torn
+
+@pytest.mark.parametrize('boundary', ['cycle', 'step'])
+def test_live_edit_never_tears_a_batch(boundary, steps=50, edits=500):
+    clock = VirtualClock(read_cost_ns=0)
+    backend = TaggingBackend(clock)
+    executor = ClickExecutor(backend, clock)
+    executor.spin_ns = 0
+    executor.repeat_until_stopped = True
+    executor.swap_boundary = boundary
+    executor.clicks = snapshot(steps, 0)
+    executor.start()
+    for version in range(1, edits + 1):
+        executor.update_clicks(snapshot(steps, version))
+    # Let the last edit reach the backend before stopping
+    while not backend.sent or backend.sent[-1][1][1] != edits:
+        time.sleep(0.001)
+    assert executor.stop()
+    assert torn_batches(backend.sent, steps, boundary) == []
+
+STOP_LIMIT_MS = 5.0
+
+@pytest.mark.parametrize('mode', ['sequence', 'independent'])
+@pytest.mark.parametrize('interval_ms', [0, 10, 60_000])
+def test_stop_is_prompt_and_final(mode, interval_ms, rounds=5):
+    clock = MonotonicClock()
+    for _ in range(rounds):
+        backend = RecordingBackend(clock)
+        executor = ClickExecutor(backend, clock)
+        executor.mode = mode
+        executor.repeat_until_stopped = True
+        executor.clicks = [{'x': 0, 'y': 0, 'type': 'left', 'milliseconds': interval_ms}] * 2
+        executor.start()
+        time.sleep(0.005)
+        t0 = clock.now_ns()
+        assert executor.stop()
+        stopped_ns = clock.now_ns()
+        assert (stopped_ns - t0) / 1e6 < STOP_LIMIT_MS
+        time.sleep(0.002)
+        assert all(stamp < stopped_ns for stamp, _ in backend.sent)
+
+def test_start_refuses_while_the_last_run_is_stuck():
+    release = threading.Event()
+
+    class StuckBackend(RecordingBackend):
+        def send(self, batch):
+            release.wait()
+
+    executor = ClickExecutor(StuckBackend())
+    executor.clicks = [{'x': 0, 'y': 0, 'type': 'left', 'milliseconds': 0}]
+    executor.start()
+    assert not executor.stop(timeout=0.01)
+    with pytest.raises(ValueError):
+        executor.start()
+    release.set()
+    assert executor.stop()
+
+@pytest.mark.parametrize('action', ['stop', 'pause'])
+def test_stalled_step_source_still_stops(action):
+    release = threading.Event()
+
+    def steps():
+        yield {'x': 0, 'y': 0, 'type': 'left', 'milliseconds': 0}
+        release.wait()
+        yield {'x': 1, 'y': 0, 'type': 'left', 'milliseconds': 0}
+
+    backend = RecordingBackend()
+    executor = ClickExecutor(backend)
+    executor.read_ahead = 1
+    executor.clicks = steps()
+    executor.start()
+    while not backend.sent:
+        time.sleep(0.001)
+    try:
+        if action == 'pause':
+            executor.pause()
+            time.sleep(0.01)
+            assert executor.state == 'paused'
+        t0 = time.perf_counter_ns()
+        assert executor.stop()
+        assert (time.perf_counter_ns() - t0) / 1e6 < STOP_LIMIT_MS
+    finally:
+        release.set()
+    # The stalled run doesn't hold up the next one
+    executor.clicks = [{'x': 0, 'y': 0, 'type': 'left', 'milliseconds': 0}]
+    executor.start()
+    assert executor.stop()
+
+def step(x, **fields):
+    return {'x': x, 'y': 0, 'type': 'left', 'milliseconds': 0, **fields}
+
+NESTED = [
+    {'define': 'pair', 'steps': [step(1), {'call': 'one'}]},
+    {'define': 'one', 'steps': [step(2)]},
+    step(0, repeat=2),
+    {'loop': [{'call': 'pair', 'count': 2}, {'loop': [step(3)], 'count': 3}], 'count': 2},
+    {'loop': [step(9)], 'count': 0},
+]
+NESTED_XS = [0, 0] + ([1, 2, 1, 2] + [3, 3, 3]) * 2
+
+def test_blocks_flatten_nested_loops_and_calls():
+    assert list(compile_plan(NESTED).xs) == NESTED_XS
+    assert block_length(NESTED) == len(NESTED_XS)
+    assert [x for x, _, _, _ in BlockSource(NESTED).steps()] == NESTED_XS
+
+@pytest.mark.parametrize('clicks', [
+    [{'define': 'a', 'steps': [{'call': 'a'}]}, {'call': 'a'}],
+    [{'define': 'a', 'steps': [{'call': 'b'}]}, {'define': 'b', 'steps': [{'call': 'a'}]}, {'call': 'a'}],
+    [{'call': 'missing'}],
+    [{'define': 'a', 'steps': []}, {'define': 'a', 'steps': []}],
+    [{'loop': [step(0)], 'count': -1}],
+])
+def test_bad_blocks_are_rejected(clicks):
+    with pytest.raises(ValueError):
+        compile_plan(clicks)
+    with pytest.raises(ValueError):
+        BlockSource(clicks)
+
+def test_repeated_steps_do_not_move_the_cursor():
+    plan = compile_plan([step(5, repeat=3), step(6), {'x': 6, 'y': 0, 'type': 'wait', 'color': '#000000'}, step(6)])
+    moves = [any(flags == MOVE_FLAGS for _, _, flags in batch) if isinstance(batch, tuple) else None
+             for batch in prepare_batches(plan, RecordingBackend())]
+    assert moves == [True, False, False, True, None, True]
+
+def test_long_blocks_are_streamed_not_flattened():
+    clicks = [{'loop': [step(0), step(1)], 'count': 2_000_000}]
+    assert streams_blocks(clicks)
+    assert block_length(clicks) == 4_000_000
+    source = BlockSource(clicks)
+    assert [x for x, _, _, _ in itertools.islice(source.steps(), 5)] == [0, 1, 0, 1, 0]
+    with pytest.raises(ValueError):
+        BlockSource([{'loop': [step(0, jitter_px=2)], 'count': 2}])
+
+def test_long_blocks_play_in_order(monkeypatch):
+    monkeypatch.setattr(mouse_clicker, 'BLOCK_FLATTEN_LIMIT', 5)
+    clock = VirtualClock(read_cost_ns=0)
+    backend = TaggingBackend(clock)
+    executor = ClickExecutor(backend, clock)
+    executor.repeat_count = 2
+    executor.clicks = NESTED
+    executor.start()
+    assert isinstance(executor.source, BlockSource)
+    executor.thread.join()
+    assert [x for _, (x, _) in backend.sent] == NESTED_XS * 2
+
+def test_control_server_close_leaves_a_mapped_run_playing(tmp_path):
+    from clicker_control import ControlServer
+
+    path = tmp_path / 'long.acp'
+    path.write_bytes(mouse_clicker.encode_binary_profile({'clicks': [step(i, milliseconds=1) for i in range(10)]}))
+    backend = RecordingBackend()
+    executor = ClickExecutor(backend)
+    executor.repeat_until_stopped = True
+    server = ControlServer(executor, '127.0.0.1:0')
+    server.start()
+    server.mapped = mouse_clicker.map_profile_binary(path)
+    executor.clicks = server.mapped.plan
+    executor.start()
+    server.close()
+    sent = len(backend.sent)
+    time.sleep(0.02)
+    assert executor.running and len(backend.sent) > sent
+    assert executor.stop()
+
+@pytest.mark.parametrize('hotkey, keys', [
+    ('ctrl+shift+s', {'ctrl', 'shift', 's'}),
+    ('Left Ctrl + S', {'ctrl', 's'}),
+    ('+', {'+'}),
+    ('ctrl++', {'ctrl', '+'}),
+    ('ctrl+shift++', {'ctrl', 'shift', '+'}),
+    ('++ctrl', {'+', 'ctrl'}),
+])
+def test_parse_chord(hotkey, keys):
+    assert mouse_clicker.parse_chord(hotkey) == keys
+
+class IdleExecutor:
+    """Just what HotkeyDispatcher reads from an executor"""
+    def __init__(self):
+        self.clock = VirtualClock(start_ns=1000, read_cost_ns=0)
+        self.running = False
+        self.first_step_ns = None
+
+def dispatcher(start='ctrl+shift+s', stop='esc'):
+    calls = []
+    executor = IdleExecutor()
+    hotkeys = mouse_clicker.HotkeyDispatcher(executor, {
+        'start': lambda: calls.append('start'),
+        'stop': lambda: calls.append('stop'),
+        'switch': lambda name: calls.append(name),
+    })
+    hotkeys.set_hotkeys(start, stop)
+    return hotkeys, executor, calls
+
+def press(hotkeys, *names):
+    for name in names:
+        hotkeys.on_key(name, True)
+
+def release(hotkeys, *names):
+    for name in names:
+        hotkeys.on_key(name, False)
+
+def test_hotkey_fires_when_the_chord_completes():
+    hotkeys, _, calls = dispatcher()
+    press(hotkeys, 's')
+    release(hotkeys, 's')
+    press(hotkeys, 'left ctrl', 'shift')
+    hotkeys.run_pending()
+    assert calls == []
+    press(hotkeys, 'S')
+    hotkeys.run_pending()
+    assert calls == ['start']
+
+def test_hotkey_ignores_auto_repeat():
+    hotkeys, _, calls = dispatcher(start='f6')
+    press(hotkeys, 'f6', 'f6', 'f6')
+    hotkeys.run_pending()
+    release(hotkeys, 'f6')
+    press(hotkeys, 'esc')
+    hotkeys.run_pending()
+    assert calls == ['start', 'stop']
+
+def test_same_start_and_stop_hotkey_toggles():
+    hotkeys, executor, calls = dispatcher(start='f6', stop='f6')
+    press(hotkeys, 'f6')
+    release(hotkeys, 'f6')
+    hotkeys.run_pending()
+    executor.running = True
+    press(hotkeys, 'f6')
+    hotkeys.run_pending()
+    assert calls == ['start', 'stop']
+
+def test_switch_hotkeys_lose_to_start_and_stop():
+    hotkeys, _, calls = dispatcher(start='f6', stop='f7')
+    hotkeys.set_switch_hotkeys({'f6': 'shadowed', 'ctrl+1': 'first'})
+    press(hotkeys, 'f6')
+    press(hotkeys, 'ctrl', '1')
+    hotkeys.run_pending()
+    assert calls == ['start', 'first']
+
+def test_press_to_click_latency():
+    hotkeys, executor, _ = dispatcher(start='f6')
+    assert hotkeys.press_to_click_ns() is None
+    press(hotkeys, 'f6')
+    hotkeys.run_pending()
+    executor.first_step_ns = 1000 + 250_000
+    assert hotkeys.press_to_click_ns() == 250_000
+    executor.first_step_ns = 500  # From an earlier run
+    assert hotkeys.press_to_click_ns() is None
+
+LEFT, RIGHT, DOUBLE = (mouse_clicker.ACTION_CODES[name] for name in ('left', 'right', 'double'))
+DOWN, UP = mouse_clicker.MOUSEEVENTF_LEFTDOWN, mouse_clicker.MOUSEEVENTF_LEFTUP
+RIGHT_DOWN, RIGHT_UP = mouse_clicker.MOUSEEVENTF_RIGHTDOWN, mouse_clicker.MOUSEEVENTF_RIGHTUP
+# Second monitor to the left of the primary: the desktop starts at x = -1920
+DESKTOP = (-1920, 0, 3840, 1080)
+
+@pytest.mark.parametrize('point, normalized', [
+    ((-1920, 0), (0, 0)),
+    ((1919, 1079), (65535, 65535)),
+    ((0, 0), ((1920 * 65535 + 1919) // 3839, 0)),
+    ((-5000, -10), (0, 0)),
+    ((5000, 2000), (65535, 65535)),
+])
+def test_normalization_spans_the_virtual_desktop(point, normalized):
+    assert mouse_clicker.normalize_coordinates(*point, DESKTOP) == normalized
+
+@pytest.mark.parametrize('action, buttons', [
+    (LEFT, (DOWN, UP)),
+    (RIGHT, (RIGHT_DOWN, RIGHT_UP)),
+    (DOUBLE, (DOWN, UP, DOWN, UP)),
+])
+def test_step_events_move_then_press_then_release(action, buttons):
+    events = RecordingBackend(screen=DESKTOP).prepare(-1920, 1079, action)
+    assert events == ((0, 65535, MOVE_FLAGS),) + tuple((0, 0, flags) for flags in buttons)
+
+def test_step_events_burst_and_stationary():
+    backend = RecordingBackend(screen=DESKTOP)
+    assert [flags for _, _, flags in backend.prepare(0, 0, LEFT, count=3)] == [MOVE_FLAGS] + [DOWN, UP] * 3
+    assert [flags for _, _, flags in backend.prepare(0, 0, RIGHT, count=2, move=False)] == [RIGHT_DOWN, RIGHT_UP] * 2
+
+def test_send_input_gets_one_call_per_step():
+    calls = []
+
+    def send_input(count, inputs, size):
+        calls.append([(inputs[i].type, inputs[i].mi.dx, inputs[i].mi.dy, inputs[i].mi.dwFlags) for i in range(count)])
+        assert size == mouse_clicker.INPUT_SIZE
+
+    backend = mouse_clicker.SendInputBackend(screen=DESKTOP, send_input=send_input)
+    backend.send(backend.prepare(1919, 0, DOUBLE))
+    backend.send(backend.prepare(1919, 0, LEFT, move=False))
+    mouse = mouse_clicker.INPUT_MOUSE
+    assert calls == [
+        [(mouse, 65535, 0, MOVE_FLAGS)] + [(mouse, 0, 0, flags) for flags in (DOWN, UP, DOWN, UP)],
+        [(mouse, 0, 0, DOWN), (mouse, 0, 0, UP)],
+    ]
+
+INTERVAL_NS = 10_000_000
+
+def run_stamps(steps, late_policy='catch_up', stall_at=None, stall_ns=0, overshoot_ns=500_000):
+    """Send times of a sequence of steps 10 ms apart, injection costing 300 us"""
+    clock = VirtualClock(sleep_overshoot_ns=overshoot_ns)
+
+    class StallingBackend(RecordingBackend):
+        def send(self, batch):
+            super().send(batch)
+            if len(self.sent) == stall_at:
+                clock.advance(stall_ns)
+
+    backend = StallingBackend(clock, cost_ns=300_000)
+    executor = ClickExecutor(backend, clock)
+    executor.late_policy = late_policy
+    executor.clicks = [step(i, milliseconds=10) for i in range(steps)]
+    executor.start()
+    executor.thread.join()
+    return [stamp for stamp, _ in backend.sent]
+
+def test_deadlines_do_not_drift():
+    stamps = run_stamps(1000)
+    # Relative sleeps would be 800 us later every step, 0.8 s by the end
+    assert max(abs(stamp - (stamps[0] + i * INTERVAL_NS)) for i, stamp in enumerate(stamps)) < 20_000
+
+def test_deadline_scheduler_reports_lateness():
+    clock = VirtualClock(start_ns=1_000_000, read_cost_ns=1000)
+    wait_until = mouse_clicker.DeadlineScheduler(clock, spin_ns=0).wait_until
+    assert wait_until(400_000) >= 600_000
+    assert 0 <= wait_until(5_000_000) < 5000
+
+def test_catch_up_fires_missed_steps_back_to_back():
+    stamps = run_stamps(20, 'catch_up', stall_at=5, stall_ns=80_000_000)
+    # Steps 5-12 were due during the stall and go out at once; the grid holds
+    assert all(stamps[i + 1] - stamps[i] < 1_000_000 for i in range(5, 12))
+    assert all(abs(stamps[i] - (stamps[0] + i * INTERVAL_NS)) < 20_000 for i in range(14, 20))
+
+def test_skip_re_anchors_after_a_long_stall():
+    stamps = run_stamps(20, 'skip', stall_at=5, stall_ns=80_000_000)
+    # One late step, then the spacing resumes from it
+    assert stamps[5] - stamps[4] > 80_000_000
+    assert all(abs(stamps[i + 1] - stamps[i] - INTERVAL_NS) < 20_000 for i in range(5, 19))
+    # Short lateness stays below the threshold and is caught up as usual
+    stamps = run_stamps(20, 'skip', stall_at=5, stall_ns=20_000_000)
+    assert abs(stamps[19] - (stamps[0] + 19 * INTERVAL_NS)) < 20_000
+
+# Recording: MacroRecorder is fed synthetic pynput-style callbacks on a
+# virtual clock. flush_interval is long enough that only stop() or an
+# explicit drain() empties the ring.
+
+def recorder(**kwargs):
+    rec = MacroRecorder(VirtualClock(read_cost_ns=0), flush_interval=3600, **kwargs)
+    rec.start()
+    return rec
+
+def test_full_ring_counts_dropped_presses():
+    rec = recorder(capacity=4)
+    for x in range(6):
+        rec.on_click(x, 0, 'left', True)
+    assert rec.dropped == 2
+    assert [click['x'] for click in rec.stop()] == [0, 1, 2, 3]
+    # Draining frees the ring again
+    rec = recorder(capacity=4)
+    for x in range(4):
+        rec.on_click(x, 0, 'left', True)
+    assert rec.drain() == 4
+    rec.on_click(4, 0, 'left', True)
+    assert rec.dropped == 0
+    assert len(rec.stop()) == 5
+
+def test_releases_and_other_buttons_are_ignored():
+    rec = recorder()
+    rec.on_click(1, 2, 'left', True)
+    rec.on_click(1, 2, 'left', False)
+    rec.on_click(3, 4, 'middle', True)
+    rec.on_click(5, 6, 'right', True)
+    assert [(c['x'], c['y'], c['type']) for c in rec.stop()] == [(1, 2, 'left'), (5, 6, 'right')]
+
+def test_journal_appends_one_batch_per_drain(tmp_path):
+    journal = tmp_path / 'journal.jsonl'
+    journal.write_text('stale\n')
+    rec = recorder(journal_path=str(journal))
+    assert journal.read_text() == ''
+    rec.on_click(1, 1, 'left', True)
+    rec.on_click(2, 2, 'right', True)
+    assert rec.drain() == 2
+    assert rec.drain() == 0
+    rec.on_click(3, 3, 'left', True)
+    rec.stop()
+    events = [json.loads(line) for line in journal.read_text().splitlines()]
+    assert [(e['x'], e['type']) for e in events] == [(1, 'left'), (2, 'right'), (3, 'left')]
+    assert events[0]['time_ns'] == events[1]['time_ns'] == 0
+
+def test_intervals_are_rounded_against_the_first_press():
+    rec = recorder()
+    for x in range(4):
+        rec.on_click(x, 0, 'left', True)
+        rec.clock.advance(1_400_000)
+    clicks = rec.stop(last_interval_ms=250)
+    # 0, 1.4, 2.8, 4.2 ms round to 0, 1, 3, 4: rounding each gap would give 1, 1, 1
+    assert [c['milliseconds'] for c in clicks] == [1, 2, 1, 250]
+
+def test_stop_drops_trailing_presses():
+    rec = recorder()
+    for x in range(3):
+        rec.on_click(x, 0, 'left', True)
+        rec.clock.advance(61_500_000_000)
+    clicks = rec.stop(drop_last=1)
+    assert [c['x'] for c in clicks] == [0, 1]
+    assert (clicks[0]['minutes'], clicks[0]['seconds'], clicks[0]['milliseconds']) == (1, 1, 500)
+
+# Wait steps: a SyntheticFrameSource stands in for the screen and the run
+# uses a virtual clock, so polling and timeouts take no real time.
+
+RED = (255, 0, 0)
+
+def wait_step(**fields):
+    return {'x': 10, 'y': 10, 'type': 'wait', 'color': '#ff0000', 'width': 4, 'height': 4,
+            'milliseconds': 0, **fields}
+
+class PaintingScreen(SyntheticFrameSource):
+    """Screen that turns red at (8, 8, 4, 4) on its paint_at-th grab"""
+    def __init__(self, paint_at):
+        super().__init__(64, 64)
+        self.paint_at = paint_at
+        self.painted_ns = None
+
+    def grab(self, left, top, width, height):
+        if self.grabs + 1 == self.paint_at:
+            self.fill(8, 8, 4, 4, RED)
+            self.painted_ns = self.clock.now_ns()
+        return super().grab(left, top, width, height)
+
+def run_wait(screen, clicks):
+    clock = VirtualClock()
+    screen.clock = clock
+    backend = TaggingBackend(clock)
+    executor = ClickExecutor(backend, clock)
+    executor.capture = CaptureCache(screen)
+    executor.clicks = clicks
+    executor.start()
+    executor.thread.join()
+    return [(stamp, x) for stamp, (x, _) in backend.sent]
+
+def test_wait_holds_the_sequence_until_the_region_matches():
+    screen = PaintingScreen(paint_at=5)
+    sent = run_wait(screen, [step(1), wait_step(timeout_ms=1000), step(2, milliseconds=10), step(3)])
+    assert [x for _, x in sent] == [1, 2, 3]
+    assert screen.grabs == 5
+    # The timeline restarts at the match, and the intervals after it hold
+    assert 0 <= sent[1][0] - screen.painted_ns < 20_000
+    assert abs(sent[2][0] - sent[1][0] - 10_000_000) < 20_000
+
+def test_wait_within_tolerance_matches_at_once():
+    screen = SyntheticFrameSource(64, 64, color=(250, 4, 0))
+    sent = run_wait(screen, [wait_step(tolerance=5), step(1)])
+    assert [x for _, x in sent] == [1]
+    assert screen.grabs == 1
+
+@pytest.mark.parametrize('on_timeout, sent_xs', [
+    ('continue', [1, 2, 3]),
+    ('skip', [1, 3]),
+    ('stop', [1]),
+])
+def test_wait_timeout_actions(on_timeout, sent_xs):
+    screen = PaintingScreen(paint_at=None)
+    sent = run_wait(screen, [step(1), wait_step(timeout_ms=50, on_timeout=on_timeout), step(2), step(3)])
+    assert [x for _, x in sent] == sent_xs
+    if len(sent) > 1:
+        assert 50_000_000 <= sent[1][0] - sent[0][0] < 51_000_000
+    # Polling backs off while the region stays the same
+    assert screen.grabs < 10
+
+def test_capture_cache_serves_a_region_once_per_tick():
+    screen = SyntheticFrameSource(64, 64)
+    cache = CaptureCache(screen, tick_ns=1_000_000)
+    region = (8, 8, 4, 4)
+    first = cache.grab(region, 0)
+    assert cache.grab(region, 999_999) is first
+    cache.grab((0, 0, 4, 4), 500_000)
+    assert (screen.grabs, cache.hits) == (2, 1)
+    screen.fill(8, 8, 4, 4, RED)
+    assert cache.grab(region, 1_000_000) == bytes(RED) * 16
+    assert (screen.grabs, cache.hits) == (3, 1)
+
+# Display topology: SyntheticDisplays stands in for the Windows layout.
+
+Monitor = mouse_clicker.Monitor
+PRIMARY = Monitor('DISPLAY1', 0, 0, 1920, 1080, 96, True)
+SECOND = Monitor('DISPLAY2', 1920, 0, 2560, 1440, 144)
+# DISPLAY2 moved to the left, at twice the resolution and 1.5x the dpi
+MOVED = Monitor('DISPLAY2', -5120, 0, 5120, 2880, 216)
+BASIS = {'width': 2560, 'height': 1440, 'dpi': 144}
+
+def topology(*monitors, windows=None):
+    displays = mouse_clicker.SyntheticDisplays(monitors, windows)
+    return displays, mouse_clicker.DisplayTopology(displays)
+
+@pytest.mark.parametrize('scale, point', [
+    ('size', (-5120 + 200, 400)),
+    ('dpi', (-5120 + 150, 300)),
+    ('none', (-5120 + 100, 200)),
+])
+def test_placement_for_each_scale(scale, point):
+    _, topo = topology(PRIMARY, MOVED)
+    placement = topo.placement({'monitor': 'DISPLAY2', 'basis': BASIS, 'scale': scale})
+    assert placement.point(100, 200) == point
+    assert placement.relative(*point) == (100, 200)
+    # The whole plan lands where point() puts each step, wait regions included
+    plan = compile_plan([step(100, y=200), {**wait_step(), 'x': 100, 'y': 200}])
+    placed = placement.apply(plan)
+    assert (placed.xs[0], placed.ys[0]) == point
+    assert placed.waits[1].region[:2] == (point[0] - 2, point[1] - 2)
+
+def test_anchor_lookups():
+    _, topo = topology(PRIMARY, SECOND, windows={('Game', 'GameClass'): (100, 50, 800, 600, 120)})
+    assert topo.monitor('primary') is topo.monitor(0) is topo.monitor('DISPLAY1')
+    assert topo.placement({'window': {'title': 'Game'}}) == mouse_clicker.Placement(100, 50)
+    assert topo.anchor(monitor='DISPLAY2', scale='dpi') == {'monitor': 'DISPLAY2', 'basis': BASIS, 'scale': 'dpi'}
+    for anchor in ({'monitor': 'DISPLAY3'}, {'monitor': 2}, {'window': {'title': 'Gone'}},
+                   {'monitor': 'primary', 'scale': 'stretch'}, {}):
+        with pytest.raises(ValueError):
+            topo.placement(anchor)
+
+def test_display_change_invalidates_the_layout():
+    displays, topo = topology(PRIMARY, SECOND)
+    told = []
+    topo.subscribe(lambda: told.append(topo.generation))
+    for _ in range(3):
+        assert topo.virtual_screen() == (0, 0, 4480, 1440)
+    assert displays.queries == 1
+    displays.set_monitors([PRIMARY, MOVED])
+    assert told == [1]
+    assert topo.virtual_screen() == (-5120, 0, 7040, 2880)
+    assert topo.monitor('DISPLAY2') is not None
+    assert displays.queries == 2
+
+def run_through_display_change(backend, displays, topo, anchor=None, steps=8, change_at=3):
+    """
+    Runs steps at x = 100, 101, ... (y = 200) 1 ms apart, swapping at every
+    step; the layout moves while step change_at is sent
+    """
+    sends = itertools.count(1)
+    send = backend.send
+
+    def send_and_change(batch):
+        send(batch)
+        if next(sends) == change_at:
+            displays.set_monitors([PRIMARY, MOVED])
+
+    backend.send = send_and_change
+    executor = ClickExecutor(backend, VirtualClock())
+    executor.topology = topo
+    executor.anchor = anchor
+    executor.swap_boundary = 'step'
+    executor.clicks = [step(100 + i, y=200, milliseconds=1) for i in range(steps)]
+    executor.start()
+    executor.thread.join()
+
+def test_running_plan_is_placed_again_after_a_display_change():
+    displays, topo = topology(PRIMARY, SECOND)
+    backend = TaggingBackend(VirtualClock())
+    run_through_display_change(backend, displays, topo, {'monitor': 'DISPLAY2', 'basis': BASIS})
+    points = [point for _, point in backend.sent]
+    assert points == [(2020 + i, 200) for i in range(3)] + [(-5120 + 2 * (100 + i), 400) for i in range(3, 8)]
+
+def test_send_input_is_normalized_against_the_new_desktop():
+    moves = []
+
+    def send_input(count, inputs, size):
+        moves.append((inputs[0].mi.dx, inputs[0].mi.dy))
+
+    displays, topo = topology(PRIMARY, SECOND)
+    backend = mouse_clicker.SendInputBackend(screen=topo.virtual_screen(), send_input=send_input)
+    run_through_display_change(backend, displays, topo)
+    # No anchor: the steps stay put, but the desktop now starts at -5120
+    assert moves == ([(round((100 + i) * 65535 / 4479), round(200 * 65535 / 1439)) for i in range(3)]
+                     + [(round((5220 + i) * 65535 / 7039), round(200 * 65535 / 2879)) for i in range(3, 8)])